@@ -1,12 +1,16 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from typing import List, Optional
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 from app.models.user import User
 from app.models.financial import FinancialRecord
+from app.models.ledger_transaction import LedgerTransaction
 from app.schemas.financial import FinancialCreate, FinancialResponse
 from app.api.v1.deps import get_current_user
 from app.services.runway_engine import calculate_burn_rate, calculate_runway_months
-from app.services.csv_service import process_csv_upload
+from app.services.csv_service import import_csv_upload
 from app.services.ml_forecast import forecaster
+from app.services.forecast_state import financial_records_changed, record_month_written, record_totals
+from app.services.ledger import reverse_transaction
 
 router = APIRouter()
 
@@ -25,6 +29,7 @@ async def create_financial_record(
 
     record = FinancialRecord(user=current_user, **record_in.model_dump())
     await record.create()
+    await record_month_written(current_user, record.month, *record_totals(record))
     
     # Calculate derived fields for response
     burn = calculate_burn_rate(record)
@@ -79,9 +84,61 @@ async def import_financial_csv(
 ):
     """
     Import financial data from a CSV file.
+    An identical re-upload returns the stored result with `deduplicated: true`.
     """
-    result = await process_csv_upload(file, current_user)
-    return result
+    return await import_csv_upload(file, current_user)
+
+@router.get("/transactions", response_model=List[dict])
+async def list_transactions(
+    month: Optional[str] = Query(None, description="Only this month (YYYY-MM)"),
+    source: Optional[str] = Query(None, description="stripe or bank_statement"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Imported Stripe and bank transactions behind the monthly records, latest month first.
+    Removed transactions are followed by their reversal (`reverses` holds the original's id).
+    """
+    query = [LedgerTransaction.user.id == current_user.id]
+    if month:
+        query.append(LedgerTransaction.month == month)
+    if source:
+        query.append(LedgerTransaction.source == source)
+    transactions = await LedgerTransaction.find(*query).sort(
+        -LedgerTransaction.month, +LedgerTransaction.created_at
+    ).skip(skip).limit(limit).to_list()
+    return [
+        {
+            "id": str(t.id),
+            "source": t.source,
+            "month": t.month,
+            "amounts": t.amounts,
+            "description": t.description,
+            "reverses": str(t.reverses) if t.reverses else None,
+            "created_at": t.created_at,
+        }
+        for t in transactions
+    ]
+
+@router.delete("/transactions/{transaction_id}")
+async def remove_transaction(
+    transaction_id: PydanticObjectId,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Remove an imported transaction: a reversal is appended and only its month is adjusted.
+    """
+    result = await reverse_transaction(current_user, transaction_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    if result.months_updated:
+        await financial_records_changed(current_user)
+    return {
+        "success": not result.errors,
+        "already_removed": not result.transactions_added and not result.errors,
+        "errors": result.errors
+    }
 
 @router.get("/forecast", response_model=List[dict])
 async def get_revenue_forecast(
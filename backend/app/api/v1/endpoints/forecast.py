@@ -5,23 +5,48 @@ Provides revenue/expense forecasting and future condition simulation
 based on historical financial data (FR-4: Future Condition Simulator).
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional, Tuple, Union
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from app.api.v1.deps import get_current_user
+from app.core.executor import ExecutorSaturatedError, run_cpu_bound
 from app.models.user import User
 from app.models.financial import FinancialRecord
+from app.models.forecast_state import ForecastState, MethodSelection
 from app.schemas.forecast import (
     ForecastRequest,
+    ForecastComparisonRequest,
     ProjectToDateRequest,
+    MonteCarloRequest,
     ForecastResponse,
+    ForecastComparisonResponse,
+    ColumnarForecastResponse,
+    ForecastFormatEnum,
+    MonteCarloResponse,
+    MethodSelectionResponse,
     ForecastPointResponse,
     ForecastMethodEnum,
     ForecastSummary
 )
+from app.services.backtest import COMPONENT_METHODS
 from app.services.forecast_engine import (
+    DEFAULT_ENSEMBLE_WEIGHTS,
     ForecastEngine,
     ForecastMethod,
+    ForecastResult,
     MonthlyDataPoint,
-    create_forecast_from_records
+    create_forecast_from_records,
+    forecast_record_categories
+)
+from app.services.forecast_cache import forecast_cache
+from app.services.forecast_state import (
+    columnar_forecast_from_state,
+    compare_forecasts_from_state,
+    forecast_from_state,
+    forecast_version,
+    get_forecast_state,
+    project_state_to_date
 )
 
 router = APIRouter()
@@ -38,6 +63,23 @@ async def _get_user_financial_data(user: User) -> list:
     return records
 
 
+def _records_to_dicts(records: list) -> list:
+    """Convert FinancialRecord documents to the dictionaries the engine expects."""
+    return [
+        {
+            "month": r.month,
+            "revenue_recurring": r.revenue_recurring,
+            "revenue_one_time": r.revenue_one_time,
+            "expenses_salaries": r.expenses_salaries,
+            "expenses_marketing": r.expenses_marketing,
+            "expenses_infrastructure": r.expenses_infrastructure,
+            "expenses_other": r.expenses_other,
+            "cash_balance": r.cash_balance
+        }
+        for r in records
+    ]
+
+
 def _convert_method(method: ForecastMethodEnum) -> ForecastMethod:
     """Convert API method enum to engine method enum."""
     mapping = {
@@ -49,57 +91,23 @@ def _convert_method(method: ForecastMethodEnum) -> ForecastMethod:
     return mapping[method]
 
 
-@router.post("/generate", response_model=ForecastResponse)
-async def generate_forecast(
-    request: ForecastRequest,
-    current_user: User = Depends(get_current_user)
-):
+def _resolve_method(method: ForecastMethodEnum,
+                    state: ForecastState) -> Tuple[ForecastMethod, Optional[MethodSelection]]:
     """
-    Generate a financial forecast based on historical data.
-    
-    Uses the specified forecasting method to predict future:
-    - Revenue
-    - Expenses
-    - Cash balance
-    - Burn rate
-    - Runway
-    
-    Also provides confidence intervals and risk assessment.
+    Resolve the requested method, turning "auto" into the user's cached
+    backtest selection (ensemble with default weights when the history is
+    too short to backtest).
     """
-    # Fetch user's financial records
-    records = await _get_user_financial_data(current_user)
-    
-    if len(records) < 2:
-        raise HTTPException(
-            status_code=400,
-            detail="Insufficient data for forecasting. Need at least 2 months of financial records."
-        )
-    
-    # Convert records to dictionary format for the engine
-    records_data = []
-    for r in records:
-        records_data.append({
-            "month": r.month,
-            "revenue_recurring": r.revenue_recurring,
-            "revenue_one_time": r.revenue_one_time,
-            "expenses_salaries": r.expenses_salaries,
-            "expenses_marketing": r.expenses_marketing,
-            "expenses_infrastructure": r.expenses_infrastructure,
-            "expenses_other": r.expenses_other,
-            "cash_balance": r.cash_balance
-        })
-    
-    # Create forecast engine and generate forecast
-    try:
-        engine = create_forecast_from_records(records_data)
-        method = _convert_method(request.method)
-        result = engine.forecast(periods=request.periods, method=method)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Forecasting error: {str(e)}")
-    
-    # Convert to response schema
+    if method != ForecastMethodEnum.AUTO:
+        return _convert_method(method), None
+    if state.selection is None:
+        return ForecastMethod.ENSEMBLE, None
+    return ForecastMethod(state.selection.method), state.selection
+
+
+def _to_forecast_response(result: ForecastResult, method: ForecastMethod,
+                          category_projections: Optional[dict] = None) -> ForecastResponse:
+    """Convert an engine ForecastResult to the API response schema."""
     projections = [
         ForecastPointResponse(
             month=p.month,
@@ -126,13 +134,158 @@ async def generate_forecast(
     )
     
     return ForecastResponse(
-        method_used=request.method,
+        method_used=ForecastMethodEnum(method.value),
         forecast_generated_at=result.forecast_generated_at,
         historical_months=result.historical_months,
         forecast_months=result.forecast_months,
         projections=projections,
-        summary=summary
+        summary=summary,
+        category_projections=category_projections
+    )
+
+
+@router.post("/generate", response_model=Union[ForecastResponse, ColumnarForecastResponse])
+async def generate_forecast(
+    request: ForecastRequest,
+    format: ForecastFormatEnum = Query(
+        default=ForecastFormatEnum.POINTS,
+        description="Response layout: one object per month, or one array per metric"
+    ),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Generate a financial forecast based on historical data.
+    
+    Uses the specified forecasting method to predict future:
+    - Revenue
+    - Expenses
+    - Cash balance
+    - Burn rate
+    - Runway
+    
+    Also provides confidence intervals and risk assessment. With
+    `by_category`, each revenue/expense category is projected as well.
+    
+    `format=columnar` returns each metric as an array parallel to `months`,
+    serialized straight from NumPy (smaller and cheaper for charts).
+    """
+    columnar = format == ForecastFormatEnum.COLUMNAR
+    
+    # Serve repeat requests from cache until the user's records change
+    cache_params = ("generate", request.method.value, request.periods, request.by_category, format.value)
+    version = await forecast_version(current_user)
+    cached = forecast_cache.get(current_user.id, version, *cache_params)
+    if cached is not None:
+        return ORJSONResponse(cached) if columnar else cached
+    
+    # Load the user's incremental forecast state (rebuilt from records if stale)
+    state = await get_forecast_state(current_user)
+    
+    if len(state.months) < 2:
+        raise HTTPException(
+            status_code=400,
+            detail="Insufficient data for forecasting. Need at least 2 months of financial records."
+        )
+    
+    # Generate forecast from state
+    try:
+        method, selection = _resolve_method(request.method, state)
+        result = await run_cpu_bound(
+            columnar_forecast_from_state if columnar else forecast_from_state,
+            state, periods=request.periods, method=method, selection=selection
+        )
+        
+        category_projections = None
+        if request.by_category:
+            if columnar:
+                totals = (result["revenue"], result["expenses"])
+            else:
+                totals = (
+                    [p.predicted_revenue for p in result.projections],
+                    [p.predicted_expenses for p in result.projections],
+                )
+            # One matrix pass over all categories, reconciled to the totals above
+            records = await _get_user_financial_data(current_user)
+            categories = await run_cpu_bound(
+                forecast_record_categories,
+                _records_to_dicts(records),
+                periods=request.periods,
+                method=method,
+                ensemble_weights=tuple(selection.ensemble_weights) if selection else DEFAULT_ENSEMBLE_WEIGHTS,
+                totals=totals
+            )
+            category_projections = {
+                field: np.round(predictions, 2) if columnar else np.round(predictions, 2).tolist()
+                for field, predictions in categories.items()
+            }
+    except ExecutorSaturatedError:
+        raise  # 503 with Retry-After
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Forecasting error: {str(e)}")
+    
+    if columnar:
+        # NumPy arrays go straight to orjson; no per-point objects
+        content = {**result, "category_projections": category_projections}
+        forecast_cache.set(current_user.id, version, *cache_params, value=content)
+        return ORJSONResponse(content)
+    
+    # Convert to response schema
+    response = _to_forecast_response(result, method, category_projections)
+    forecast_cache.set(current_user.id, version, *cache_params, value=response)
+    return response
+
+
+@router.post("/compare", response_model=ForecastComparisonResponse)
+async def compare_forecast_methods(
+    request: ForecastComparisonRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Forecast with every method at once for side-by-side comparison.
+    
+    One state read and one computation replace a /generate call per
+    method: the linear, moving-average and exponential-smoothing
+    predictions are computed once and the ensemble reuses them. Also
+    reports how far the methods diverge each month.
+    """
+    # Serve repeat requests from cache until the user's records change
+    version = await forecast_version(current_user)
+    cached = forecast_cache.get(current_user.id, version, "compare", request.periods)
+    if cached is not None:
+        return cached
+    
+    # Load the user's incremental forecast state (rebuilt from records if stale)
+    state = await get_forecast_state(current_user)
+    
+    if len(state.months) < 2:
+        raise HTTPException(
+            status_code=400,
+            detail="Insufficient data for forecasting. Need at least 2 months of financial records."
+        )
+    
+    try:
+        comparison = await run_cpu_bound(
+            compare_forecasts_from_state, state, periods=request.periods, selection=state.selection
+        )
+    except ExecutorSaturatedError:
+        raise  # 503 with Retry-After
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Forecasting error: {str(e)}")
+    
+    response = ForecastComparisonResponse(
+        **comparison.model_dump(exclude={"forecasts"}),
+        selected_method=ForecastMethodEnum(state.selection.method) if state.selection else None,
+        forecasts={
+            method: _to_forecast_response(result, ForecastMethod(method))
+            for method, result in comparison.forecasts.items()
+        }
     )
+    forecast_cache.set(current_user.id, version, "compare", request.periods, value=response)
+    return response
 
 
 @router.post("/project-to-date", response_model=ForecastPointResponse)
@@ -146,40 +299,35 @@ async def project_to_specific_date(
     Useful for answering questions like:
     "What will my runway be on July 2026?"
     """
-    # Fetch user's financial records
-    records = await _get_user_financial_data(current_user)
+    # Serve repeat requests from cache until the user's records change
+    version = await forecast_version(current_user)
+    cached = forecast_cache.get(current_user.id, version, "project", request.method.value, request.target_date)
+    if cached is not None:
+        return cached
     
-    if len(records) < 2:
+    # Load the user's incremental forecast state (rebuilt from records if stale)
+    state = await get_forecast_state(current_user)
+    
+    if len(state.months) < 2:
         raise HTTPException(
             status_code=400,
             detail="Insufficient data for forecasting. Need at least 2 months of financial records."
         )
     
-    # Convert records to dictionary format
-    records_data = []
-    for r in records:
-        records_data.append({
-            "month": r.month,
-            "revenue_recurring": r.revenue_recurring,
-            "revenue_one_time": r.revenue_one_time,
-            "expenses_salaries": r.expenses_salaries,
-            "expenses_marketing": r.expenses_marketing,
-            "expenses_infrastructure": r.expenses_infrastructure,
-            "expenses_other": r.expenses_other,
-            "cash_balance": r.cash_balance
-        })
-    
-    # Create forecast engine and project to date
+    # Project state to date
     try:
-        engine = create_forecast_from_records(records_data)
-        method = _convert_method(request.method)
-        result = engine.project_to_date(target_date=request.target_date, method=method)
+        method, selection = _resolve_method(request.method, state)
+        result = await run_cpu_bound(
+            project_state_to_date, state, target_date=request.target_date, method=method, selection=selection
+        )
+    except ExecutorSaturatedError:
+        raise  # 503 with Retry-After
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Projection error: {str(e)}")
     
-    return ForecastPointResponse(
+    response = ForecastPointResponse(
         month=result.month,
         predicted_revenue=result.predicted_revenue,
         predicted_expenses=result.predicted_expenses,
@@ -190,6 +338,88 @@ async def project_to_specific_date(
         confidence_upper=result.confidence_upper,
         risk_level=result.risk_level.value
     )
+    forecast_cache.set(current_user.id, version, "project", request.method.value, request.target_date, value=response)
+    return response
+
+
+@router.post("/monte-carlo", response_model=MonteCarloResponse)
+async def simulate_cash_paths(
+    request: MonteCarloRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Run a Monte Carlo simulation of future cash balance.
+    
+    Samples thousands of revenue/expense paths around the forecast and
+    reports P10/P50/P90 cash balance, the probability of running out of
+    cash by each month, and the distribution of runway.
+    """
+    # Fetch user's financial records
+    records = await _get_user_financial_data(current_user)
+    
+    if len(records) < 2:
+        raise HTTPException(
+            status_code=400,
+            detail="Insufficient data for forecasting. Need at least 2 months of financial records."
+        )
+    
+    if request.method == ForecastMethodEnum.AUTO:
+        method, selection = _resolve_method(request.method, await get_forecast_state(current_user))
+    else:
+        method, selection = _convert_method(request.method), None
+    
+    try:
+        weights = tuple(selection.ensemble_weights) if selection else DEFAULT_ENSEMBLE_WEIGHTS
+        engine = create_forecast_from_records(_records_to_dicts(records), ensemble_weights=weights)
+        result = await run_cpu_bound(
+            engine.monte_carlo_simulation,
+            periods=request.periods,
+            paths=request.paths,
+            method=method,
+            seed=request.seed
+        )
+    except ExecutorSaturatedError:
+        raise  # 503 with Retry-After
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Simulation error: {str(e)}")
+    
+    return MonteCarloResponse(
+        **result.model_dump(exclude={"method_used"}),
+        method_used=ForecastMethodEnum(method.value)
+    )
+
+
+@router.get("/selection", response_model=MethodSelectionResponse)
+async def get_method_selection(current_user: User = Depends(get_current_user)):
+    """
+    Get the forecasting method selected for the current user.
+    
+    Methods are compared by walk-forward backtesting on the user's own
+    history; the result is cached with the forecast state and reused by
+    "auto" forecasts until enough new months arrive.
+    """
+    state = await get_forecast_state(current_user)
+    selection = state.selection
+    if selection is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Insufficient data for backtesting. Need at least 4 months of financial records."
+        )
+    
+    return MethodSelectionResponse(
+        method=ForecastMethodEnum(selection.method),
+        ensemble_weights={
+            method.value: round(weight, 4)
+            for method, weight in zip(COMPONENT_METHODS, selection.ensemble_weights)
+        },
+        mape=selection.mape,
+        rmse=selection.rmse,
+        interval_months=len(selection.interval_lower),
+        evaluated_months=selection.evaluated_months,
+        evaluated_at=selection.evaluated_at
+    )
 
 
 @router.get("/methods", response_model=dict)
@@ -219,11 +449,17 @@ async def get_available_methods():
             },
             {
                 "id": "ensemble",
-                "name": "Ensemble (Recommended)",
+                "name": "Ensemble",
                 "description": "Combines multiple methods with weighted averaging. Most robust and accurate for varied data patterns.",
+                "best_for": "General use"
+            },
+            {
+                "id": "auto",
+                "name": "Automatic (Recommended)",
+                "description": "Backtests every method on your own history and uses the most accurate one, with learned ensemble weights and empirical prediction intervals.",
                 "best_for": "General use - recommended default"
             }
         ],
-        "default": "ensemble",
+        "default": "auto",
         "max_forecast_periods": 36
     }
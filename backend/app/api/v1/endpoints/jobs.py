@@ -0,0 +1,134 @@
+"""
+Ingestion Job Endpoints - Submit imports to run in the background and poll their progress
+"""
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from beanie import PydanticObjectId
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query
+from pydantic import BaseModel
+
+from app.api.v1.deps import get_current_user
+from app.models.ingestion_job import IngestionJob, IngestionJobStatus
+from app.models.user import User
+from app.services.csv_service import import_csv_upload
+from app.services.ingestion import IngestionLimitError
+from app.services.ingestion_jobs import ingestion_jobs
+from app.services.onboarding_extraction import extract_file
+
+router = APIRouter()
+
+RECENT_JOBS = 20
+
+
+# ============== Schemas ==============
+
+class IngestionJobResponse(BaseModel):
+    id: str
+    kind: str
+    filename: str
+    status: IngestionJobStatus
+    attempts: int
+    size_bytes: int
+    bytes_read: int
+    rows_parsed: int
+    total_rows: Optional[int] = None
+    months_upserted: int
+    progress: Optional[float] = None  # 0-1
+    eta_seconds: Optional[float] = None
+    errors: List[str] = []
+    result: Optional[Dict[str, Any]] = None  # Response of the synchronous endpoint, once finished
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+def job_response(job: IngestionJob) -> IngestionJobResponse:
+    return IngestionJobResponse(
+        id=str(job.id),
+        **job.model_dump(include={
+            "kind", "filename", "status", "attempts", "size_bytes", "bytes_read", "rows_parsed",
+            "total_rows", "months_upserted", "progress", "eta_seconds", "errors", "result",
+            "created_at", "started_at", "finished_at",
+        }),
+    )
+
+
+# ============== Job handlers ==============
+
+async def run_extract(file: UploadFile, user: User, options: Dict[str, Any]) -> Dict[str, Any]:
+    response = await extract_file(file, user, options.get("file_type_hint", "spreadsheet"), options.get("sheet"))
+    return response.model_dump(mode="json")
+
+
+async def run_financials_import(file: UploadFile, user: User, options: Dict[str, Any]) -> Dict[str, Any]:
+    return await import_csv_upload(file, user)
+
+
+ingestion_jobs.register("extract", run_extract)
+ingestion_jobs.register("financials_import", run_financials_import)
+
+
+async def submit_job(file: UploadFile, user: User, kind: str, **options: Any) -> IngestionJobResponse:
+    try:
+        job = await ingestion_jobs.submit(file, user, kind, **options)
+    except IngestionLimitError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return job_response(job)
+
+
+# ============== Endpoints ==============
+
+@router.post("/extract-from-file-enhanced", response_model=IngestionJobResponse, status_code=202)
+async def submit_extract_job(
+    file: UploadFile = File(...),
+    file_type_hint: str = Query("spreadsheet", description="Type hint: spreadsheet, bank_statement, stripe, pitch_deck"),
+    sheet: Optional[str] = Query(None, description="Excel sheet to import (default: the first sheet with financial columns)"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Queue /onboarding/extract-from-file-enhanced for a file and return the job at once.
+    Poll GET /jobs/{id}; the extraction response is in `result` when it finishes.
+    """
+    filename = file.filename.lower() if file.filename else ""
+    if not filename.endswith(('.csv', '.xlsx', '.xls', '.pdf')):
+        raise HTTPException(
+            status_code=400,
+            detail="Unsupported file type. Please upload CSV, Excel, or PDF."
+        )
+    return await submit_job(file, current_user, "extract", file_type_hint=file_type_hint, sheet=sheet)
+
+
+@router.post("/financials-import", response_model=IngestionJobResponse, status_code=202)
+async def submit_financials_import_job(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Queue /financials/import for a CSV file and return the job at once.
+    """
+    if not (file.filename or "").endswith('.csv'):
+        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV.")
+    return await submit_job(file, current_user, "financials_import")
+
+
+@router.get("/", response_model=List[IngestionJobResponse])
+async def list_jobs(current_user: User = Depends(get_current_user)):
+    """The user's most recent ingestion jobs, newest first."""
+    jobs = await IngestionJob.find(
+        IngestionJob.user.id == current_user.id
+    ).sort(-IngestionJob.created_at).limit(RECENT_JOBS).to_list()
+    return [job_response(job) for job in jobs]
+
+
+@router.get("/{job_id}", response_model=IngestionJobResponse)
+async def get_job(
+    job_id: PydanticObjectId,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Status of an ingestion job: rows parsed, months upserted, errors and ETA.
+    """
+    job = await IngestionJob.get(job_id)
+    if job is None or job.user.ref.id != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
@@ -16,7 +16,6 @@ from app.api.v1.deps import get_current_user
 from app.models.user import User
 from app.core.config import settings
 import os
-from groq import AsyncGroq
 
 # Default system configuration - uses environment variables
 SYSTEM_DEFAULT_PROVIDER = "groq"
@@ -302,6 +301,7 @@ async def test_llm_connection(
     
     try:
         if provider == "groq":
+            from groq import AsyncGroq
             client = AsyncGroq(api_key=api_key)
             response = await client.chat.completions.create(
                 messages=[
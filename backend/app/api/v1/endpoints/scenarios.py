@@ -8,6 +8,7 @@ business decisions before executing them.
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
 from app.api.v1.deps import get_current_user
+from app.core.executor import run_cpu_bound
 from app.models.user import User
 from app.models.financial import FinancialRecord
 from app.schemas.scenario import (
@@ -128,7 +129,7 @@ async def simulate_scenario(
     engine = create_scenario_engine_from_record(record)
     
     scenario_input = _convert_request_to_input(request)
-    result = engine.simulate_scenario(scenario_input)
+    result = await run_cpu_bound(engine.simulate_scenario, scenario_input)
     
     return _convert_result_to_response(result)
 
@@ -147,7 +148,7 @@ async def compare_scenarios(
     engine = create_scenario_engine_from_record(record)
     
     scenario_inputs = [_convert_request_to_input(s) for s in request.scenarios]
-    comparison = engine.compare_scenarios(scenario_inputs)
+    comparison = await run_cpu_bound(engine.compare_scenarios, scenario_inputs)
     
     return ScenarioComparisonResponse(
         baseline=FinancialSnapshotResponse(
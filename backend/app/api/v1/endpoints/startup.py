@@ -10,6 +10,12 @@ from app.api.v1.deps import get_current_user
 from app.models.user import User
 from app.models.financial import FinancialRecord
 from app.models.startup import StartupProfile as StartupProfileModel, UserSettings as UserSettingsModel
+from app.models.forecast_state import ForecastState
+from app.models.sheet_connection import SheetConnection
+from app.models.ledger_transaction import LedgerTransaction
+from app.services.forecast_state import record_month_written, record_totals
+from app.services.ingestion_jobs import ingestion_jobs
+from app.services.upload_fingerprints import forget_user
 
 router = APIRouter()
 
@@ -46,6 +52,7 @@ async def create_financial_record_from_profile(user: User, cash_balance: float,
         expenses_other=monthly_expenses * 0.1,
     )
     await record.create()
+    await record_month_written(user, record.month, *record_totals(record))
 
 
 # ============== Schemas ==============
@@ -443,6 +450,17 @@ async def delete_account(
     await FinancialRecord.find(
         FinancialRecord.user.id == current_user.id
     ).delete()
+    await ForecastState.find(
+        ForecastState.user.id == current_user.id
+    ).delete()
+    await SheetConnection.find(
+        SheetConnection.user.id == current_user.id
+    ).delete()
+    await LedgerTransaction.find(
+        LedgerTransaction.user.id == current_user.id
+    ).delete()
+    await forget_user(current_user)
+    await ingestion_jobs.delete_user_jobs(current_user)
     
     # Delete user
     await current_user.delete()
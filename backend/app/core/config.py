@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
@@ -12,6 +13,8 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     MONGODB_URI: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 1 day
+    # False: workers skip index creation at boot; run `python -m app.db.migrate` on deploy
+    DB_CREATE_INDEXES_ON_STARTUP: bool = True
 
     # LLM Configuration
     GROQ_API_KEY: str = ""
@@ -26,6 +29,44 @@ class Settings(BaseSettings):
     
     # Rate limiting
     RATE_LIMIT_PER_MINUTE: int = 60
+    
+    # Forecast result cache (per worker process)
+    FORECAST_CACHE_MAX_ENTRIES: int = 1024
+    FORECAST_CACHE_TTL_SECONDS: int = 300
+    
+    # CPU-bound work (forecasts, scenarios) runs off the event loop
+    CPU_EXECUTOR_KIND: Literal["thread", "process"] = "thread"
+    CPU_EXECUTOR_WORKERS: int = 2
+    CPU_EXECUTOR_QUEUE_DEPTH: int = 32  # Waiting jobs before requests get 503
+    
+    # PDF text extraction pool and per-document budget (see app/services/pdf_extraction.py)
+    PDF_EXECUTOR_KIND: Literal["thread", "process"] = "process"
+    PDF_EXECUTOR_WORKERS: int = 2
+    PDF_EXECUTOR_QUEUE_DEPTH: int = 8
+    PDF_PAGES_PER_JOB: int = 16  # Longer statements are extracted in parallel page ranges
+    PDF_MAX_PAGES: int = 200
+    PDF_TIME_BUDGET_SECONDS: float = 20.0
+    
+    # Upload ingestion memory ceiling (see app/services/ingestion.py)
+    INGEST_CHUNK_BYTES: int = 64 * 1024
+    INGEST_MAX_RECORD_BYTES: int = 1024 * 1024  # Largest single CSV record
+    INGEST_MAX_MONTHS: int = 1200  # Distinct months per upload
+    INGEST_MAX_ERRORS: int = 100  # Per-row error messages returned
+    INGEST_MAX_DOCUMENT_BYTES: int = 25 * 1024 * 1024  # PDF / Excel, read whole
+    INGEST_SCHEMA_SAMPLE_ROWS: int = 50  # Rows sampled to infer a spreadsheet's schema
+    
+    # Background ingestion jobs (see app/services/ingestion_jobs.py)
+    INGEST_JOB_WORKERS: int = 2  # Jobs processed at once per API process
+    INGEST_JOB_MAX_UPLOAD_BYTES: int = 200 * 1024 * 1024  # Stored in GridFS until the job ends
+    INGEST_JOB_MAX_ATTEMPTS: int = 3  # Runs interrupted by a restart are retried up to this
+    INGEST_JOB_LEASE_SECONDS: int = 60  # A running job not renewed for this long is taken over
+    INGEST_JOB_PROGRESS_SECONDS: float = 2.0  # Progress (and lease) write interval
+    INGEST_JOB_POLL_SECONDS: float = 5.0  # Idle workers look for jobs from other processes
+    
+    # Connected Google Sheets refresh (see app/services/sheet_sync.py)
+    SHEETS_SYNC_INTERVAL_SECONDS: int = 3600  # 0 disables background refresh
+    SHEETS_SYNC_POLL_SECONDS: float = 60.0  # How often the scheduler looks for due sheets
+    SHEETS_SYNC_CONCURRENCY: int = 4  # Sheets fetched and imported at once per process
 
     class Config:
         env_file = ".env"
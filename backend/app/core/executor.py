@@ -0,0 +1,126 @@
+"""
+CPU Executor - Runs CPU-bound work off the event loop
+
+Forecast and scenario computations are NumPy-bound; run inline they block
+the asyncio loop and stall every other request on the worker, /health
+included. Endpoints submit them here instead, to a thread or process pool
+configured in Settings (CPU_EXECUTOR_KIND / CPU_EXECUTOR_WORKERS). PDF
+text extraction has a separate pool, pdf_executor (PDF_EXECUTOR_*).
+
+Admission is bounded: at most CPU_EXECUTOR_WORKERS jobs run and
+CPU_EXECUTOR_QUEUE_DEPTH wait. Further submissions fail fast with
+ExecutorSaturatedError, which the API turns into 503 + Retry-After.
+
+Process pools use the "spawn" start method (forking a process that runs
+an event loop and MongoDB client threads is unsafe), so submitted
+callables and their arguments must be picklable: module-level functions
+or bound methods of plain engine objects.
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class CPUExecutor:
+    """
+    Bounded thread or process pool for CPU-bound jobs.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 2, queue_depth: int = 32):
+        """
+        Args:
+            kind: "thread" or "process"
+            workers: Pool size (jobs running at once)
+            queue_depth: Jobs allowed to wait for a worker before rejecting
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._pool: Optional[Executor] = None
+        self._pending = 0  # Running + waiting jobs
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Jobs currently running or waiting."""
+        return self._pending
+
+    def start(self) -> None:
+        """Create the pool (idempotent)."""
+        if self._pool is not None:
+            return
+        if self.kind == "process":
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cpu")
+        logger.info(f"CPU executor started ({self.kind}, {self.workers} workers)")
+
+    def shutdown(self) -> None:
+        """Cancel waiting jobs and wait for running ones to finish."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+            logger.info("CPU executor stopped")
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run fn(*args, **kwargs) in the pool and await its result.
+
+        Raises:
+            ExecutorSaturatedError: If workers and queue are all taken
+        """
+        with self._lock:
+            if self._pending >= self.workers + self.queue_depth:
+                raise ExecutorSaturatedError("Server is busy, please retry shortly")
+            self._pending += 1
+        try:
+            self.start()  # Lazily, for use outside the app lifespan (scripts)
+            future = self._pool.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._release(None)
+            raise
+        # Released when the job really ends, even if the awaiting request is cancelled
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+
+cpu_executor = CPUExecutor(
+    kind=settings.CPU_EXECUTOR_KIND,
+    workers=settings.CPU_EXECUTOR_WORKERS,
+    queue_depth=settings.CPU_EXECUTOR_QUEUE_DEPTH,
+)
+
+# PyMuPDF holds the GIL while extracting, so PDFs get their own (process) pool
+pdf_executor = CPUExecutor(
+    kind=settings.PDF_EXECUTOR_KIND,
+    workers=settings.PDF_EXECUTOR_WORKERS,
+    queue_depth=settings.PDF_EXECUTOR_QUEUE_DEPTH,
+)
+
+
+async def run_cpu_bound(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a CPU-bound callable on the shared executor."""
+    return await cpu_executor.run(fn, *args, **kwargs)
@@ -8,15 +8,25 @@ from app.core.config import settings
 from app.models.user import User
 from app.models.financial import FinancialRecord
 from app.models.startup import StartupProfile, UserSettings
+from app.models.forecast_state import ForecastState
+from app.models.ingestion_job import IngestionJob
+from app.models.upload_fingerprint import UploadFingerprint
+from app.models.sheet_connection import SheetConnection
+from app.models.ledger_transaction import LedgerTransaction
 import logging
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# Every Beanie document model; app.db.migrate manages their indexes
+DOCUMENT_MODELS = [User, FinancialRecord, StartupProfile, UserSettings, ForecastState, IngestionJob,
+                   UploadFingerprint, SheetConnection, LedgerTransaction]
+
 # Global client instance for connection reuse
 _client: AsyncIOMotorClient | None = None
 
 
-async def init_db():
+async def init_db(create_indexes: Optional[bool] = None, allow_index_dropping: bool = False):
     """
     Initialize MongoDB connection with Beanie ODM.
     
@@ -25,7 +35,17 @@ async def init_db():
     - Server selection timeout for faster failover
     - Compression enabled for reduced bandwidth
     - Retry writes enabled for reliability
+    - Index creation can be left to `python -m app.db.migrate`, so
+      workers only connect the pool at boot
+    
+    Args:
+        create_indexes: Create the models' declared indexes; defaults to
+                        settings.DB_CREATE_INDEXES_ON_STARTUP
+        allow_index_dropping: Also drop indexes no model declares
     """
+    if create_indexes is None:
+        create_indexes = settings.DB_CREATE_INDEXES_ON_STARTUP
+    
     global _client
     
     # Connection pool settings optimized for production
@@ -49,10 +69,12 @@ async def init_db():
     
     await init_beanie(
         database=_client.strata_ai,
-        document_models=[User, FinancialRecord, StartupProfile, UserSettings]
+        document_models=DOCUMENT_MODELS,
+        allow_index_dropping=allow_index_dropping,
+        skip_indexes=not create_indexes
     )
     
-    logger.info("MongoDB connection pool initialized")
+    logger.info(f"MongoDB connection pool initialized (indexes {'created' if create_indexes else 'skipped'})")
 
 
 async def close_db():
@@ -0,0 +1,158 @@
+"""
+Schema Migration - Creates and verifies MongoDB indexes
+
+With DB_CREATE_INDEXES_ON_STARTUP=False, API workers skip Beanie's
+index management at boot and only connect the pool. Indexes declared on
+the document models (`Indexed(...)` fields and `Settings.indexes`) are
+managed by this command instead, run once per deploy:
+
+    python -m app.db.migrate                         # create missing indexes, then verify
+    python -m app.db.migrate --check                 # verify only (exit 1 if any are missing)
+    python -m app.db.migrate --allow-index-dropping  # also drop undeclared indexes
+
+Before creating indexes it prepares the data they need: duplicate
+(user, month) FinancialRecords, which the unique user_month_unique index
+rejects, are merged into the most recently created one, and indexes a
+declared one replaces (REPLACED_INDEXES) are dropped.
+"""
+import argparse
+import asyncio
+import sys
+from collections import defaultdict
+from typing import Dict, List, Set, Type
+from uuid import uuid4
+
+from beanie import Document
+from beanie.odm.settings.document import IndexModelField
+from beanie.odm.utils.pydantic import get_model_fields
+from beanie.odm.utils.typing import get_index_attributes
+from bson import DBRef
+from pymongo import IndexModel
+
+from app.db.engine import DOCUMENT_MODELS, close_db, init_db
+from app.models.financial import FinancialRecord
+from app.models.forecast_state import ForecastState
+from app.models.upload_fingerprint import UploadFingerprint
+
+# Indexes superseded by a declared index on the same keys
+REPLACED_INDEXES: Dict[Type[Document], List[str]] = {
+    FinancialRecord: ["user_1_month_-1"],  # Non-unique; now user_month_unique
+}
+
+DELETE_BATCH = 1000
+
+
+def declared_indexes(model: Type[Document]) -> List[IndexModelField]:
+    """Indexes a model declares, merged the way Beanie creates them."""
+    indexes = [
+        IndexModelField(IndexModel([(field.alias or name, attributes[0])], **attributes[1]))
+        for name, field in get_model_fields(model).items()
+        if (attributes := get_index_attributes(field)) is not None
+    ]
+    return IndexModelField.merge_indexes(indexes, model.get_settings().indexes or [])
+
+
+async def missing_indexes(model: Type[Document]) -> List[IndexModelField]:
+    """Declared indexes absent from (or with different options in) the collection."""
+    information = await model.get_pymongo_collection().index_information()
+    existing = IndexModelField.from_pymongo_index_information(information)
+    return IndexModelField.list_difference(declared_indexes(model), existing)
+
+
+async def merge_duplicate_months() -> int:
+    """
+    Delete all but the most recently created FinancialRecord of each
+    duplicated (user, month), the way later imports overwrite earlier ones.
+    The users' forecast states are marked stale and the months dropped from
+    their upload fingerprints, as after any import.
+
+    Returns:
+        Number of records deleted
+    """
+    collection = FinancialRecord.get_pymongo_collection()
+    cursor = collection.aggregate([
+        {"$sort": {"created_at": -1, "_id": -1}},
+        {"$group": {"_id": {"user": "$user", "month": "$month"}, "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}},
+    ], allowDiskUse=True)
+    extra = []
+    months: Dict[DBRef, Set[str]] = defaultdict(set)
+    async for group in cursor:
+        months[group["_id"]["user"]].add(group["_id"]["month"])
+        extra.extend(group["ids"][1:])
+    for start in range(0, len(extra), DELETE_BATCH):
+        await collection.delete_many({"_id": {"$in": extra[start:start + DELETE_BATCH]}})
+
+    for user_ref, user_months in months.items():
+        user = {"user": user_ref}
+        # As mark_forecast_state_stale; a new revision id fails in-flight saves
+        await ForecastState.find(user).update(
+            {"$set": {"stale": True, "revision_id": uuid4()}, "$inc": {"version": 1}}
+        )
+        unset = {f"month_hashes.{month}": "" for month in user_months
+                 if month and "." not in month and not month.startswith("$")}
+        if unset:
+            await UploadFingerprint.get_pymongo_collection().update_many(user, {"$unset": unset})
+    return len(extra)
+
+
+async def drop_replaced_indexes() -> List[str]:
+    """Drop the REPLACED_INDEXES that exist; returns their names."""
+    dropped = []
+    for model, names in REPLACED_INDEXES.items():
+        collection = model.get_pymongo_collection()
+        information = await collection.index_information()
+        for name in names:
+            if name in information:
+                await collection.drop_index(name)
+                dropped.append(f"{model.get_settings().name}.{name}")
+    return dropped
+
+
+async def migrate(check: bool = False, allow_index_dropping: bool = False) -> Dict[str, List[IndexModelField]]:
+    """
+    Prepare the data and create (unless `check`), then verify, every
+    model's indexes.
+
+    Returns:
+        Mapping of collection name -> indexes still missing
+    """
+    if not check:
+        await init_db(create_indexes=False)
+        try:
+            merged = await merge_duplicate_months()
+            if merged:
+                print(f"financial_records: deleted {merged} duplicate (user, month) records")
+            for name in await drop_replaced_indexes():
+                print(f"dropped replaced index {name}")
+        finally:
+            await close_db()
+
+    await init_db(create_indexes=not check, allow_index_dropping=allow_index_dropping)
+    try:
+        return {
+            model.get_settings().name: await missing_indexes(model)
+            for model in DOCUMENT_MODELS
+        }
+    finally:
+        await close_db()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.db.migrate", description=__doc__.splitlines()[1])
+    parser.add_argument("--check", action="store_true", help="Only verify; do not create indexes")
+    parser.add_argument("--allow-index-dropping", action="store_true",
+                        help="Drop indexes that no model declares")
+    args = parser.parse_args()
+    if args.check and args.allow_index_dropping:
+        parser.error("--check and --allow-index-dropping are mutually exclusive")
+
+    missing = asyncio.run(migrate(check=args.check, allow_index_dropping=args.allow_index_dropping))
+    for collection, indexes in missing.items():
+        status = "ok" if not indexes else "MISSING " + ", ".join(index.name for index in indexes)
+        print(f"{collection}: {status}")
+    return 1 if any(missing.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,8 +7,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import ORJSONResponse
 from app.core.config import settings
+from app.core.executor import ExecutorSaturatedError, cpu_executor, pdf_executor
 from app.db.engine import init_db, close_db
-from app.api.v1.endpoints import auth, financials, ai, forecast, scenarios, roadmaps, startup, llm, onboarding
+from app.api.v1.endpoints import auth, financials, ai, forecast, scenarios, roadmaps, startup, llm, onboarding, jobs
+from app.services.ingestion_jobs import ingestion_jobs
+from app.services.sheet_sync import sheet_sync
 import time
 import logging
 from typing import Callable
@@ -29,9 +32,17 @@ async def lifespan(app: FastAPI):
     logger.info("Starting STRATA-AI API...")
     await init_db()
     logger.info("Database connected successfully")
+    cpu_executor.start()
+    pdf_executor.start()
+    ingestion_jobs.start()  # Resumes jobs left queued or interrupted by a restart
+    sheet_sync.start()
     yield
     # Shutdown
     logger.info("Shutting down STRATA-AI API...")
+    await ingestion_jobs.stop()
+    await sheet_sync.stop()
+    cpu_executor.shutdown()
+    pdf_executor.shutdown()
     await close_db()
     logger.info("Database connection closed")
 
@@ -67,6 +78,16 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(ExecutorSaturatedError)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturatedError):
+    """Back-pressure: ask clients to retry when the CPU pool is full."""
+    return ORJSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+
 # Request timing and caching middleware
 @app.middleware("http")
 async def add_headers_middleware(request: Request, call_next: Callable):
@@ -84,7 +105,7 @@ async def add_headers_middleware(request: Request, call_next: Callable):
     if any(p in path for p in ["/methods", "/templates", "/health"]):
         response.headers["Cache-Control"] = "public, max-age=3600"
     # User-specific data - no caching
-    elif any(p in path for p in ["/auth", "/financials", "/roadmaps"]):
+    elif any(p in path for p in ["/auth", "/financials", "/roadmaps", "/jobs"]):
         response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate"
     # AI/forecast results - short cache (5 min)
     elif any(p in path for p in ["/forecast", "/scenarios", "/ai"]):
@@ -108,6 +129,7 @@ app.include_router(roadmaps.router, prefix=f"{settings.API_V1_STR}/roadmaps", ta
 app.include_router(startup.router, prefix=f"{settings.API_V1_STR}/startup", tags=["startup"])
 app.include_router(llm.router, prefix=f"{settings.API_V1_STR}/llm", tags=["llm"])
 app.include_router(onboarding.router, prefix=f"{settings.API_V1_STR}/onboarding", tags=["onboarding"])
+app.include_router(jobs.router, prefix=f"{settings.API_V1_STR}/jobs", tags=["jobs"])
 
 
 @app.get("/", response_class=ORJSONResponse)
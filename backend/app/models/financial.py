@@ -1,7 +1,8 @@
-from typing import Optional
+from typing import Dict, Optional
 from datetime import datetime
 from beanie import Document, Link
 from pydantic import Field
+from pymongo import IndexModel
 from app.models.user import User
 
 class FinancialRecord(Document):
@@ -21,12 +22,17 @@ class FinancialRecord(Document):
     # Snapshot
     cash_balance: float  # Cash at end of month
     
+    # Source -> field -> total of the month's ledger transactions (see app/services/ledger.py)
+    ledger: Dict[str, Dict[str, float]] = {}
+    
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
         name = "financial_records"
         indexes = [
-            [("user", 1), ("month", -1)],  # Primary: user + month (desc for recent first)
+            # Primary: one record per user + month (also serves recent-first scans);
+            # bulk imports upsert on this key
+            IndexModel([("user", 1), ("month", 1)], name="user_month_unique", unique=True),
             [("user", 1), ("created_at", -1)],  # For listing recent records
             [("month", -1)],  # For date-range queries
         ]
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Forecast State Model - Incremental per-user forecast inputs
+"""
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from beanie import Document, Link
+from pydantic import BaseModel, Field, model_validator
+from pymongo import IndexModel
+from app.models.user import User
+
+
+class SeriesState(BaseModel):
+    """Running statistics for one monthly series (revenue or expenses)."""
+    level: float = 0.0  # Exponential smoothing level
+    sum_y: float = 0.0  # Sum of values (closed-form OLS)
+    sum_ty: float = 0.0  # Sum of index * value (closed-form OLS)
+    window: List[float] = []  # Last N values for the moving average
+
+
+class MethodSelection(BaseModel):
+    """Per-user forecasting method chosen by walk-forward backtesting."""
+    method: str  # Winning ForecastMethod value
+    ensemble_weights: List[float] = [0.4, 0.3, 0.3]  # Linear, moving average, exponential smoothing
+    # Empirical cash-balance error quantiles per lead month (empty = use CV bands)
+    interval_lower: List[float] = []
+    interval_upper: List[float] = []
+    mape: Dict[str, Optional[float]] = {}  # Per method; None when all actuals are zero
+    rmse: Dict[str, float] = {}  # Per method
+    evaluated_months: int = 0  # History length the backtest ran on
+    evaluated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ForecastInputs(BaseModel):
+    """
+    Everything the state-based forecasts read. Plain data, so a rebuild
+    can compute it on a process pool (see build_state).
+    """
+    months: List[str] = []  # Sorted months covered (index = time step)
+    revenue: SeriesState = Field(default_factory=SeriesState)
+    expenses: SeriesState = Field(default_factory=SeriesState)
+
+    # Cash balance statistics for confidence intervals (Welford: running mean
+    # and sum of squared deviations from it)
+    last_cash_balance: float = 0.0
+    mean_cash: float = 0.0
+    m2_cash: float = 0.0
+
+    # Backtest result reused by "auto" forecasts; refreshed on rebuild
+    selection: Optional[MethodSelection] = None
+
+
+class ForecastState(Document, ForecastInputs):
+    """
+    Per-user forecast state, updated in O(1) per appended or edited month.
+
+    `stale` is set when a write cannot be applied incrementally (bulk
+    imports, backfilled months); the state is then rebuilt from
+    FinancialRecords on the next forecast.
+
+    `version` is bumped on every write to the user's FinancialRecords and
+    keys the forecast result cache, so all workers see the same version.
+    """
+    user: Link[User]
+
+    stale: bool = False
+    version: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _rebuild_raw_cash_sums(cls, data: Any) -> Any:
+        # States stored with sum_cash / sum_cash_sq lack the Welford moments
+        if isinstance(data, dict) and "sum_cash_sq" in data and "m2_cash" not in data:
+            data = {**data, "stale": True}
+        return data
+
+    class Settings:
+        name = "forecast_states"
+        use_revision = True  # Concurrent writers fall back to a rebuild
+        indexes = [
+            IndexModel([("user", 1)], unique=True),  # One state per user
+        ]
+
+
+class ForecastVersion(BaseModel):
+    """Projection of ForecastState read before each cached forecast."""
+    version: int = 0
@@ -0,0 +1,65 @@
+"""
+Ingestion Job Model - Background file imports and their progress
+"""
+from enum import Enum
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from beanie import Document, Link, PydanticObjectId
+from pydantic import Field
+from pymongo import IndexModel
+from app.models.user import User
+
+JOB_RETENTION_SECONDS = 7 * 24 * 3600  # Finished jobs expire after a week
+
+
+class IngestionJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class IngestionJob(Document):
+    """
+    One uploaded file imported in the background.
+
+    The upload lives in GridFS (`upload_id`) until the job finishes, so a
+    queued job, or one whose worker died mid-run, is picked up again
+    after a restart. A running job belongs to `worker_id` while its lease
+    is renewed.
+    """
+    user: Link[User]
+    kind: str  # Registered handler: "extract" or "financials_import"
+    filename: str
+    options: Dict[str, Any] = {}  # Handler arguments (file_type_hint, sheet)
+    upload_id: Optional[PydanticObjectId] = None  # GridFS file; removed when the job ends
+    size_bytes: int = 0
+
+    status: IngestionJobStatus = IngestionJobStatus.QUEUED
+    attempts: int = 0
+    worker_id: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+
+    # Progress, written every INGEST_JOB_PROGRESS_SECONDS while running
+    bytes_read: int = 0
+    rows_parsed: int = 0
+    total_rows: Optional[int] = None
+    months_upserted: int = 0
+    progress: Optional[float] = None  # 0-1, by rows when the total is known, else by bytes
+    eta_seconds: Optional[float] = None
+
+    errors: List[str] = []
+    result: Optional[Dict[str, Any]] = None  # The handler's response body
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Settings:
+        name = "ingestion_jobs"
+        indexes = [
+            [("status", 1), ("created_at", 1)],  # Workers claim the oldest queued job
+            [("user", 1), ("created_at", -1)],  # For listing a user's recent jobs
+            # Only finished jobs have finished_at, so only they expire
+            IndexModel([("finished_at", 1)], expireAfterSeconds=JOB_RETENTION_SECONDS),
+        ]
@@ -0,0 +1,39 @@
+"""
+Ledger Transaction Model - Imported Stripe and bank transactions, per user
+"""
+from typing import Dict, Optional
+from datetime import datetime
+from beanie import Document, Link, PydanticObjectId
+from pydantic import Field
+from pymongo import IndexModel
+from app.models.user import User
+
+
+class LedgerTransaction(Document):
+    """
+    One transaction an import found, never modified once written.
+
+    `amounts` holds what the transaction adds to each FinancialRecord
+    field of its month (e.g. revenue_recurring for a Stripe charge,
+    expenses_other for its fee). Removing a transaction appends a
+    reversal: an entry with negated amounts whose `reverses` is the
+    original's id.
+    """
+    user: Link[User]
+    source: str  # "stripe" or "bank_statement"
+    external_id: str  # Stripe id, or a hash of the statement line; unique per user and source
+    month: str  # Format: "YYYY-MM"
+    amounts: Dict[str, float]
+    description: str = ""
+    reverses: Optional[PydanticObjectId] = None
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "ledger_transactions"
+        indexes = [
+            # Re-imported transactions are skipped by this index
+            IndexModel([("user", 1), ("source", 1), ("external_id", 1)], name="user_source_external_unique",
+                       unique=True),
+            [("user", 1), ("month", 1)],  # Listing and rebuilding a user's months
+        ]
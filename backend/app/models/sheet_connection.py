@@ -0,0 +1,40 @@
+"""
+Sheet Connection Model - Google Sheets kept in sync with a user's financials
+"""
+from typing import Any, Dict, Optional
+from datetime import datetime
+from beanie import Document, Link
+from pydantic import Field
+from pymongo import IndexModel
+from app.models.user import User
+
+
+class SheetConnection(Document):
+    """
+    A connected Google Sheet and what its last sync saw.
+
+    `etag` / `last_modified` make the next fetch conditional, and
+    `content_hash` skips parsing when the export comes back unchanged.
+    The background refresh claims a connection by moving `next_sync_at`
+    forward, so each sync runs in one process only.
+    """
+    user: Link[User]
+    sheet_id: str
+    sheet_url: str
+
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None  # SHA-256 of the last CSV export imported
+    last_response: Dict[str, Any] = {}  # Response of the last import
+    last_error: Optional[str] = None
+
+    last_synced_at: Optional[datetime] = None
+    next_sync_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "sheet_connections"
+        indexes = [
+            IndexModel([("user", 1), ("sheet_id", 1)], name="user_sheet_unique", unique=True),
+            [("next_sync_at", 1)],  # Background refresh picks due connections
+        ]
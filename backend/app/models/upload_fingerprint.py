@@ -0,0 +1,45 @@
+"""
+Upload Fingerprint Model - Content hashes of imported files, per user
+"""
+from typing import Any, Dict, List
+from datetime import datetime
+from beanie import Document, Link
+from pydantic import Field
+from pymongo import IndexModel
+from app.models.user import User
+
+FINGERPRINT_RETENTION_SECONDS = 30 * 24 * 3600  # Unused fingerprints expire after 30 days
+
+
+class UploadFingerprint(Document):
+    """
+    One file a user imported, identified by its SHA-256 and how it was imported.
+
+    `month_hashes` holds a content hash of the values the file wrote for
+    each month, for as long as they are the latest import of that month:
+    any later import writing a month removes it from every other
+    fingerprint. A fingerprint holding all of its `months` is complete,
+    and an identical re-upload is answered with its stored `response`.
+    """
+    user: Link[User]
+    kind: str  # Endpoint and options the file was imported with
+    digest: str  # SHA-256 of the file content
+    filename: str = ""
+    months: List[str] = []  # Months the file imports
+    month_hashes: Dict[str, str] = {}  # Month -> hash of the values written
+    response: Dict[str, Any] = {}  # Response body of the import
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    used_at: datetime = Field(default_factory=datetime.utcnow)
+
+    @property
+    def complete(self) -> bool:
+        """Every month the file imports still holds its values."""
+        return all(month in self.month_hashes for month in self.months)
+
+    class Settings:
+        name = "upload_fingerprints"
+        indexes = [
+            IndexModel([("user", 1), ("kind", 1), ("digest", 1)], name="user_kind_digest_unique", unique=True),
+            IndexModel([("used_at", 1)], expireAfterSeconds=FINGERPRINT_RETENTION_SECONDS),
+        ]
@@ -3,6 +3,7 @@ Pydantic schemas for forecast API requests and responses.
 """
 
 from typing import List, Optional, Dict, Any
+from datetime import datetime
 from pydantic import BaseModel, Field
 from enum import Enum
 
@@ -13,6 +14,13 @@ class ForecastMethodEnum(str, Enum):
     MOVING_AVERAGE = "moving_average"
     EXPONENTIAL_SMOOTHING = "exponential_smoothing"
     ENSEMBLE = "ensemble"
+    AUTO = "auto"  # Per-user method selected by backtesting
+
+
+class ForecastFormatEnum(str, Enum):
+    """Response layouts for generated forecasts."""
+    POINTS = "points"  # One object per month (default)
+    COLUMNAR = "columnar"  # One array per metric, parallel to `months`
 
 
 class RiskLevelEnum(str, Enum):
@@ -32,9 +40,23 @@ class ForecastRequest(BaseModel):
         description="Number of months to forecast (1-36)"
     )
     method: ForecastMethodEnum = Field(
-        default=ForecastMethodEnum.ENSEMBLE,
+        default=ForecastMethodEnum.AUTO,
         description="Forecasting method to use"
     )
+    by_category: bool = Field(
+        default=False,
+        description="Also project each revenue/expense category, reconciled to the totals"
+    )
+
+
+class ForecastComparisonRequest(BaseModel):
+    """Request schema for comparing all forecasting methods."""
+    periods: int = Field(
+        default=6,
+        ge=1,
+        le=36,
+        description="Number of months to forecast (1-36)"
+    )
 
 
 class ProjectToDateRequest(BaseModel):
@@ -45,7 +67,7 @@ class ProjectToDateRequest(BaseModel):
         description="Target date in YYYY-MM format"
     )
     method: ForecastMethodEnum = Field(
-        default=ForecastMethodEnum.ENSEMBLE,
+        default=ForecastMethodEnum.AUTO,
         description="Forecasting method to use"
     )
 
@@ -82,3 +104,95 @@ class ForecastResponse(BaseModel):
     forecast_months: int
     projections: List[ForecastPointResponse]
     summary: ForecastSummary
+    # Category field (e.g. expenses_salaries) -> monthly predictions, when by_category
+    category_projections: Optional[Dict[str, List[float]]] = None
+
+
+class ColumnarForecastResponse(BaseModel):
+    """Forecast as parallel per-metric arrays (format=columnar)."""
+    method_used: ForecastMethodEnum
+    forecast_generated_at: str
+    historical_months: int
+    forecast_months: int
+    months: List[str]
+    revenue: List[float]
+    expenses: List[float]
+    cash_balance: List[float]
+    burn_rate: List[float]
+    runway_months: List[float]
+    confidence_lower: List[float]
+    confidence_upper: List[float]
+    risk_level: List[RiskLevelEnum]
+    summary: ForecastSummary
+    category_projections: Optional[Dict[str, List[float]]] = None
+
+
+class ForecastComparisonResponse(BaseModel):
+    """Every forecasting method side by side, with how far they diverge."""
+    selected_method: Optional[ForecastMethodEnum] = None  # Method "auto" uses; None before backtesting
+    forecast_generated_at: str
+    historical_months: int
+    forecast_months: int
+    months: List[str]
+    forecasts: Dict[str, ForecastResponse]  # Keyed by method
+    # Per month, across methods
+    revenue_spread: List[float]
+    expenses_spread: List[float]
+    cash_balance_min: List[float]
+    cash_balance_max: List[float]
+    cash_balance_spread: List[float]
+    max_relative_spread: float  # Largest cash spread relative to mean predicted cash
+    risk_levels_agree: bool
+
+
+class MethodSelectionResponse(BaseModel):
+    """Backtest-selected forecasting method and per-method accuracy for a user."""
+    method: ForecastMethodEnum
+    ensemble_weights: Dict[str, float]
+    mape: Dict[str, Optional[float]]
+    rmse: Dict[str, float]
+    interval_months: int  # Lead months with empirical prediction intervals
+    evaluated_months: int
+    evaluated_at: datetime
+
+
+class MonteCarloRequest(BaseModel):
+    """Request schema for a Monte Carlo cash-path simulation."""
+    periods: int = Field(
+        default=12,
+        ge=1,
+        le=36,
+        description="Number of months to simulate (1-36)"
+    )
+    paths: int = Field(
+        default=10000,
+        ge=100,
+        le=50000,
+        description="Number of simulated revenue/expense paths"
+    )
+    method: ForecastMethodEnum = Field(
+        default=ForecastMethodEnum.AUTO,
+        description="Forecasting method for the central projection"
+    )
+    seed: Optional[int] = Field(
+        default=None,
+        description="Random seed for reproducible simulations"
+    )
+
+
+class MonteCarloResponse(BaseModel):
+    """Monte Carlo simulation response: cash percentiles and runway distribution."""
+    method_used: ForecastMethodEnum
+    forecast_generated_at: str
+    historical_months: int
+    forecast_months: int
+    paths: int
+    months: List[str]
+    cash_p10: List[float]
+    cash_p50: List[float]
+    cash_p90: List[float]
+    probability_cash_out: List[float]
+    runway_p10: Optional[float] = None
+    runway_p50: Optional[float] = None
+    runway_p90: Optional[float] = None
+    probability_survives_horizon: float
@@ -0,0 +1,47 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+from app.services.schema_inference import InferredSchema
+
+
+class FinancialDataExtracted(BaseModel):
+    latest_cash_balance: Optional[float] = None
+    average_monthly_expenses: Optional[float] = None
+    average_monthly_revenue: Optional[float] = None
+    months_of_data: int = 0
+    records_parsed: int = 0
+
+
+class StartupDataExtracted(BaseModel):
+    name: Optional[str] = None
+    industry: Optional[str] = None
+    stage: Optional[str] = None
+    team_size: Optional[int] = None
+
+
+class BankStatementData(BaseModel):
+    closing_balance: Optional[float] = None
+    monthly_expense_estimate: Optional[float] = None
+    monthly_income_estimate: Optional[float] = None
+    months_of_data: int = 0
+    transaction_count: int = 0
+
+
+class StripeData(BaseModel):
+    total_revenue: Optional[float] = None
+    total_refunds: Optional[float] = None
+    net_revenue: Optional[float] = None
+    transaction_count: int = 0
+
+
+class ExtractionResponse(BaseModel):
+    success: bool
+    message: str
+    financial_data: Optional[FinancialDataExtracted] = None
+    startup_data: Optional[StartupDataExtracted] = None
+    bank_statement_data: Optional[BankStatementData] = None
+    stripe_data: Optional[StripeData] = None
+    inferred_schema: Optional[InferredSchema] = None
+    records_created: int = 0
+    errors: List[str] = []
+    deduplicated: bool = False  # Identical to an earlier upload; answered without re-importing
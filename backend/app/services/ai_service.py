@@ -1,7 +1,15 @@
-from groq import AsyncGroq
 from app.core.config import settings
 
-client = AsyncGroq(api_key=settings.GROQ_API_KEY)
+_client = None
+
+
+def get_groq_client():
+    """Shared system Groq client; groq is imported on first use to keep cold start fast."""
+    global _client
+    if _client is None:
+        from groq import AsyncGroq
+        _client = AsyncGroq(api_key=settings.GROQ_API_KEY)
+    return _client
 
 async def generate_strategy_ideas(financial_summary: str, startup_context: str) -> str:
     """
@@ -44,7 +52,7 @@ async def generate_strategy_ideas(financial_summary: str, startup_context: str)
     """
 
     try:
-        chat_completion = await client.chat.completions.create(
+        chat_completion = await get_groq_client().chat.completions.create(
             messages=[
                 {"role": "system", "content": "You are an expert startup strategy advisor. Always provide detailed, actionable advice with specific steps and expected outcomes. Respond only in valid JSON format."},
                 {"role": "user", "content": prompt}
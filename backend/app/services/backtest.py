@@ -0,0 +1,211 @@
+"""
+Walk-Forward Backtesting for STRATA-AI
+
+Rolling-origin evaluation of every forecasting method on each user's own
+history. Origin t trains on months [0, t) and forecasts the next
+`horizon` months. All origins of all users are stacked as rows of one
+BatchForecastEngine (rows share a user's full history and differ only in
+length), so each method runs as a single vectorized pass.
+
+From the backtest errors it derives, per user:
+- The method with the lowest RMSE (MAPE is reported alongside)
+- Inverse-MSE ensemble weights
+- Empirical cash-balance error quantiles per lead month, used as
+  prediction intervals
+"""
+
+from typing import Dict, Hashable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from app.models.forecast_state import MethodSelection
+from app.services.forecast_engine import (
+    BatchForecastEngine,
+    ForecastMethod,
+    MonthlyDataPoint,
+    _project_cash_balances,
+)
+
+BACKTEST_HORIZON = 6  # Lead months evaluated per origin
+MIN_TRAIN_MONTHS = 3  # Shortest training prefix (one moving-average window)
+MIN_QUANTILE_SAMPLES = 3  # Errors needed at a lead month to estimate its quantiles
+INTERVAL_QUANTILES = (0.025, 0.975)  # Same 95% coverage as the CV bands
+
+# Ensemble components, in DEFAULT_ENSEMBLE_WEIGHTS order
+COMPONENT_METHODS = [
+    ForecastMethod.LINEAR,
+    ForecastMethod.MOVING_AVERAGE,
+    ForecastMethod.EXPONENTIAL_SMOOTHING,
+]
+# Candidates for selection; ties go to the earlier entry
+CANDIDATE_METHODS = [ForecastMethod.ENSEMBLE] + COMPONENT_METHODS
+
+
+def _grouped_quantiles(values: np.ndarray, groups: np.ndarray, n_groups: int,
+                       quantiles: Tuple[float, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Linear-interpolated quantiles of `values` within each group.
+
+    Returns:
+        Tuple of ((n_groups x quantiles) array, NaN for empty groups;
+        per-group sample counts)
+    """
+    counts = np.bincount(groups, minlength=n_groups)
+    result = np.full((n_groups, len(quantiles)), np.nan)
+    if len(values) == 0:
+        return result, counts
+
+    # Sort by value within group so each group is a contiguous sorted run
+    sorted_values = values[np.lexsort((values, groups))]
+    starts = np.cumsum(counts) - counts
+    present = counts > 0
+
+    positions = np.asarray(quantiles)[None, :] * (counts[present, None] - 1)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, counts[present, None] - 1)
+    base = starts[present, None]
+    low_values = sorted_values[base + lower]
+    result[present] = low_values + (sorted_values[base + upper] - low_values) * (positions - lower)
+    return result, counts
+
+
+def backtest_histories(histories: Mapping[Hashable, List[MonthlyDataPoint]],
+                       horizon: int = BACKTEST_HORIZON,
+                       min_train: int = MIN_TRAIN_MONTHS) -> Dict[Hashable, Optional[MethodSelection]]:
+    """
+    Backtest all methods for many users at once and select one per user.
+
+    Args:
+        histories: Mapping of user key -> list of MonthlyDataPoint objects
+        horizon: Lead months forecast from each origin
+        min_train: Months in the shortest training prefix
+
+    Returns:
+        Mapping of user key -> MethodSelection, or None for users with at
+        most `min_train` months (nothing to evaluate)
+    """
+    packed = BatchForecastEngine(histories)
+    n_users = len(packed.keys)
+
+    # One row per (user, origin) with origin in [min_train, length)
+    origins_per_user = np.maximum(packed.lengths - min_train, 0)
+    user_of_row = np.repeat(np.arange(n_users), origins_per_user)
+    first_row = np.cumsum(origins_per_user) - origins_per_user
+    origins = min_train + np.arange(len(user_of_row)) - first_row[user_of_row]
+    if len(user_of_row) == 0:
+        return {key: None for key in packed.keys}
+
+    revenues = packed.revenues[user_of_row]
+    expenses = packed.expenses[user_of_row]
+    cash_balances = packed.cash_balances[user_of_row]
+    engine = BatchForecastEngine.from_arrays(revenues, expenses, cash_balances, origins)
+
+    # Actuals at each lead; leads past the end of a history are masked out
+    targets = origins[:, None] + np.arange(horizon)
+    valid = targets < packed.lengths[user_of_row, None]
+    targets = np.minimum(targets, revenues.shape[1] - 1)
+    actual = np.stack([
+        np.take_along_axis(revenues, targets, axis=1),
+        np.take_along_axis(expenses, targets, axis=1),
+    ])
+
+    # (components x series x rows x horizon), unfloored like the engine's internals
+    components = np.stack([
+        np.stack([engine._predict_series(values, horizon, method) for values in (revenues, expenses)])
+        for method in COMPONENT_METHODS
+    ])
+
+    def per_user(row_values: np.ndarray) -> np.ndarray:
+        return np.bincount(user_of_row, weights=row_values, minlength=n_users)
+
+    def error_totals(predictions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Per-user sum of squared errors, sum of APEs and APE count."""
+        errors = np.maximum(predictions, 0) - actual
+        squared = np.where(valid, errors ** 2, 0.0).sum(axis=(0, 2))
+        nonzero = valid & (actual != 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ape = np.where(nonzero, np.abs(errors) / np.abs(actual), 0.0).sum(axis=(0, 2))
+        return per_user(squared), per_user(ape), per_user(nonzero.sum(axis=(0, 2)))
+
+    error_count = 2 * per_user(valid.sum(axis=1))  # Revenue and expenses
+    component_totals = [error_totals(predictions) for predictions in components]
+
+    # Inverse-MSE weights: components that backtested better count for more
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mse = np.array([squared for squared, _, _ in component_totals]) / error_count
+        inverse = 1 / np.maximum(mse, 1e-12)
+        weights = inverse / inverse.sum(axis=0)
+    ensemble = np.einsum("mr,msrh->srh", weights[:, user_of_row], components)
+
+    candidates = np.stack([ensemble] + list(components))
+    totals = [error_totals(ensemble)] + component_totals
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rmse = np.sqrt(np.array([squared for squared, _, _ in totals]) / error_count)
+        mape = np.array([ape / count for _, ape, count in totals])
+    winner = np.argmin(rmse, axis=0)
+
+    # Cash-balance errors of each user's winning method, projected from the origin
+    rows = np.arange(len(user_of_row))
+    chosen = np.maximum(candidates[winner[user_of_row], :, rows], 0)
+    cash_pred = _project_cash_balances(cash_balances[rows, origins - 1], chosen[:, 1] - chosen[:, 0])
+    cash_errors = np.take_along_axis(cash_balances, targets, axis=1) - cash_pred
+
+    lower = np.full((n_users, horizon), np.nan)
+    upper = np.full((n_users, horizon), np.nan)
+    for lead in range(horizon):
+        usable = valid[:, lead]
+        bounds, counts = _grouped_quantiles(
+            cash_errors[usable, lead], user_of_row[usable], n_users, INTERVAL_QUANTILES
+        )
+        enough = counts >= MIN_QUANTILE_SAMPLES
+        lower[enough, lead] = bounds[enough, 0]
+        upper[enough, lead] = bounds[enough, 1]
+
+    selections = {}
+    for u, key in enumerate(packed.keys):
+        if origins_per_user[u] == 0:
+            selections[key] = None
+            continue
+        # Sample counts shrink with lead time, so usable leads form a prefix
+        known = int(np.argmin(np.append(~np.isnan(lower[u]), False)))
+        selections[key] = MethodSelection(
+            method=CANDIDATE_METHODS[winner[u]].value,
+            ensemble_weights=weights[:, u].tolist(),
+            interval_lower=np.round(lower[u, :known], 2).tolist(),
+            interval_upper=np.round(upper[u, :known], 2).tolist(),
+            mape={
+                method.value: None if np.isnan(mape[i, u]) else round(float(mape[i, u]), 4)
+                for i, method in enumerate(CANDIDATE_METHODS)
+            },
+            rmse={method.value: round(float(rmse[i, u]), 2) for i, method in enumerate(CANDIDATE_METHODS)},
+            evaluated_months=int(packed.lengths[u]),
+        )
+    return selections
+
+
+def select_method(history: List[MonthlyDataPoint], horizon: int = BACKTEST_HORIZON) -> Optional[MethodSelection]:
+    """Backtest one user's history; None if it is too short to evaluate."""
+    if not history:
+        return None
+    return backtest_histories({0: history}, horizon=horizon)[0]
+
+
+def interval_offsets(selection: Optional[MethodSelection],
+                     periods: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Cash-balance (lower, upper) offsets for lead months 1..periods.
+
+    Leads beyond those the backtest could estimate reuse the last known
+    quantiles widened by sqrt(lead), as for accumulated (random-walk)
+    error. Returns None when the selection has no quantiles.
+    """
+    if selection is None or not selection.interval_lower:
+        return None
+    known = len(selection.interval_lower)
+    leads = np.arange(1, periods + 1)
+    index = np.minimum(leads, known) - 1
+    scale = np.sqrt(np.maximum(leads, known) / known)
+    return (
+        np.asarray(selection.interval_lower)[index] * scale,
+        np.asarray(selection.interval_upper)[index] * scale,
+    )
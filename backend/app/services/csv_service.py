@@ -1,25 +1,28 @@
-import csv
-import codecs
 from fastapi import UploadFile, HTTPException
-from app.models.financial import FinancialRecord
 from app.models.user import User
+from app.services.forecast_state import financial_records_changed
+from app.services.import_pipeline import MonthlyUpsertBatch
+from app.services.ingestion import BoundedErrors, IngestionLimitError, UploadCSVReader
+from app.services.upload_fingerprints import UploadImport
+
 
 async def process_csv_upload(file: UploadFile, user: User):
     """
     Parses a CSV file and creates FinancialRecords.
     Expected columns: month, revenue, expenses, cash_balance
+
+    The upload is streamed in chunks (never read whole, never blocking
+    the event loop) and written with one bulk upsert.
     """
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV.")
 
     records_created = 0
-    errors = []
+    errors = BoundedErrors()
+    batch = MonthlyUpsertBatch(user)
 
     try:
-        # Read file into memory
-        reader = csv.DictReader(codecs.iterdecode(file.file, 'utf-8'))
-
-        for row in reader:
+        async for row in UploadCSVReader(file):
             try:
                 # Basic validation & cleaning
                 month = row.get("month", "").strip()
@@ -30,35 +33,42 @@ async def process_csv_upload(file: UploadFile, user: User):
                 if not month:
                     continue
 
-                # Check existence
-                existing = await FinancialRecord.find_one(
-                    FinancialRecord.user.id == user.id,
-                    FinancialRecord.month == month
-                )
-                if existing:
-                    # Update existing
-                    existing.revenue_recurring = revenue
-                    existing.expenses_salaries = expenses  # Simplified mapping
-                    existing.cash_balance = cash
-                    await existing.save()
-                else:
-                    # Create new
-                    new_rec = FinancialRecord(
-                        user=user,
-                        month=month,
-                        revenue_recurring=revenue,
-                        expenses_salaries=expenses,  # Simplified mapping
-                        cash_balance=cash
-                    )
-                    await new_rec.create()
-
-                records_created += 1
+                batch.add(month, {
+                    "revenue_recurring": revenue,
+                    "expenses_salaries": expenses,  # Simplified mapping
+                    "cash_balance": cash,
+                })
+            except IngestionLimitError:
+                raise
             except ValueError:
                 errors.append(f"Invalid number format in row: {row}")
             except Exception as e:
                 errors.append(f"Error processing row {row}: {str(e)}")
 
+        # All months in one bulk upsert
+        result = await batch.write()
+        records_created = result.rows_written
+        errors.extend(result.errors)
+
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Could not parse CSV: {str(e)}")
+    finally:
+        if records_created:
+            await financial_records_changed(user)
 
-    return {"processed": records_created, "errors": errors}
+    return {"processed": records_created, "errors": errors.messages()}
+
+
+async def import_csv_upload(file: UploadFile, user: User):
+    """
+    process_csv_upload, fingerprinted: an identical re-upload returns the
+    stored result with `deduplicated: true` instead of being parsed again.
+    """
+    upload = await UploadImport.open(file, user, "financials_import")
+    duplicate = await upload.duplicate_response()
+    if duplicate is not None:
+        return {**duplicate, "deduplicated": True}
+    with upload:
+        result = await process_csv_upload(file, user)
+    await upload.save(result)
+    return result
@@ -0,0 +1,123 @@
+"""
+Streaming Excel Ingestion for STRATA-AI
+
+openpyxl's default mode builds every cell of every sheet as an object
+before the first row can be read, so a workbook takes many times its file
+size in memory. Workbooks are opened in read-only mode instead: sheets
+are parsed lazily from the zip as their rows are iterated, and sheets
+that are not imported are never parsed beyond their first rows.
+
+Financial models often keep the figures on one of several sheets, below
+a title block. select_sheet picks the requested sheet, or else the first
+sheet (the active one first) whose header row maps a date column and at
+least one amount column. The header row is detected within the first
+HEADER_SCAN_ROWS rows.
+"""
+
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.services.ingestion import current_progress, normalize_column_name
+from app.services.schema_inference import AMOUNT_FIELDS, DATE_FIELDS
+
+HEADER_SCAN_ROWS = 20
+ROWS_PER_YIELD = 1000  # Importers give the event loop a turn this often
+
+
+class ExcelSheet(NamedTuple):
+    """A worksheet and its detected header row."""
+    name: str
+    header_row: int  # 1-based
+    headers: List[str]  # Source column names ('' for blank header cells)
+
+
+def _header_fields(row: Tuple[Any, ...]) -> set:
+    return {normalize_column_name(value) for value in row if isinstance(value, str) and value.strip()}
+
+
+def detect_header(rows: Iterator[Tuple[Any, ...]]) -> Optional[Tuple[int, List[str]]]:
+    """
+    Find the header row among the first HEADER_SCAN_ROWS rows.
+
+    The first row naming a date column and an amount column wins; otherwise
+    the row naming the most known fields; otherwise the first non-empty row.
+
+    Returns:
+        Tuple of (1-based row number, headers), or None for an empty sheet
+    """
+    known = set(DATE_FIELDS) | set(AMOUNT_FIELDS)
+    best: Optional[Tuple[int, int, Tuple[Any, ...]]] = None  # (known fields, row number, row)
+    first: Optional[Tuple[int, Tuple[Any, ...]]] = None
+    for number, row in enumerate(rows, start=1):
+        if number > HEADER_SCAN_ROWS:
+            break
+        if first is None and any(value is not None and str(value).strip() for value in row):
+            first = (number, row)
+        fields = _header_fields(row)
+        if fields & set(DATE_FIELDS) and fields & set(AMOUNT_FIELDS):
+            best = (len(fields & known), number, row)
+            break
+        if fields & known and (best is None or len(fields & known) > best[0]):
+            best = (len(fields & known), number, row)
+
+    if best is not None:
+        _, number, row = best
+    elif first is not None:
+        number, row = first
+    else:
+        return None
+    return number, [str(value) if value is not None else '' for value in row]
+
+
+def open_workbook(source: BinaryIO):
+    """Open a workbook in read-only mode (cached values, not formulas). Close it when done."""
+    import openpyxl
+
+    return openpyxl.load_workbook(source, read_only=True, data_only=True)
+
+
+def select_sheet(workbook, sheet_name: Optional[str] = None) -> ExcelSheet:
+    """
+    Pick the sheet to import and detect its header row.
+
+    Args:
+        workbook: Workbook from open_workbook
+        sheet_name: Sheet to import (case-insensitive); auto-detected if None
+
+    Raises:
+        ValueError: If the named sheet doesn't exist or no sheet has data
+    """
+    if sheet_name is not None:
+        names = {name.lower(): name for name in workbook.sheetnames}
+        if sheet_name.lower() not in names:
+            raise ValueError(f"Sheet '{sheet_name}' not found. Sheets: {', '.join(workbook.sheetnames)}")
+        candidates = [names[sheet_name.lower()]]
+    else:
+        active = workbook.active.title if workbook.active is not None else None
+        candidates = sorted(workbook.sheetnames, key=lambda name: name != active)
+
+    fallback: Optional[ExcelSheet] = None
+    for name in candidates:
+        header = detect_header(workbook[name].iter_rows(max_row=HEADER_SCAN_ROWS, values_only=True))
+        if header is None:
+            continue
+        sheet = ExcelSheet(name, *header)
+        fields = _header_fields(tuple(sheet.headers))
+        if fields & set(DATE_FIELDS) and fields & set(AMOUNT_FIELDS):
+            return sheet
+        fallback = fallback or sheet
+    if fallback is None:
+        raise ValueError("No data found in workbook")
+    return fallback
+
+
+def iter_sheet_rows(workbook, sheet: ExcelSheet) -> Iterator[Dict[str, Any]]:
+    """Lazily yield the rows below the header, keyed by header."""
+    headers = sheet.headers
+    worksheet = workbook[sheet.name]
+    progress = current_progress()
+    if progress is not None and worksheet.max_row:  # From the sheet's dimension record, when saved
+        progress.total_rows = max(worksheet.max_row - sheet.header_row, 0)
+    for row in worksheet.iter_rows(min_row=sheet.header_row + 1, values_only=True):
+        if progress is not None:
+            progress.rows_parsed += 1
+        yield dict(zip(headers, row))
@@ -0,0 +1,74 @@
+"""
+Forecast Result Cache for STRATA-AI
+
+In-process LRU/TTL cache for forecast responses. Entries are keyed by
+(user, record-set version, *params) where params are typically the
+forecast method and horizon. The version is ForecastState.version,
+which every write to a user's FinancialRecords bumps in the database
+(see app/services/forecast_state.py), so older entries can never be hit
+again, by any worker, and simply age out of the LRU.
+
+A cache hit costs one projected read of that counter, but neither the
+FinancialRecord read nor the numeric work.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from app.core.config import settings
+
+
+class ForecastCache:
+    """
+    Thread-safe LRU cache with per-entry TTL, keyed by user and version.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300):
+        """
+        Args:
+            max_entries: Maximum number of cached results (LRU eviction beyond this)
+            ttl_seconds: Seconds an entry stays valid after being stored
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: Any, version: int, *params: Hashable) -> Optional[Any]:
+        """Return the cached value for (user, version, *params), or None."""
+        key = (str(user_id), version) + params
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, user_id: Any, version: int, *params: Hashable, value: Any) -> None:
+        """
+        Store a value for (user, version, *params). Pass the version read
+        before loading the data the value was computed from.
+        """
+        key = (str(user_id), version) + params
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+forecast_cache = ForecastCache(
+    max_entries=settings.FORECAST_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.FORECAST_CACHE_TTL_SECONDS,
+)
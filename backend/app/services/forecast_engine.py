@@ -8,16 +8,16 @@ Methods:
 - Linear Regression: Trend-based projection
 - Moving Average: Smoothed historical average
 - Exponential Smoothing: Weighted recent data emphasis
-- Monte Carlo Simulation: Probabilistic confidence intervals
+- Monte Carlo Simulation: Probabilistic cash paths and runway distribution
 """
 
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Optional, Tuple, Any, Hashable, Mapping, NamedTuple
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import numpy as np
-from sklearn.linear_model import LinearRegression
 from pydantic import BaseModel, Field
 from enum import Enum
+from app.services.regression import fit_linear, predict, sequential_total
 
 
 class ForecastMethod(str, Enum):
@@ -28,6 +28,11 @@ class ForecastMethod(str, Enum):
     ENSEMBLE = "ensemble"  # Combines multiple methods
 
 
+# Ensemble weights for (linear, moving average, exponential smoothing) when
+# no per-user weights have been learned by backtesting
+DEFAULT_ENSEMBLE_WEIGHTS = (0.4, 0.3, 0.3)
+
+
 class RiskLevel(str, Enum):
     """Risk assessment levels based on runway."""
     LOW = "low"
@@ -68,20 +73,59 @@ class ForecastResult(BaseModel):
     summary: Dict[str, Any]
 
 
+class MonteCarloResult(BaseModel):
+    """Distribution of simulated cash paths for a forecast horizon."""
+    method_used: ForecastMethod
+    forecast_generated_at: str
+    historical_months: int
+    forecast_months: int
+    paths: int
+    months: List[str]
+    cash_p10: List[float]  # Pessimistic cash balance per month
+    cash_p50: List[float]  # Median cash balance per month
+    cash_p90: List[float]  # Optimistic cash balance per month
+    probability_cash_out: List[float]  # P(cash has hit zero by each month)
+    runway_p10: Optional[float]  # Months until zero cash; None = beyond horizon
+    runway_p50: Optional[float]
+    runway_p90: Optional[float]
+    probability_survives_horizon: float
+
+
+class ForecastComparison(BaseModel):
+    """Forecasts of every method from one shared pass, with their divergence."""
+    forecast_generated_at: str
+    historical_months: int
+    forecast_months: int
+    months: List[str]
+    forecasts: Dict[str, ForecastResult]  # Keyed by ForecastMethod value
+    # Per month, across methods
+    revenue_spread: List[float]  # Max - min predicted revenue
+    expenses_spread: List[float]  # Max - min predicted expenses
+    cash_balance_min: List[float]
+    cash_balance_max: List[float]
+    cash_balance_spread: List[float]
+    max_relative_spread: float  # Largest cash spread / |mean predicted cash|
+    risk_levels_agree: bool  # Every method gives the same risk level each month
+
+
 class ForecastEngine:
     """
     Main forecasting engine that processes historical financial data
     and generates future projections.
     """
     
-    def __init__(self, historical_data: List[MonthlyDataPoint]):
+    def __init__(self, historical_data: List[MonthlyDataPoint],
+                 ensemble_weights: Tuple[float, float, float] = DEFAULT_ENSEMBLE_WEIGHTS):
         """
         Initialize the forecast engine with historical data.
         
         Args:
             historical_data: List of MonthlyDataPoint objects, sorted by month ascending
+            ensemble_weights: (linear, moving average, exponential smoothing) weights
+                              for the ensemble method
         """
         self.historical_data = sorted(historical_data, key=lambda x: x.month)
+        self.ensemble_weights = ensemble_weights
         self._prepare_arrays()
     
     def _prepare_arrays(self):
@@ -93,7 +137,8 @@ class ForecastEngine:
         self.burn_rates = self.expenses - self.revenues
         self.time_indices = np.arange(len(self.historical_data)).reshape(-1, 1)
     
-    def _calculate_risk_level(self, runway_months: float) -> RiskLevel:
+    @staticmethod
+    def _calculate_risk_level(runway_months: float) -> RiskLevel:
         """Determine risk level based on runway."""
         if runway_months < 3:
             return RiskLevel.CRITICAL
@@ -120,13 +165,10 @@ class ForecastEngine:
             # Not enough data for regression, return constant
             return np.full(periods, values[-1] if len(values) > 0 else 0), 0, values[-1] if len(values) > 0 else 0
         
-        model = LinearRegression()
-        model.fit(self.time_indices, values)
-        
-        future_indices = np.arange(len(values), len(values) + periods).reshape(-1, 1)
-        predictions = model.predict(future_indices)
+        fit = fit_linear(values)
+        predictions = predict(fit, len(values) + np.arange(periods))
         
-        return predictions, model.coef_[0], model.intercept_
+        return predictions, fit.slope, fit.intercept
     
     def _moving_average_forecast(self, values: np.ndarray, periods: int, window: int = 3) -> np.ndarray:
         """
@@ -173,8 +215,8 @@ class ForecastEngine:
             variance_pct = 0.2
         else:
             # Calculate coefficient of variation
-            std_dev = np.std(values)
-            mean_val = np.mean(values)
+            mean_val = sequential_total(values) / len(values)
+            std_dev = np.sqrt(sequential_total((values - mean_val) ** 2) / len(values))
             if mean_val != 0:
                 variance_pct = std_dev / abs(mean_val)
             else:
@@ -196,16 +238,28 @@ class ForecastEngine:
     def _ensemble_forecast(self, values: np.ndarray, periods: int) -> np.ndarray:
         """
         Combine multiple forecasting methods with weighted average.
-        Weights: Linear (40%), Moving Average (30%), Exponential Smoothing (30%)
+        Default weights: Linear (40%), Moving Average (30%), Exponential Smoothing (30%)
         """
         linear_pred, _, _ = self._linear_forecast(values, periods)
         ma_pred = self._moving_average_forecast(values, periods)
         es_pred = self._exponential_smoothing_forecast(values, periods)
         
         # Weighted combination
-        ensemble = 0.4 * linear_pred + 0.3 * ma_pred + 0.3 * es_pred
+        w_linear, w_ma, w_es = self.ensemble_weights
+        ensemble = w_linear * linear_pred + w_ma * ma_pred + w_es * es_pred
         return ensemble
     
+    def _predict_series(self, values: np.ndarray, periods: int, method: ForecastMethod) -> np.ndarray:
+        """Run the selected forecasting method over a single series."""
+        if method == ForecastMethod.LINEAR:
+            predictions, _, _ = self._linear_forecast(values, periods)
+            return predictions
+        elif method == ForecastMethod.MOVING_AVERAGE:
+            return self._moving_average_forecast(values, periods)
+        elif method == ForecastMethod.EXPONENTIAL_SMOOTHING:
+            return self._exponential_smoothing_forecast(values, periods)
+        return self._ensemble_forecast(values, periods)
+    
     def forecast(self, periods: int = 6, method: ForecastMethod = ForecastMethod.ENSEMBLE) -> ForecastResult:
         """
         Generate financial forecast for the specified number of periods.
@@ -220,101 +274,37 @@ class ForecastEngine:
         if len(self.historical_data) == 0:
             raise ValueError("No historical data provided for forecasting")
         
-        # Select forecasting function based on method
-        if method == ForecastMethod.LINEAR:
-            revenue_pred, _, _ = self._linear_forecast(self.revenues, periods)
-            expenses_pred, _, _ = self._linear_forecast(self.expenses, periods)
-        elif method == ForecastMethod.MOVING_AVERAGE:
-            revenue_pred = self._moving_average_forecast(self.revenues, periods)
-            expenses_pred = self._moving_average_forecast(self.expenses, periods)
-        elif method == ForecastMethod.EXPONENTIAL_SMOOTHING:
-            revenue_pred = self._exponential_smoothing_forecast(self.revenues, periods)
-            expenses_pred = self._exponential_smoothing_forecast(self.expenses, periods)
-        else:  # ENSEMBLE
-            revenue_pred = self._ensemble_forecast(self.revenues, periods)
-            expenses_pred = self._ensemble_forecast(self.expenses, periods)
+        revenue_pred = self._predict_series(self.revenues, periods, method)
+        expenses_pred = self._predict_series(self.expenses, periods, method)
+        
+        current_cash = self.cash_balances[-1] if len(self.cash_balances) > 0 else 0
         
-        # Ensure non-negative values
+        # Ensure non-negative values and project cash forward
         revenue_pred = np.maximum(revenue_pred, 0)
         expenses_pred = np.maximum(expenses_pred, 0)
-        
-        # Calculate burn rate predictions
         burn_rate_pred = expenses_pred - revenue_pred
-        
-        # Calculate cash balance projections
-        current_cash = self.cash_balances[-1] if len(self.cash_balances) > 0 else 0
-        cash_balance_pred = np.zeros(periods)
-        for i in range(periods):
-            if i == 0:
-                cash_balance_pred[i] = current_cash - burn_rate_pred[i]
-            else:
-                cash_balance_pred[i] = cash_balance_pred[i-1] - burn_rate_pred[i]
-        
-        # Ensure cash balance doesn't go below 0 for display purposes
-        cash_balance_pred = np.maximum(cash_balance_pred, 0)
+        cash_balance_pred = _project_cash_balances(np.float64(current_cash), burn_rate_pred)
         
         # Calculate confidence intervals for cash balance
         cash_lower, cash_upper = self._calculate_confidence_intervals(
             self.cash_balances, cash_balance_pred
         )
         
-        # Build forecast points
-        projections = []
-        for i in range(periods):
-            future_month = self._get_future_month(i + 1)
-            
-            # Calculate runway at this point
-            if burn_rate_pred[i] > 0:
-                runway = cash_balance_pred[i] / burn_rate_pred[i]
-            else:
-                runway = 999.9  # Profitable
-            
-            risk_level = self._calculate_risk_level(runway)
-            
-            projections.append(ForecastPoint(
-                month=future_month,
-                predicted_revenue=round(revenue_pred[i], 2),
-                predicted_expenses=round(expenses_pred[i], 2),
-                predicted_cash_balance=round(cash_balance_pred[i], 2),
-                predicted_burn_rate=round(burn_rate_pred[i], 2),
-                predicted_runway_months=round(runway, 1),
-                confidence_lower=round(max(0, cash_lower[i]), 2),
-                confidence_upper=round(cash_upper[i], 2),
-                risk_level=risk_level
-            ))
-        
-        # Generate summary statistics
-        avg_burn = np.mean(burn_rate_pred)
-        final_cash = cash_balance_pred[-1]
-        final_runway = projections[-1].predicted_runway_months
-        
-        # Determine when critical runway is reached (if applicable)
-        critical_month = None
-        for proj in projections:
-            if proj.risk_level == RiskLevel.CRITICAL:
-                critical_month = proj.month
-                break
-        
-        summary = {
-            "current_cash_balance": round(current_cash, 2),
-            "average_predicted_burn_rate": round(avg_burn, 2),
-            "final_predicted_cash_balance": round(final_cash, 2),
-            "final_predicted_runway_months": round(final_runway, 1),
-            "critical_runway_month": critical_month,
-            "trend": "declining" if avg_burn > 0 else "growing",
-            "recommendation": self._generate_recommendation(final_runway, critical_month)
-        }
-        
-        return ForecastResult(
-            method_used=method,
-            forecast_generated_at=datetime.utcnow().isoformat(),
+        return _build_forecast_result(
+            method=method,
+            last_month=self.months[-1],
             historical_months=len(self.historical_data),
-            forecast_months=periods,
-            projections=projections,
-            summary=summary
+            current_cash=current_cash,
+            revenue_pred=revenue_pred,
+            expenses_pred=expenses_pred,
+            burn_rate_pred=burn_rate_pred,
+            cash_balance_pred=cash_balance_pred,
+            cash_lower=cash_lower,
+            cash_upper=cash_upper,
         )
     
-    def _generate_recommendation(self, runway: float, critical_month: Optional[str]) -> str:
+    @staticmethod
+    def _generate_recommendation(runway: float, critical_month: Optional[str]) -> str:
         """Generate actionable recommendation based on forecast."""
         if runway >= 12:
             return "Runway is healthy. Focus on growth initiatives."
@@ -341,34 +331,541 @@ class ForecastEngine:
         if len(self.historical_data) == 0:
             raise ValueError("No historical data provided for forecasting")
         
-        last_month = datetime.strptime(self.months[-1], "%Y-%m")
-        target_month = datetime.strptime(target_date, "%Y-%m")
-        
-        # Calculate months difference
-        months_diff = (target_month.year - last_month.year) * 12 + (target_month.month - last_month.month)
-        
-        if months_diff <= 0:
-            raise ValueError("Target date must be in the future")
-        
-        if months_diff > 36:
-            raise ValueError("Forecast horizon limited to 36 months")
+        months_diff = _months_until(self.months[-1], target_date)
         
         # Generate full forecast and return the target point
         forecast_result = self.forecast(periods=months_diff, method=method)
         return forecast_result.projections[-1]
+    
+    def _relative_volatility(self, values: np.ndarray) -> float:
+        """
+        Estimate month-over-month relative volatility of a series.
+        Falls back to 20% when there are fewer than two usable changes.
+        """
+        previous = values[:-1]
+        usable = previous > 0
+        if np.count_nonzero(usable) < 2:
+            return 0.2
+        changes = np.diff(values)[usable] / previous[usable]
+        return float(np.clip(np.std(changes), 0.01, 1.0))
+    
+    def monte_carlo_simulation(self, periods: int = 12, paths: int = 10000,
+                               method: ForecastMethod = ForecastMethod.ENSEMBLE,
+                               seed: Optional[int] = None) -> MonteCarloResult:
+        """
+        Simulate revenue/expense paths around the point forecast.
+        
+        Each path multiplies the method's monthly predictions by independent
+        mean-one lognormal shocks scaled to the series' historical volatility
+        (drawn as antithetic pairs).
+        All paths are drawn at once as a (paths x periods) matrix, so the cost
+        is a handful of NumPy passes regardless of path count.
+        
+        Args:
+            periods: Number of months to simulate
+            paths: Number of simulated paths
+            method: Forecasting method used for the central projection
+            seed: Seed for numpy.random.Generator (for reproducible results)
+        
+        Returns:
+            MonteCarloResult with cash percentiles, cash-out probabilities
+            and the runway distribution
+        """
+        if len(self.historical_data) == 0:
+            raise ValueError("No historical data provided for forecasting")
+        
+        revenue_pred = np.maximum(self._predict_series(self.revenues, periods, method), 0)
+        expenses_pred = np.maximum(self._predict_series(self.expenses, periods, method), 0)
+        
+        sigma = np.array([
+            self._relative_volatility(self.revenues),
+            self._relative_volatility(self.expenses),
+        ])
+        # Antithetic draws: half the RNG work and lower estimator variance
+        rng = np.random.default_rng(seed)
+        half = rng.standard_normal((2, (paths + 1) // 2, periods))
+        shocks = np.concatenate([half, -half], axis=1)[:, :paths]
+        shocks = np.exp(sigma[:, None, None] * shocks - 0.5 * sigma[:, None, None] ** 2)
+        
+        # Unfloored cash per path so that zero crossings are visible
+        burn_paths = expenses_pred * shocks[1] - revenue_pred * shocks[0]
+        current_cash = self.cash_balances[-1]
+        cash_paths = current_cash - np.cumsum(burn_paths, axis=1)
+        
+        cashed_out = np.logical_or.accumulate(cash_paths <= 0, axis=1)
+        probability_cash_out = cashed_out.mean(axis=0)
+        
+        # Runway = first month with zero cash; paths that survive are infinite
+        runway = np.where(cashed_out[:, -1], np.argmax(cashed_out, axis=1) + 1.0, np.inf)
+        runway_p10, runway_p50, runway_p90 = (
+            None if np.isinf(q) else float(q)
+            for q in _sorted_quantiles(np.sort(runway), [0.1, 0.5, 0.9], interpolate=False)
+        )
+        
+        cash_p10, cash_p50, cash_p90 = np.maximum(
+            _sorted_quantiles(np.sort(cash_paths, axis=0), [0.1, 0.5, 0.9]), 0
+        )
+        
+        return MonteCarloResult(
+            method_used=method,
+            forecast_generated_at=datetime.utcnow().isoformat(),
+            historical_months=len(self.historical_data),
+            forecast_months=periods,
+            paths=paths,
+            months=_future_months(self.months[-1], periods),
+            cash_p10=np.round(cash_p10, 2).tolist(),
+            cash_p50=np.round(cash_p50, 2).tolist(),
+            cash_p90=np.round(cash_p90, 2).tolist(),
+            probability_cash_out=np.round(probability_cash_out, 4).tolist(),
+            runway_p10=runway_p10,
+            runway_p50=runway_p50,
+            runway_p90=runway_p90,
+            probability_survives_horizon=round(1 - float(probability_cash_out[-1]), 4),
+        )
 
 
-def create_forecast_from_records(records: List[dict]) -> ForecastEngine:
+def _sorted_quantiles(sorted_values: np.ndarray, quantiles: List[float],
+                      interpolate: bool = True) -> np.ndarray:
     """
-    Helper function to create a ForecastEngine from financial records.
+    Quantiles along axis 0 of an already-sorted array.
+    
+    Equivalent to np.quantile (linear, or "lower" when interpolate=False),
+    but np.sort is several times faster than the partition np.quantile
+    uses on (paths x periods) matrices.
+    """
+    positions = np.asarray(quantiles) * (len(sorted_values) - 1)
+    lower = np.floor(positions).astype(np.int64)
+    if not interpolate:
+        return sorted_values[lower]
+    upper = np.minimum(lower + 1, len(sorted_values) - 1)
+    weight = (positions - lower).reshape((-1,) + (1,) * (sorted_values.ndim - 1))
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * weight
+
+
+def _months_until(last_month: str, target_date: str) -> int:
+    """
+    Forecast horizon (in months) from the last historical month to a target.
+    
+    Raises:
+        ValueError: If the target is not in the future or beyond 36 months
+    """
+    last = datetime.strptime(last_month, "%Y-%m")
+    target = datetime.strptime(target_date, "%Y-%m")
+    
+    # Calculate months difference
+    months_diff = (target.year - last.year) * 12 + (target.month - last.month)
+    
+    if months_diff <= 0:
+        raise ValueError("Target date must be in the future")
+    
+    if months_diff > 36:
+        raise ValueError("Forecast horizon limited to 36 months")
+    
+    return months_diff
+
+
+def _future_months(last_month: str, periods: int) -> List[str]:
+    """Month labels (YYYY-MM) for the `periods` months following `last_month`."""
+    year, month = (int(part) for part in last_month.split("-"))
+    base = year * 12 + month - 1
+    return [f"{(base + i) // 12:04d}-{(base + i) % 12 + 1:02d}" for i in range(1, periods + 1)]
+
+
+def _project_cash_balances(current_cash: np.ndarray, burn_rate_pred: np.ndarray) -> np.ndarray:
+    """
+    Roll cash forward month by month: cash[i] = cash[i-1] - burn[i].
+    
+    Works on a single series or on a (users x periods) matrix; the result
+    is floored at 0 for display purposes.
+    """
+    steps = np.concatenate([np.expand_dims(current_cash, -1), burn_rate_pred], axis=-1)
+    return np.maximum(np.subtract.accumulate(steps, axis=-1)[..., 1:], 0)
+
+
+# Risk level for runway below each threshold (months), in order
+_RISK_THRESHOLDS = np.array([3, 6, 12])
+_RISK_LEVELS = [RiskLevel.CRITICAL, RiskLevel.HIGH, RiskLevel.MEDIUM, RiskLevel.LOW]
+
+
+def _runway_and_risk(cash_balance_pred: np.ndarray,
+                     burn_rate_pred: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Runway at each point (999.9 sentinel when profitable) and the index of
+    its risk level in _RISK_LEVELS, as ForecastEngine._calculate_risk_level.
+    """
+    runway = np.full(len(burn_rate_pred), 999.9)
+    burning = burn_rate_pred > 0
+    runway[burning] = cash_balance_pred[burning] / burn_rate_pred[burning]
+    return runway, np.searchsorted(_RISK_THRESHOLDS, runway, side="right")
+
+
+def _forecast_summary(current_cash: float, burn_rate_pred: np.ndarray, cash_balance_pred: np.ndarray,
+                      final_runway: float, critical_month: Optional[str]) -> Dict[str, Any]:
+    """Summary statistics shared by the object and columnar result formats."""
+    avg_burn = np.mean(burn_rate_pred)
+    return {
+        "current_cash_balance": round(float(current_cash), 2),
+        "average_predicted_burn_rate": round(float(avg_burn), 2),
+        "final_predicted_cash_balance": round(float(cash_balance_pred[-1]), 2),
+        "final_predicted_runway_months": round(final_runway, 1),
+        "critical_runway_month": critical_month,
+        "trend": "declining" if avg_burn > 0 else "growing",
+        "recommendation": ForecastEngine._generate_recommendation(final_runway, critical_month)
+    }
+
+
+def _build_forecast_result(
+    method: ForecastMethod,
+    last_month: str,
+    historical_months: int,
+    current_cash: float,
+    revenue_pred: np.ndarray,
+    expenses_pred: np.ndarray,
+    burn_rate_pred: np.ndarray,
+    cash_balance_pred: np.ndarray,
+    cash_lower: np.ndarray,
+    cash_upper: np.ndarray,
+) -> ForecastResult:
+    """Assemble projections and summary from one user's predicted series."""
+    periods = len(revenue_pred)
+    months = _future_months(last_month, periods)
+    
+    runway, risk_index = _runway_and_risk(cash_balance_pred, burn_rate_pred)
+    risk_levels = [_RISK_LEVELS[i] for i in risk_index]
+    
+    revenue_out = np.round(revenue_pred, 2).tolist()
+    expenses_out = np.round(expenses_pred, 2).tolist()
+    cash_out = np.round(cash_balance_pred, 2).tolist()
+    burn_out = np.round(burn_rate_pred, 2).tolist()
+    runway_out = np.round(runway, 1).tolist()
+    lower_out = np.round(np.maximum(cash_lower, 0), 2).tolist()
+    upper_out = np.round(cash_upper, 2).tolist()
+    
+    projections = [
+        ForecastPoint(
+            month=months[i],
+            predicted_revenue=revenue_out[i],
+            predicted_expenses=expenses_out[i],
+            predicted_cash_balance=cash_out[i],
+            predicted_burn_rate=burn_out[i],
+            predicted_runway_months=runway_out[i],
+            confidence_lower=lower_out[i],
+            confidence_upper=upper_out[i],
+            risk_level=risk_levels[i]
+        )
+        for i in range(periods)
+    ]
+    
+    # Determine when critical runway is reached (if applicable)
+    critical = np.flatnonzero(risk_index == 0)
+    critical_month = months[critical[0]] if len(critical) else None
+    
+    return ForecastResult(
+        method_used=method,
+        forecast_generated_at=datetime.utcnow().isoformat(),
+        historical_months=historical_months,
+        forecast_months=periods,
+        projections=projections,
+        summary=_forecast_summary(current_cash, burn_rate_pred, cash_balance_pred,
+                                  runway_out[-1], critical_month)
+    )
+
+
+def _build_columnar_forecast(
+    method: ForecastMethod,
+    last_month: str,
+    historical_months: int,
+    current_cash: float,
+    revenue_pred: np.ndarray,
+    expenses_pred: np.ndarray,
+    burn_rate_pred: np.ndarray,
+    cash_balance_pred: np.ndarray,
+    cash_lower: np.ndarray,
+    cash_upper: np.ndarray,
+) -> Dict[str, Any]:
+    """
+    Column-oriented counterpart of _build_forecast_result.
+    
+    Each metric is one rounded NumPy array, parallel to `months`, with no
+    per-point objects; ORJSONResponse serializes the arrays directly.
+    """
+    periods = len(revenue_pred)
+    months = _future_months(last_month, periods)
+    runway, risk_index = _runway_and_risk(cash_balance_pred, burn_rate_pred)
+    runway_out = np.round(runway, 1)
+    
+    critical = np.flatnonzero(risk_index == 0)
+    critical_month = months[critical[0]] if len(critical) else None
+    
+    return {
+        "method_used": method.value,
+        "forecast_generated_at": datetime.utcnow().isoformat(),
+        "historical_months": historical_months,
+        "forecast_months": periods,
+        "months": months,
+        "revenue": np.round(revenue_pred, 2),
+        "expenses": np.round(expenses_pred, 2),
+        "cash_balance": np.round(cash_balance_pred, 2),
+        "burn_rate": np.round(burn_rate_pred, 2),
+        "runway_months": runway_out,
+        "confidence_lower": np.round(np.maximum(cash_lower, 0), 2),
+        "confidence_upper": np.round(cash_upper, 2),
+        "risk_level": [_RISK_LEVELS[i].value for i in risk_index],
+        "summary": _forecast_summary(current_cash, burn_rate_pred, cash_balance_pred,
+                                     float(runway_out[-1]), critical_month),
+    }
+
+
+class BatchForecastArrays(NamedTuple):
+    """Raw (users x periods) forecast matrices, one row per user key."""
+    keys: List[Hashable]
+    revenue: np.ndarray
+    expenses: np.ndarray
+    burn_rate: np.ndarray
+    cash_balance: np.ndarray
+    cash_lower: np.ndarray
+    cash_upper: np.ndarray
+
+
+class BatchForecastEngine:
+    """
+    Vectorized forecasting engine for many users at once.
+    
+    Ragged per-user histories are packed into left-aligned, zero-padded
+    (users x months) matrices with a validity mask, so each method runs as
+    a few whole-matrix NumPy passes instead of one ForecastEngine per user.
+    Results match ForecastEngine.forecast for every user.
+    """
+    
+    def __init__(self, histories: Mapping[Hashable, List[MonthlyDataPoint]],
+                 ensemble_weights: Tuple[float, float, float] = DEFAULT_ENSEMBLE_WEIGHTS):
+        """
+        Initialize the batch engine with historical data.
+        
+        Args:
+            histories: Mapping of user key -> list of MonthlyDataPoint objects
+            ensemble_weights: (linear, moving average, exponential smoothing) weights
+                              for the ensemble method
+        """
+        self.ensemble_weights = ensemble_weights
+        self.keys = list(histories.keys())
+        empty = [key for key in self.keys if not histories[key]]
+        if empty:
+            raise ValueError(f"No historical data provided for forecasting: {empty}")
+        self._pack_arrays(histories)
+    
+    @classmethod
+    def from_arrays(cls, revenues: np.ndarray, expenses: np.ndarray, cash_balances: np.ndarray,
+                    lengths: np.ndarray, last_months: Optional[List[str]] = None,
+                    keys: Optional[List[Hashable]] = None,
+                    ensemble_weights: Tuple[float, float, float] = DEFAULT_ENSEMBLE_WEIGHTS) -> "BatchForecastEngine":
+        """
+        Build an engine from already-packed, left-aligned (rows x months) matrices.
+        
+        Entries past a row's length are ignored, so rows may share one full
+        history and differ only in length (e.g. backtest origins).
+        
+        Args:
+            lengths: Observed months per row (at least 1)
+            last_months: Last observed month (YYYY-MM) of each row; only
+                         needed for forecast(), not forecast_arrays()
+            keys: Row keys for forecast(); defaults to row indices
+        """
+        engine = cls.__new__(cls)
+        engine.ensemble_weights = ensemble_weights
+        engine.lengths = np.asarray(lengths, dtype=np.int64)
+        engine.keys = list(keys) if keys is not None else list(range(len(engine.lengths)))
+        engine.mask = np.arange(revenues.shape[1]) < engine.lengths[:, None]
+        engine.last_months = list(last_months) if last_months is not None else None
+        engine.revenues = revenues
+        engine.expenses = expenses
+        engine.cash_balances = cash_balances
+        rows = np.arange(len(engine.lengths))
+        engine.current_cash = cash_balances[rows, engine.lengths - 1] if len(rows) else np.zeros(0)
+        return engine
+    
+    def _pack_arrays(self, histories: Mapping[Hashable, List[MonthlyDataPoint]]):
+        """Pack ragged histories into padded matrices plus a validity mask."""
+        series = [sorted(histories[key], key=lambda x: x.month) for key in self.keys]
+        self.lengths = np.array([len(s) for s in series], dtype=np.int64)
+        width = int(self.lengths.max(initial=0))
+        self.mask = np.arange(width) < self.lengths[:, None]
+        self.last_months = [s[-1].month for s in series]
+        
+        # Boolean assignment fills row-major, matching the flattened order
+        flat = [point for s in series for point in s]
+        self.revenues = np.zeros((len(series), width))
+        self.expenses = np.zeros((len(series), width))
+        self.cash_balances = np.zeros((len(series), width))
+        self.revenues[self.mask] = [p.revenue for p in flat]
+        self.expenses[self.mask] = [p.expenses for p in flat]
+        self.cash_balances[self.mask] = [p.cash_balance for p in flat]
+        
+        rows = np.arange(len(series))
+        self.current_cash = self.cash_balances[rows, self.lengths - 1] if len(series) else np.zeros(0)
+    
+    def _linear_forecast(self, values: np.ndarray, periods: int) -> np.ndarray:
+        """Closed-form OLS trend per row; single-point rows stay constant."""
+        fit = fit_linear(values, lengths=self.lengths)
+        return predict(fit, self.lengths[:, None] + np.arange(periods))
+    
+    def _moving_average_forecast(self, values: np.ndarray, periods: int, window: int = 3) -> np.ndarray:
+        """Average of each row's last `window` observed months."""
+        cols = self.lengths[:, None] - window + np.arange(window)
+        tail = np.take_along_axis(values, np.clip(cols, 0, None), axis=1)
+        tail = np.where(cols >= 0, tail, 0.0)
+        ma_value = tail.sum(axis=1) / np.minimum(self.lengths, window)
+        return np.repeat(ma_value[:, None], periods, axis=1)
+    
+    def _exponential_smoothing_forecast(self, values: np.ndarray, periods: int, alpha: float = 0.3) -> np.ndarray:
+        """Simple exponential smoothing, advanced one column at a time across all rows."""
+        if values.shape[1] == 0:
+            return np.zeros((len(values), periods))
+        smoothed = values[:, 0].copy()
+        ragged = bool((self.lengths < values.shape[1]).any())
+        for t in range(1, values.shape[1]):
+            updated = alpha * values[:, t] + (1 - alpha) * smoothed
+            smoothed = np.where(t < self.lengths, updated, smoothed) if ragged else updated
+        return np.repeat(smoothed[:, None], periods, axis=1)
+    
+    def _ensemble_forecast(self, values: np.ndarray, periods: int) -> np.ndarray:
+        """Weighted combination matching ForecastEngine._ensemble_forecast."""
+        linear_pred = self._linear_forecast(values, periods)
+        ma_pred = self._moving_average_forecast(values, periods)
+        es_pred = self._exponential_smoothing_forecast(values, periods)
+        w_linear, w_ma, w_es = self.ensemble_weights
+        return w_linear * linear_pred + w_ma * ma_pred + w_es * es_pred
+    
+    def _predict_series(self, values: np.ndarray, periods: int, method: ForecastMethod) -> np.ndarray:
+        """Run the selected forecasting method over every row."""
+        if method == ForecastMethod.LINEAR:
+            return self._linear_forecast(values, periods)
+        elif method == ForecastMethod.MOVING_AVERAGE:
+            return self._moving_average_forecast(values, periods)
+        elif method == ForecastMethod.EXPONENTIAL_SMOOTHING:
+            return self._exponential_smoothing_forecast(values, periods)
+        return self._ensemble_forecast(values, periods)
+    
+    def _calculate_confidence_intervals(self, predictions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-row coefficient-of-variation bands, as in ForecastEngine."""
+        n = self.lengths.astype(np.float64)
+        mean_val = sequential_total(self.cash_balances, self.lengths) / n
+        deviations = self.cash_balances - mean_val[:, None]
+        std_dev = np.sqrt(sequential_total(deviations ** 2, self.lengths) / n)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance_pct = np.where((n >= 2) & (mean_val != 0), std_dev / np.abs(mean_val), 0.2)
+        
+        uncertainty_multipliers = 1 + 0.1 * np.arange(predictions.shape[1])
+        margin = predictions * variance_pct[:, None] * 1.96 * uncertainty_multipliers
+        return predictions - margin, predictions + margin
+    
+    def forecast_arrays(self, periods: int = 6,
+                        method: ForecastMethod = ForecastMethod.ENSEMBLE) -> BatchForecastArrays:
+        """
+        Compute forecasts for every user as (users x periods) matrices.
+        
+        This is the fast path for bulk jobs that only need the numbers.
+        """
+        revenue_pred = np.maximum(self._predict_series(self.revenues, periods, method), 0)
+        expenses_pred = np.maximum(self._predict_series(self.expenses, periods, method), 0)
+        burn_rate_pred = expenses_pred - revenue_pred
+        cash_balance_pred = _project_cash_balances(self.current_cash, burn_rate_pred)
+        cash_lower, cash_upper = self._calculate_confidence_intervals(cash_balance_pred)
+        
+        return BatchForecastArrays(
+            keys=self.keys,
+            revenue=revenue_pred,
+            expenses=expenses_pred,
+            burn_rate=burn_rate_pred,
+            cash_balance=cash_balance_pred,
+            cash_lower=cash_lower,
+            cash_upper=cash_upper,
+        )
+    
+    def forecast(self, periods: int = 6,
+                 method: ForecastMethod = ForecastMethod.ENSEMBLE) -> Dict[Hashable, ForecastResult]:
+        """
+        Generate a ForecastResult per user, keyed like the input histories.
+        """
+        arrays = self.forecast_arrays(periods=periods, method=method)
+        return {
+            key: _build_forecast_result(
+                method=method,
+                last_month=self.last_months[i],
+                historical_months=int(self.lengths[i]),
+                current_cash=self.current_cash[i],
+                revenue_pred=arrays.revenue[i],
+                expenses_pred=arrays.expenses[i],
+                burn_rate_pred=arrays.burn_rate[i],
+                cash_balance_pred=arrays.cash_balance[i],
+                cash_lower=arrays.cash_lower[i],
+                cash_upper=arrays.cash_upper[i],
+            )
+            for i, key in enumerate(self.keys)
+        }
+
+
+# Record fields summed into each forecast series
+CATEGORY_FIELDS = {
+    "revenue": ["revenue_recurring", "revenue_one_time"],
+    "expenses": ["expenses_salaries", "expenses_marketing", "expenses_infrastructure", "expenses_other"],
+}
+
+
+def forecast_record_categories(
+    records: List[dict],
+    periods: int = 6,
+    method: ForecastMethod = ForecastMethod.ENSEMBLE,
+    ensemble_weights: Tuple[float, float, float] = DEFAULT_ENSEMBLE_WEIGHTS,
+    totals: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Forecast every revenue and expense category of one user.
+    
+    The six category series are stacked into one (categories x months)
+    matrix and forecast in a single BatchForecastEngine pass, so the cost
+    is close to the two-series forecast. Every method is linear in its
+    input, so the category forecasts add up to the forecast of the totals;
+    after flooring at zero, each group's categories are scaled
+    proportionally so they sum to its total again.
     
     Args:
-        records: List of financial record dictionaries with keys:
-                 month, revenue_recurring, revenue_one_time, expenses_*, cash_balance
+        records: Financial record dictionaries (as for create_forecast_from_records)
+        totals: (revenue, expenses) predictions to reconcile to, e.g. those
+                of the aggregate forecast; defaults to the floored sums of
+                the category forecasts
     
     Returns:
-        ForecastEngine instance ready for forecasting
+        Mapping of category field -> predictions over `periods` months
     """
+    if not records:
+        raise ValueError("No historical data provided for forecasting")
+    ordered = sorted(records, key=lambda r: r["month"])
+    fields = [field for group in CATEGORY_FIELDS.values() for field in group]
+    values = np.array([[r.get(field, 0) for r in ordered] for field in fields], dtype=np.float64)
+    
+    # Category rows only use the engine's per-row methods; all share one length
+    engine = BatchForecastEngine.from_arrays(
+        values, values, values, np.full(len(fields), len(ordered)), ensemble_weights=ensemble_weights
+    )
+    predictions = engine._predict_series(values, periods, method)
+    
+    categories = {}
+    start = 0
+    for i, group in enumerate(CATEGORY_FIELDS.values()):
+        raw = predictions[start:start + len(group)]
+        start += len(group)
+        target = np.maximum(raw.sum(axis=0), 0) if totals is None else np.asarray(totals[i])
+        floored = np.maximum(raw, 0)
+        group_sum = floored.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.where(group_sum > 0, target / group_sum, 0.0)
+        categories.update(zip(group, floored * scale))
+    return categories
+
+
+def _records_to_data_points(records: List[dict]) -> List[MonthlyDataPoint]:
+    """Collapse financial record dictionaries into MonthlyDataPoints."""
     data_points = []
     for record in records:
         total_revenue = record.get("revenue_recurring", 0) + record.get("revenue_one_time", 0)
@@ -387,5 +884,37 @@ def create_forecast_from_records(records: List[dict]) -> ForecastEngine:
             cash_balance=record.get("cash_balance", 0),
             burn_rate=burn_rate
         ))
+    return data_points
+
+
+def create_forecast_from_records(records: List[dict],
+                                ensemble_weights: Tuple[float, float, float] = DEFAULT_ENSEMBLE_WEIGHTS) -> ForecastEngine:
+    """
+    Helper function to create a ForecastEngine from financial records.
+    
+    Args:
+        records: List of financial record dictionaries with keys:
+                 month, revenue_recurring, revenue_one_time, expenses_*, cash_balance
+        ensemble_weights: Weights for the ensemble method (e.g. learned by backtesting)
     
-    return ForecastEngine(data_points)
+    Returns:
+        ForecastEngine instance ready for forecasting
+    """
+    return ForecastEngine(_records_to_data_points(records), ensemble_weights=ensemble_weights)
+
+
+def create_batch_forecast_from_records(records_by_user: Mapping[Hashable, List[dict]]) -> BatchForecastEngine:
+    """
+    Helper function to create a BatchForecastEngine from many users' records.
+    
+    Args:
+        records_by_user: Mapping of user key -> list of financial record dictionaries
+                         (same shape as create_forecast_from_records expects)
+    
+    Returns:
+        BatchForecastEngine instance ready for forecasting
+    """
+    return BatchForecastEngine({
+        key: _records_to_data_points(records)
+        for key, records in records_by_user.items()
+    })
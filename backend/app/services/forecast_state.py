@@ -0,0 +1,454 @@
+"""
+Incremental Forecast State for STRATA-AI
+
+Keeps a persisted ForecastState per user holding everything the
+linear, moving-average and exponential-smoothing forecasts need:
+running OLS sums, the smoothing level, the moving-average window and
+cash-balance moments. Appending a month, or editing one whose previous
+values are known, updates that state in O(1); forecasting from it is
+O(periods) and needs a single small document instead of the full
+record history.
+
+Writes that cannot be applied incrementally (bulk imports, backfilled
+months, deletions) mark the state stale; it is rebuilt from
+FinancialRecords on the next forecast.
+
+Each rebuild also re-runs the walk-forward backtest and stores the
+per-user MethodSelection used by "auto" forecasts, so forecast requests
+reuse it instead of re-evaluating the methods.
+"""
+
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import numpy as np
+from beanie.exceptions import RevisionIdWasChanged
+from pymongo.errors import DuplicateKeyError
+
+from app.core.executor import run_cpu_bound
+from app.models.financial import FinancialRecord
+from app.models.forecast_state import ForecastInputs, ForecastState, ForecastVersion, MethodSelection, SeriesState
+from app.models.user import User
+from app.services.backtest import interval_offsets, select_method
+from app.services.forecast_engine import (
+    DEFAULT_ENSEMBLE_WEIGHTS,
+    ForecastComparison,
+    ForecastMethod,
+    ForecastPoint,
+    ForecastResult,
+    MonthlyDataPoint,
+    _build_columnar_forecast,
+    _build_forecast_result,
+    _months_until,
+    _project_cash_balances,
+)
+
+# Must match ForecastEngine defaults
+SMOOTHING_ALPHA = 0.3
+MOVING_AVERAGE_WINDOW = 3
+
+# Appended months after which the method selection is re-evaluated
+RESELECT_AFTER_MONTHS = 3
+
+
+# ============== State Updates (pure, O(1)) ==============
+
+def _append_value(series: SeriesState, index: int, value: float):
+    """Fold a new last value into a series' running statistics."""
+    if index == 0:
+        series.level = value
+    else:
+        series.level = SMOOTHING_ALPHA * value + (1 - SMOOTHING_ALPHA) * series.level
+    series.sum_y += value
+    series.sum_ty += index * value
+    series.window = (series.window + [value])[-MOVING_AVERAGE_WINDOW:]
+
+
+def _edit_value(series: SeriesState, index: int, count: int, old: float, new: float):
+    """Replace the value at `index` of a `count`-long series."""
+    delta = new - old
+
+    # The smoothing level is linear in the inputs, so an edit shifts it by
+    # the weight that position carries in the final level.
+    if index == 0:
+        weight = (1 - SMOOTHING_ALPHA) ** (count - 1)
+    else:
+        weight = SMOOTHING_ALPHA * (1 - SMOOTHING_ALPHA) ** (count - 1 - index)
+    series.level += weight * delta
+    series.sum_y += delta
+    series.sum_ty += index * delta
+
+    offset = index - (count - len(series.window))
+    if offset >= 0:
+        series.window[offset] = new
+
+
+def apply_month(state: ForecastInputs, month: str, revenue: float, expenses: float,
+                cash_balance: float,
+                previous: Optional[Tuple[float, float, float]] = None) -> bool:
+    """
+    Apply one month's totals to the state.
+
+    Args:
+        month: Month written (YYYY-MM)
+        revenue, expenses, cash_balance: New totals for that month
+        previous: (revenue, expenses, cash_balance) before the write, when
+                  the month already existed
+
+    Returns:
+        False if the write cannot be applied incrementally (a month
+        inserted before the last one, or an edit with unknown old values)
+    """
+    count = len(state.months)
+
+    if count == 0 or month > state.months[-1]:
+        _append_value(state.revenue, count, revenue)
+        _append_value(state.expenses, count, expenses)
+        state.months.append(month)
+        delta = cash_balance - state.mean_cash
+        state.mean_cash += delta / (count + 1)
+        state.m2_cash += delta * (cash_balance - state.mean_cash)
+        state.last_cash_balance = cash_balance
+        return True
+
+    index = bisect_left(state.months, month)
+    if previous is None or index >= count or state.months[index] != month:
+        return False
+
+    old_revenue, old_expenses, old_cash = previous
+    _edit_value(state.revenue, index, count, old_revenue, revenue)
+    _edit_value(state.expenses, index, count, old_expenses, expenses)
+    old_mean = state.mean_cash
+    state.mean_cash += (cash_balance - old_cash) / count
+    state.m2_cash += (cash_balance - old_cash) * (cash_balance - state.mean_cash + old_cash - old_mean)
+    if index == count - 1:
+        state.last_cash_balance = cash_balance
+    return True
+
+
+def record_totals(record: FinancialRecord) -> Tuple[float, float, float]:
+    """(revenue, expenses, cash_balance) totals of a financial record."""
+    revenue = record.revenue_recurring + record.revenue_one_time
+    expenses = (
+        record.expenses_salaries +
+        record.expenses_marketing +
+        record.expenses_infrastructure +
+        record.expenses_other
+    )
+    return revenue, expenses, record.cash_balance
+
+
+def build_state(totals: List[Tuple[str, float, float, float]]) -> ForecastInputs:
+    """
+    Build fresh inputs by replaying (month, revenue, expenses, cash_balance)
+    totals (sorted by month) in O(n), and backtest the methods on them to
+    select one for "auto" forecasts.
+
+    Takes and returns plain data, so it runs on a process pool: the
+    ForecastState document is filled in on the event loop.
+    """
+    state = ForecastInputs()
+    history = []
+    for month, revenue, expenses, cash_balance in totals:
+        apply_month(state, month, revenue, expenses, cash_balance)
+        history.append(MonthlyDataPoint(
+            month=month, revenue=revenue, expenses=expenses, cash_balance=cash_balance
+        ))
+    state.selection = select_method(history)
+    return state
+
+
+# ============== Forecasting From State ==============
+
+def _component_predictions(series: SeriesState, count: int, periods: int) -> Dict[ForecastMethod, np.ndarray]:
+    """Linear, moving-average and exponential-smoothing predictions of a series."""
+    if count < 2:
+        linear = np.full(periods, series.window[-1])
+    else:
+        n = float(count)
+        t_mean = (n - 1) / 2
+        sxx = n * (n * n - 1) / 12
+        slope = (series.sum_ty - t_mean * series.sum_y) / sxx
+        intercept = series.sum_y / n - slope * t_mean
+        linear = intercept + slope * (n + np.arange(periods))
+
+    return {
+        ForecastMethod.LINEAR: linear,
+        ForecastMethod.MOVING_AVERAGE: np.full(periods, sum(series.window) / len(series.window)),
+        ForecastMethod.EXPONENTIAL_SMOOTHING: np.full(periods, series.level),
+    }
+
+
+def _combine_components(components: Dict[ForecastMethod, np.ndarray], method: ForecastMethod,
+                        ensemble_weights=DEFAULT_ENSEMBLE_WEIGHTS) -> np.ndarray:
+    """Pick one component prediction, or weight all three for the ensemble."""
+    if method != ForecastMethod.ENSEMBLE:
+        return components[method]
+
+    # ENSEMBLE: same combination as ForecastEngine._ensemble_forecast
+    w_linear, w_ma, w_es = ensemble_weights
+    return (
+        w_linear * components[ForecastMethod.LINEAR] +
+        w_ma * components[ForecastMethod.MOVING_AVERAGE] +
+        w_es * components[ForecastMethod.EXPONENTIAL_SMOOTHING]
+    )
+
+
+def _state_predictions(state: ForecastInputs, periods: int, method: ForecastMethod,
+                       selection: Optional[MethodSelection],
+                       components: Optional[Tuple[Dict, Dict]] = None) -> Dict[str, Any]:
+    """
+    Predicted series for a result builder (_build_forecast_result's arguments).
+
+    Args:
+        components: Precomputed (revenue, expenses) _component_predictions,
+                    shared when forecasting several methods
+    """
+    count = len(state.months)
+    if count == 0:
+        raise ValueError("No historical data provided for forecasting")
+
+    if components is None:
+        components = (
+            _component_predictions(state.revenue, count, periods),
+            _component_predictions(state.expenses, count, periods),
+        )
+    weights = tuple(selection.ensemble_weights) if selection else DEFAULT_ENSEMBLE_WEIGHTS
+    revenue_pred = np.maximum(_combine_components(components[0], method, weights), 0)
+    expenses_pred = np.maximum(_combine_components(components[1], method, weights), 0)
+    burn_rate_pred = expenses_pred - revenue_pred
+    cash_balance_pred = _project_cash_balances(np.float64(state.last_cash_balance), burn_rate_pred)
+
+    offsets = interval_offsets(selection, periods)
+    if offsets is not None:
+        cash_lower, cash_upper = cash_balance_pred + offsets[0], cash_balance_pred + offsets[1]
+    else:
+        # Same coefficient-of-variation bands as ForecastEngine
+        variance_pct = 0.2
+        if count >= 2:
+            mean_val = state.mean_cash
+            std_dev = np.sqrt(max(state.m2_cash / count, 0.0))
+            if mean_val != 0:
+                variance_pct = std_dev / abs(mean_val)
+        margin = cash_balance_pred * variance_pct * 1.96 * (1 + 0.1 * np.arange(periods))
+        cash_lower, cash_upper = cash_balance_pred - margin, cash_balance_pred + margin
+
+    return dict(
+        method=method,
+        last_month=state.months[-1],
+        historical_months=count,
+        current_cash=state.last_cash_balance,
+        revenue_pred=revenue_pred,
+        expenses_pred=expenses_pred,
+        burn_rate_pred=burn_rate_pred,
+        cash_balance_pred=cash_balance_pred,
+        cash_lower=cash_lower,
+        cash_upper=cash_upper,
+    )
+
+
+def forecast_from_state(state: ForecastInputs, periods: int = 6,
+                        method: ForecastMethod = ForecastMethod.ENSEMBLE,
+                        selection: Optional[MethodSelection] = None) -> ForecastResult:
+    """
+    Generate a ForecastResult from persisted state in O(periods).
+
+    Matches ForecastEngine.forecast on the same history up to
+    floating-point summation order.
+
+    Args:
+        selection: Backtest result whose ensemble weights and empirical
+                   error quantiles replace the defaults (for "auto")
+    """
+    return _build_forecast_result(**_state_predictions(state, periods, method, selection))
+
+
+def columnar_forecast_from_state(state: ForecastInputs, periods: int = 6,
+                                 method: ForecastMethod = ForecastMethod.ENSEMBLE,
+                                 selection: Optional[MethodSelection] = None) -> Dict[str, Any]:
+    """
+    Same forecast as forecast_from_state, as parallel per-metric NumPy
+    arrays (see _build_columnar_forecast) for the columnar API format.
+    """
+    return _build_columnar_forecast(**_state_predictions(state, periods, method, selection))
+
+
+def compare_forecasts_from_state(state: ForecastInputs, periods: int = 6,
+                                selection: Optional[MethodSelection] = None) -> ForecastComparison:
+    """
+    Forecast every method from persisted state in one pass.
+
+    The three component series are predicted once and shared: each
+    method picks one of them and the ensemble weights all three.
+
+    Args:
+        selection: Backtest result; its ensemble weights apply to the
+                   ensemble and its empirical intervals only to the method
+                   it selected (the others keep the CV bands)
+    """
+    count = len(state.months)
+    if count == 0:
+        raise ValueError("No historical data provided for forecasting")
+    components = (
+        _component_predictions(state.revenue, count, periods),
+        _component_predictions(state.expenses, count, periods),
+    )
+
+    forecasts = {}
+    for method in ForecastMethod:
+        method_selection = selection
+        if selection is not None and selection.method != method.value:
+            method_selection = selection.model_copy(update={"interval_lower": [], "interval_upper": []})
+        forecasts[method.value] = _build_forecast_result(
+            **_state_predictions(state, periods, method, method_selection, components)
+        )
+
+    def metric(name: str) -> np.ndarray:
+        """(methods x periods) array of one ForecastPoint field."""
+        return np.array([[getattr(p, name) for p in result.projections] for result in forecasts.values()])
+
+    revenue = metric("predicted_revenue")
+    expenses = metric("predicted_expenses")
+    cash = metric("predicted_cash_balance")
+    risk = metric("risk_level")
+    cash_min, cash_max = cash.min(axis=0), cash.max(axis=0)
+    cash_spread = cash_max - cash_min
+    mean_cash = np.abs(cash.mean(axis=0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        relative = np.where(mean_cash > 0, cash_spread / mean_cash, 0.0)
+
+    first = next(iter(forecasts.values()))
+    return ForecastComparison(
+        forecast_generated_at=first.forecast_generated_at,
+        historical_months=count,
+        forecast_months=periods,
+        months=[p.month for p in first.projections],
+        forecasts=forecasts,
+        revenue_spread=np.round(np.ptp(revenue, axis=0), 2).tolist(),
+        expenses_spread=np.round(np.ptp(expenses, axis=0), 2).tolist(),
+        cash_balance_min=np.round(cash_min, 2).tolist(),
+        cash_balance_max=np.round(cash_max, 2).tolist(),
+        cash_balance_spread=np.round(cash_spread, 2).tolist(),
+        max_relative_spread=round(float(relative.max()), 4),
+        risk_levels_agree=bool((risk == risk[0]).all()),
+    )
+
+
+def project_state_to_date(state: ForecastInputs, target_date: str,
+                          method: ForecastMethod = ForecastMethod.ENSEMBLE,
+                          selection: Optional[MethodSelection] = None) -> ForecastPoint:
+    """Project persisted state to a specific future month (YYYY-MM)."""
+    if not state.months:
+        raise ValueError("No historical data provided for forecasting")
+    months_diff = _months_until(state.months[-1], target_date)
+    result = forecast_from_state(state, periods=months_diff, method=method, selection=selection)
+    return result.projections[-1]
+
+
+# ============== Persistence ==============
+
+async def _load_state(user: User) -> Optional[ForecastState]:
+    return await ForecastState.find_one(ForecastState.user.id == user.id)
+
+
+async def forecast_version(user: User) -> int:
+    """
+    Version of the user's FinancialRecords for the forecast cache (0 until
+    the first forecast). Only the counter is read.
+    """
+    found = await ForecastState.find_one(ForecastState.user.id == user.id, projection_model=ForecastVersion)
+    return found.version if found else 0
+
+
+async def get_forecast_state(user: User) -> ForecastState:
+    """
+    Load the user's forecast state, rebuilding it from FinancialRecords
+    when it is missing or stale.
+    """
+    state = await _load_state(user)
+    if state is not None and not state.stale:
+        return state
+
+    if state is None:
+        # Insert a stale placeholder before reading the records, so a bulk
+        # write during the build marks it and the save below fails on its
+        # revision instead of persisting a state that missed the write.
+        state = ForecastState(user=user, stale=True)
+        try:
+            await state.insert()
+        except DuplicateKeyError:
+            # A concurrent request inserted it first
+            state = await _load_state(user)
+            if state is not None and not state.stale:
+                return state
+
+    records = await FinancialRecord.find(
+        FinancialRecord.user.id == user.id
+    ).sort(FinancialRecord.month).to_list()
+    totals = [(record.month, *record_totals(record)) for record in records]
+    fresh = await run_cpu_bound(build_state, totals)  # Includes the backtest
+
+    if state is None:
+        # The concurrent request's state is gone (account deletion); nothing to save
+        return ForecastState(user=user, **fresh.model_dump())
+    try:
+        for field in ForecastInputs.model_fields:
+            setattr(state, field, getattr(fresh, field))
+        state.stale = False
+        state.updated_at = datetime.utcnow()
+        await state.save()
+    except RevisionIdWasChanged:
+        # Marked stale, or rebuilt by a concurrent request, during the build;
+        # ours is still valid for this request
+        pass
+
+    return state
+
+
+async def record_month_written(user: User, month: str, revenue: float, expenses: float,
+                               cash_balance: float,
+                               previous: Optional[Tuple[float, float, float]] = None):
+    """
+    Update the user's forecast state after a single month was written.
+
+    Args:
+        previous: (revenue, expenses, cash_balance) totals before the write,
+                  if the month already existed
+    """
+    state = await _load_state(user)
+    if state is None or state.stale:
+        # Rebuilt on the next forecast; bumps the version, and fails the
+        # save of a rebuild that may have read the records before the write
+        await mark_forecast_state_stale(user)
+        return
+
+    state.version += 1
+    if not apply_month(state, month, revenue, expenses, cash_balance, previous):
+        state.stale = True
+    elif state.selection and len(state.months) - state.selection.evaluated_months >= RESELECT_AFTER_MONTHS:
+        state.stale = True  # The rebuild re-runs the backtest on the longer history
+    state.updated_at = datetime.utcnow()
+
+    try:
+        await state.save()
+    except RevisionIdWasChanged:
+        await mark_forecast_state_stale(user)
+
+
+async def mark_forecast_state_stale(user: User):
+    """
+    Force a rebuild of the user's forecast state on the next forecast, and
+    bump its version so no worker serves a cached forecast of older records.
+    """
+    # A new revision id makes any in-flight incremental save fail instead of
+    # silently clearing the stale flag.
+    await ForecastState.find(ForecastState.user.id == user.id).update(
+        {"$set": {"stale": True, "revision_id": uuid4()}, "$inc": {"version": 1}}
+    )
+
+
+async def financial_records_changed(user: User):
+    """Call after bulk writes to a user's FinancialRecords."""
+    await mark_forecast_state_stale(user)
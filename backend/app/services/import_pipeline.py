@@ -0,0 +1,224 @@
+"""
+Bulk Import Pipeline for STRATA-AI
+
+CSV, Excel, Google Sheets and Stripe imports parse every row first and
+collect one upsert per month in a MonthlyUpsertBatch. write() then sends
+them all as a single unordered bulk_write keyed on (user, month), backed
+by the unique `user_month_unique` index on FinancialRecord. Importing
+years of history takes one round trip instead of a find_one plus a
+save() per month.
+
+Per-row error reporting is kept: parse errors stay with the caller, and
+months the database rejects are reported individually (an unordered bulk
+write still applies every other month).
+
+When the upload is fingerprinted (upload_fingerprints.py), months whose
+values hash the same as the last import of that month are not written.
+
+Several uploads imported together (the multi-file onboarding endpoint)
+run under one MergedImport: each file's write() hands its months over
+instead of writing, and MergedImport.write() upserts the merged months
+once, in a defined precedence. Ledger postings (ledger.py) are written
+as they happen; they claim their fields so lower-ranked files don't
+overwrite them.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.core.config import settings
+from app.models.financial import FinancialRecord
+from app.models.user import User
+from app.services.ingestion import IngestionLimitError, current_progress
+from app.services.upload_fingerprints import current_upload, forget_months, month_hash
+
+# Numeric FinancialRecord fields, zero-filled when a new month is inserted
+AMOUNT_FIELDS = [
+    name for name, field in FinancialRecord.model_fields.items()
+    if field.annotation is float
+]
+
+
+class ImportWriteResult(NamedTuple):
+    """Outcome of one MonthlyUpsertBatch.write()."""
+    rows_written: int  # Rows whose month was written or unchanged (duplicates of a month count each)
+    months_inserted: int
+    months_updated: int
+    errors: List[str]  # One message per month that failed to write
+    months_unchanged: int = 0  # Skipped: same values as the last import of the month
+    months_failed: Tuple[str, ...] = ()
+
+
+class MonthlyUpsertBatch:
+    """
+    Collects per-month FinancialRecord values for one user, then writes
+    them in one bulk upsert. A batch without a user (parsed off the event
+    loop) can't be written, only extend()ed into one that has.
+    """
+
+    def __init__(self, user: Optional[User], max_months: Optional[int] = None):
+        self.user = user
+        self.max_months = max_months or settings.INGEST_MAX_MONTHS
+        self._values: Dict[str, Dict[str, float]] = {}
+        self._insert_values: Dict[str, Dict[str, float]] = {}
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        """Distinct months collected."""
+        return len(self._values)
+
+    def add(self, month: str, values: Dict[str, float],
+            insert_values: Optional[Dict[str, float]] = None) -> None:
+        """
+        Queue a month.
+
+        Args:
+            month: Month (YYYY-MM)
+            values: Fields set whether the month is new or already exists
+            insert_values: Fields set only when the month is new; amounts
+                           not given either way default to 0
+
+        A month added twice merges like sequential writes would: later
+        values win.
+
+        Raises:
+            IngestionLimitError: If the batch already holds max_months months
+        """
+        if month not in self._values and len(self._values) >= self.max_months:
+            raise IngestionLimitError(f"Upload spans more than {self.max_months} months")
+        self._values.setdefault(month, {}).update(values)
+        if insert_values:
+            self._insert_values.setdefault(month, {}).update(insert_values)
+        self._rows[month] = self._rows.get(month, 0) + 1
+
+    def extend(self, other: "MonthlyUpsertBatch", exclude: Optional[Dict[str, Set[str]]] = None) -> None:
+        """Queue another batch's months after this one's (its values win), less `exclude`d fields."""
+        for month, values in other._values.items():
+            dropped = exclude.get(month) if exclude else None
+            if dropped:
+                values = {field: value for field, value in values.items() if field not in dropped}
+                if not values:
+                    continue
+            self.add(month, values, other._insert_values.get(month))
+            self._rows[month] += other._rows[month] - 1
+
+    def _operation(self, month: str) -> UpdateOne:
+        values = self._values[month]
+        on_insert = {field: 0.0 for field in AMOUNT_FIELDS}
+        on_insert.update(self._insert_values.get(month, {}))
+        on_insert["created_at"] = datetime.utcnow()
+        for field in values:
+            on_insert.pop(field, None)  # A path may not appear in both $set and $setOnInsert
+        return UpdateOne(
+            {"user": self.user.to_ref(), "month": month},
+            {"$set": values, "$setOnInsert": on_insert},
+            upsert=True,
+        )
+
+    async def write(self) -> ImportWriteResult:
+        """Upsert every queued month in one unordered bulk_write."""
+        if not self._values:
+            return ImportWriteResult(0, 0, 0, [])
+
+        source = _merge_source.get()
+        if source is not None:
+            merge, rank = source
+            merge.defer(rank, self)
+            return ImportWriteResult(sum(self._rows.values()), 0, 0, [])
+
+        upload = current_upload()
+        hashes: Dict[str, str] = {}
+        unchanged: List[str] = []
+        if upload is not None:
+            hashes = {month: month_hash(values, self._insert_values.get(month))
+                      for month, values in self._values.items()}
+            baseline = await upload.baseline(hashes)
+            unchanged = [month for month, value in hashes.items() if baseline.get(month) == value]
+
+        skipped = set(unchanged)
+        months = [month for month in self._values if month not in skipped]
+        failed: Dict[str, str] = {}
+        details: Dict[str, Any] = {}
+        if months:
+            collection = FinancialRecord.get_pymongo_collection()
+            try:
+                result = await collection.bulk_write([self._operation(m) for m in months], ordered=False)
+                details = result.bulk_api_result
+            except BulkWriteError as e:
+                details = e.details
+                for error in details.get("writeErrors", []):
+                    failed[months[error["index"]]] = error.get("errmsg", "write failed")
+            # Other uploads' hashes no longer describe these months
+            await forget_months(self.user, months)
+        if upload is not None:
+            upload.record({month: value for month, value in hashes.items() if month not in failed}, failed)
+
+        progress = current_progress()
+        if progress is not None:
+            progress.months_upserted += details.get("nUpserted", 0) + details.get("nMatched", 0)
+        return ImportWriteResult(
+            rows_written=sum(rows for month, rows in self._rows.items() if month not in failed),
+            months_inserted=details.get("nUpserted", 0),
+            months_updated=details.get("nMatched", 0),
+            errors=[f"Error saving {month}: {message}" for month, message in failed.items()],
+            months_unchanged=len(unchanged),
+            months_failed=tuple(failed),
+        )
+
+
+_merge_source: ContextVar[Optional[Tuple["MergedImport", Tuple]]] = ContextVar("merged_import", default=None)
+
+
+def current_merge() -> Optional[Tuple["MergedImport", Tuple]]:
+    """The MergedImport and rank this import runs under, if any."""
+    return _merge_source.get()
+
+
+class MergedImport:
+    """
+    Several uploads parsed concurrently and written as one bulk upsert.
+
+    Each upload is imported inside source(rank); the batches it writes
+    are held back. write() then merges them in ascending rank, as if the
+    uploads had been imported one after another in that order: a month
+    in several uploads gets the fields of each, and where two set the
+    same field the higher rank wins.
+    """
+
+    def __init__(self, user: User):
+        self.user = user
+        self._batches: List[Tuple[Tuple, int, MonthlyUpsertBatch]] = []
+        self._claims: List[Tuple[Tuple, str, Set[str]]] = []  # (rank, month, fields) already written
+
+    @contextmanager
+    def source(self, rank: Tuple) -> Iterator[None]:
+        """Defer the writes of the import run inside, at precedence `rank`."""
+        token = _merge_source.set((self, rank))
+        try:
+            yield
+        finally:
+            _merge_source.reset(token)
+
+    def defer(self, rank: Tuple, batch: MonthlyUpsertBatch) -> None:
+        """Called by MonthlyUpsertBatch.write() inside source()."""
+        self._batches.append((rank, len(self._batches), batch))
+
+    def claim(self, rank: Tuple, months: Dict[str, Iterable[str]]) -> None:
+        """Fields a source at `rank` wrote directly; lower ranks won't overwrite them."""
+        self._claims.extend((rank, month, set(fields)) for month, fields in months.items())
+
+    async def write(self) -> ImportWriteResult:
+        """Upsert the merged months of every source in one bulk_write."""
+        merged = MonthlyUpsertBatch(self.user, max_months=max(1, sum(len(b) for _, _, b in self._batches)))
+        for rank, _, batch in sorted(self._batches, key=lambda item: item[:2]):
+            exclude: Dict[str, Set[str]] = {}
+            for claim_rank, month, fields in self._claims:
+                if claim_rank > rank:
+                    exclude.setdefault(month, set()).update(fields)
+            merged.extend(batch, exclude)
+        return await merged.write()
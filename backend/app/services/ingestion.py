@@ -0,0 +1,358 @@
+"""
+Streaming Upload Ingestion for STRATA-AI
+
+Transaction exports from Stripe or banks can be hundreds of megabytes.
+Importers read them through UploadCSVReader, which pulls the upload in
+INGEST_CHUNK_BYTES chunks, decodes incrementally and yields one CSV row
+at a time. Rows are folded into per-month buckets as they arrive, so
+peak memory depends on the number of months, not on the file size.
+
+Memory ceiling (configurable in Settings):
+- INGEST_MAX_RECORD_BYTES: largest single CSV record
+- INGEST_MAX_MONTHS: distinct months one upload may aggregate into
+- INGEST_MAX_ERRORS: per-row error messages kept (the rest are counted)
+- INGEST_MAX_DOCUMENT_BYTES: formats that need random access (PDF, Excel)
+
+Exceeding a limit raises IngestionLimitError, a ValueError, which the
+importers report like any other parse failure.
+
+Background ingestion jobs (ingestion_jobs.py) follow an upload through
+an IngestionProgress set for the job's task: the readers here count the
+bytes and rows they consume into it, the import batch the months it
+writes. Outside a job there is no progress and nothing is counted.
+
+The lenient cell parsers shared by the importers (column names, dates,
+amounts) live here too.
+"""
+
+import asyncio
+import codecs
+import csv
+import io
+import re
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Optional
+
+from fastapi import UploadFile
+
+from app.core.config import settings
+
+
+class IngestionLimitError(ValueError):
+    """Raised when an upload exceeds one of the ingestion memory limits."""
+
+
+class IngestionProgress:
+    """Live counters of one ingestion job, and its ETA."""
+
+    def __init__(self, total_bytes: int = 0):
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self.total_rows: Optional[int] = None  # Known up front for Excel sheets
+        self.rows_parsed = 0
+        self.months_upserted = 0
+        self.started = time.monotonic()
+
+    def fraction(self) -> Optional[float]:
+        """Share of the input consumed, by rows when their total is known, else by bytes."""
+        if self.total_rows:
+            return min(self.rows_parsed / self.total_rows, 1.0)
+        if self.total_bytes:
+            return min(self.bytes_read / self.total_bytes, 1.0)
+        return None
+
+    def eta_seconds(self) -> Optional[float]:
+        """Seconds left at the rate so far (None until something was read)."""
+        fraction = self.fraction()
+        if not fraction:
+            return None
+        return (time.monotonic() - self.started) * (1 - fraction) / fraction
+
+
+_progress: ContextVar[Optional[IngestionProgress]] = ContextVar("ingestion_progress", default=None)
+
+
+def current_progress() -> Optional[IngestionProgress]:
+    """The progress of the ingestion job running in this task, if any."""
+    return _progress.get()
+
+
+def track_progress(progress: IngestionProgress) -> None:
+    """Count the current task's reads and writes into `progress`."""
+    _progress.set(progress)
+
+
+async def iter_upload_chunks(file: UploadFile, chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Yield the upload in chunks, giving the event loop a turn after each."""
+    chunk_size = chunk_size or settings.INGEST_CHUNK_BYTES
+    progress = current_progress()
+    while chunk := await file.read(chunk_size):
+        if progress is not None:
+            progress.bytes_read += len(chunk)
+        yield chunk
+        # Small uploads are read from memory without suspending
+        await asyncio.sleep(0)
+
+
+async def read_upload(file: UploadFile, max_bytes: Optional[int] = None) -> bytes:
+    """Read a whole upload (for formats that need random access), up to max_bytes."""
+    max_bytes = max_bytes or settings.INGEST_MAX_DOCUMENT_BYTES
+    chunks = []
+    size = 0
+    async for chunk in iter_upload_chunks(file):
+        size += len(chunk)
+        if size > max_bytes:
+            raise IngestionLimitError(f"File is larger than {max_bytes // (1024 * 1024)} MB")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def open_upload(file: UploadFile, max_bytes: Optional[int] = None) -> BinaryIO:
+    """
+    The upload as a seekable binary file, up to max_bytes, for readers that
+    need random access but not the whole content in memory (Excel).
+    Starlette already spools uploads to a temporary file; it is reused.
+    """
+    max_bytes = max_bytes or settings.INGEST_MAX_DOCUMENT_BYTES
+    source = file.file
+    size = source.seek(0, io.SEEK_END)
+    if size > max_bytes:
+        raise IngestionLimitError(f"File is larger than {max_bytes // (1024 * 1024)} MB")
+    source.seek(0)
+    return source
+
+
+async def _iter_record_blocks(file: UploadFile, max_record_bytes: int,
+                              encoding: str = "utf-8-sig") -> AsyncIterator[List[List[str]]]:
+    """
+    Decode an upload incrementally and yield the CSV records of each chunk.
+
+    Each chunk is cut after its last newline; the tail is carried into
+    the next chunk. A quoted field may contain newlines, so a block is
+    only parsed once its double quotes balance (escaped quotes come in
+    pairs); until then it is carried over whole.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+    carry_limit = max_record_bytes + settings.INGEST_CHUNK_BYTES
+    async for chunk in iter_upload_chunks(file):
+        text = pending + decoder.decode(chunk)
+        cut = text.rfind("\n") + 1
+        if cut == 0 or text.count('"', 0, cut) % 2:
+            pending = text
+        else:
+            pending = text[cut:]
+            yield list(csv.reader(io.StringIO(text[:cut], newline="")))
+        if len(pending) > carry_limit:
+            raise IngestionLimitError(f"CSV record longer than {max_record_bytes} bytes")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield list(csv.reader(io.StringIO(pending, newline="")))
+
+
+class UploadCSVReader:
+    """
+    Async counterpart of csv.DictReader over an UploadFile.
+
+    Blank records are skipped; short rows are padded with None and extra
+    fields are collected under the None key, as csv.DictReader does.
+    """
+
+    def __init__(self, file: UploadFile, max_record_bytes: Optional[int] = None):
+        max_record_bytes = max_record_bytes or settings.INGEST_MAX_RECORD_BYTES
+        self._blocks = _iter_record_blocks(file, max_record_bytes)
+        self._records: List[List[str]] = []  # Parsed but not yet returned
+        self.fieldnames: Optional[List[str]] = None
+
+    async def read_fieldnames(self) -> Optional[List[str]]:
+        """Read the header record (None for an empty upload)."""
+        while self.fieldnames is None:
+            while self._records:
+                record = self._records.pop(0)
+                if record:
+                    self.fieldnames = record
+                    return record
+            block = await anext(self._blocks, None)
+            if block is None:
+                break
+            self._records = block
+        return self.fieldnames
+
+    async def blocks(self) -> AsyncIterator[List[List[str]]]:
+        """
+        Yield the records after the header one parsed chunk at a time, for
+        columnar consumers. Blank records are dropped; records are not
+        padded to the header width.
+        """
+        if not await self.read_fieldnames():
+            return
+        progress = current_progress()
+        records, self._records = self._records, []
+        if records:
+            records = [record for record in records if record]
+            if progress is not None:
+                progress.rows_parsed += len(records)
+            yield records
+        async for block in self._blocks:
+            records = [record for record in block if record]
+            if progress is not None:
+                progress.rows_parsed += len(records)
+            yield records
+
+    def __aiter__(self) -> AsyncIterator[Dict[Optional[str], object]]:
+        return self._rows()
+
+    async def _rows(self) -> AsyncIterator[Dict[Optional[str], object]]:
+        fieldnames = await self.read_fieldnames()
+        width = len(fieldnames or [])
+        # Rows of one block are produced without suspending; the loop gets a
+        # turn between chunks
+        async for block in self.blocks():
+            for record in block:
+                row: Dict[Optional[str], object] = dict(zip(fieldnames, record))
+                if len(record) < width:
+                    row.update((name, None) for name in fieldnames[len(record):])
+                elif len(record) > width:
+                    row[None] = record[width:]
+                yield row
+
+
+def normalize_column_name(name: str) -> str:
+    """Normalize column names to handle variations."""
+    name = name.lower().strip()
+    # Map common variations
+    mappings = {
+        'date': 'month',
+        'period': 'month',
+        'month': 'month',
+        'revenue': 'revenue',
+        'income': 'revenue',
+        'sales': 'revenue',
+        'expense': 'expenses',
+        'expenses': 'expenses',
+        'costs': 'expenses',
+        'spending': 'expenses',
+        'cash': 'cash_balance',
+        'cash_balance': 'cash_balance',
+        'balance': 'cash_balance',
+        'bank_balance': 'cash_balance',
+        'amount': 'amount',
+        'net': 'net',
+        'fee': 'fee',
+        'created': 'date',
+        'type': 'type',
+        'description': 'description',
+    }
+    for key, value in mappings.items():
+        if key in name:
+            return value
+    return name
+
+
+# Tried in order; the first format a date parses with wins
+DATE_FORMATS = [
+    "%Y-%m-%d",      # 2024-01-15
+    "%Y/%m/%d",      # 2024/01/15
+    "%d-%m-%Y",      # 15-01-2024
+    "%d/%m/%Y",      # 15/01/2024
+    "%m-%d-%Y",      # 01-15-2024
+    "%m/%d/%Y",      # 01/15/2024
+    "%Y-%m",         # 2024-01
+    "%Y/%m",         # 2024/01
+    "%B %Y",         # January 2024
+    "%b %Y",         # Jan 2024
+]
+
+# Last resort: a year-month anywhere in the text (e.g. timestamps)
+YEAR_MONTH_PATTERN = re.compile(r'(\d{4})[-/](\d{1,2})')
+
+
+def parse_date_to_month(date_str: str) -> Optional[str]:
+    """Parse various date formats to YYYY-MM format."""
+    date_str = date_str.strip()
+
+    for fmt in DATE_FORMATS:
+        try:
+            dt = datetime.strptime(date_str, fmt)
+            return dt.strftime("%Y-%m")
+        except ValueError:
+            continue
+
+    # Try to extract year-month pattern with regex
+    match = YEAR_MONTH_PATTERN.search(date_str)
+    if match:
+        year, month = match.groups()
+        return f"{year}-{int(month):02d}"
+
+    return None
+
+
+def parse_float(value: Any) -> float:
+    """Parse various number formats to float."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        return 0.0
+
+    # Remove currency symbols and commas
+    value = str(value).strip()
+    value = re.sub(r'[$€£¥,]', '', value)
+    value = value.replace('(', '-').replace(')', '')  # Handle accounting format
+
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+
+class MonthlyBuckets:
+    """Running per-month sums, bounded to INGEST_MAX_MONTHS distinct months."""
+
+    def __init__(self, max_months: Optional[int] = None):
+        self.max_months = max_months or settings.INGEST_MAX_MONTHS
+        self._buckets: Dict[str, Dict[str, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def add(self, month: str, **amounts: float) -> None:
+        bucket = self._buckets.get(month)
+        if bucket is None:
+            if len(self._buckets) >= self.max_months:
+                raise IngestionLimitError(f"Upload spans more than {self.max_months} months")
+            bucket = self._buckets[month] = {}
+        for name, amount in amounts.items():
+            bucket[name] = bucket.get(name, 0.0) + amount
+
+    def items(self):
+        return self._buckets.items()
+
+
+class BoundedErrors(list):
+    """
+    Per-row error messages, keeping the first INGEST_MAX_ERRORS; the rest
+    are counted and summarized by messages().
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        super().__init__()
+        self.limit = limit or settings.INGEST_MAX_ERRORS
+        self.dropped = 0
+
+    def append(self, message: str) -> None:
+        if len(self) < self.limit:
+            super().append(message)
+        else:
+            self.dropped += 1
+
+    def extend(self, messages) -> None:
+        for message in messages:
+            self.append(message)
+
+    def messages(self) -> List[str]:
+        """Kept messages plus a summary line for the dropped ones."""
+        if not self.dropped:
+            return list(self)
+        return list(self) + [f"... and {self.dropped} more errors"]
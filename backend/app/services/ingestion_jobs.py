@@ -0,0 +1,315 @@
+"""
+Background Ingestion Jobs for STRATA-AI
+
+Large imports parse and write for as long as the upload takes, which
+outlives proxy timeouts when run inside the request. The job endpoints
+instead store the upload in GridFS, insert an IngestionJob and answer
+with its id at once; the import itself runs on this in-process queue.
+
+- Each API process runs INGEST_JOB_WORKERS worker tasks. A worker claims
+  the oldest queued job with one find_one_and_update, so several
+  processes can share the queue without double-processing
+- While a job runs, its IngestionProgress (bytes and rows read, months
+  upserted, ETA) is written every INGEST_JOB_PROGRESS_SECONDS, renewing
+  the worker's lease on the job
+- Jobs live in Mongo, so nothing is lost on a restart: queued jobs are
+  claimed by the next worker to start, and a running job whose lease
+  expired (its process died) is taken over and run again, up to
+  INGEST_JOB_MAX_ATTEMPTS times. A clean shutdown puts its running
+  jobs straight back in the queue. Spreadsheet imports upsert by
+  (user, month), so running one again is harmless. Ledger imports skip
+  the transactions the dead run inserted, so before a job runs again its
+  user's ledger rollups are rebuilt, in case the run died between
+  inserting a chunk and rolling it up (see ledger.py)
+- A full PDF pool puts the job back in the queue instead of failing it
+
+Job kinds map to handlers registered by the endpoints that own the
+import (see app/api/v1/endpoints/jobs.py). A handler receives the upload
+as an UploadFile and returns the JSON body the synchronous endpoint would.
+"""
+
+import asyncio
+import io
+import logging
+import os
+import socket
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import gridfs.errors
+from fastapi import HTTPException, UploadFile
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.core.executor import ExecutorSaturatedError
+from app.db.engine import get_database
+from app.models.ingestion_job import IngestionJob, IngestionJobStatus
+from app.models.user import User
+from app.services.ingestion import IngestionLimitError, IngestionProgress, track_progress
+from app.services.ledger import rebuild_rollups
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_BUCKET = "ingestion_uploads"
+SPOOL_MAX_BYTES = 1024 * 1024  # Uploads read back from GridFS spill to disk past this, like Starlette's
+
+JobHandler = Callable[[UploadFile, User, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class IngestionJobQueue:
+    """
+    Mongo-backed queue of IngestionJobs, processed by worker tasks on the
+    event loop with bounded concurrency.
+    """
+
+    def __init__(self, workers: int = 2):
+        """
+        Args:
+            workers: Jobs processed at once by this process
+        """
+        self.workers = workers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """Run jobs of `kind` with `handler(file, user, options)`."""
+        self._handlers[kind] = handler
+
+    def _bucket(self) -> AsyncIOMotorGridFSBucket:
+        return AsyncIOMotorGridFSBucket(get_database(), bucket_name=UPLOAD_BUCKET)
+
+    @staticmethod
+    def _collection():
+        return IngestionJob.get_pymongo_collection()
+
+    # ============== Submission ==============
+
+    async def submit(self, file: UploadFile, user: User, kind: str, **options: Any) -> IngestionJob:
+        """
+        Store the upload and queue a job for it.
+
+        Raises:
+            IngestionLimitError: If the upload exceeds INGEST_JOB_MAX_UPLOAD_BYTES
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown ingestion job kind: {kind}")
+        max_bytes = settings.INGEST_JOB_MAX_UPLOAD_BYTES
+        source = file.file
+        size = source.seek(0, io.SEEK_END)
+        if size > max_bytes:
+            raise IngestionLimitError(f"File is larger than {max_bytes // (1024 * 1024)} MB")
+        source.seek(0)
+
+        filename = file.filename or ""
+        upload_id = await self._bucket().upload_from_stream(filename or "upload", source)
+        job = IngestionJob(user=user, kind=kind, filename=filename, options=options,
+                           upload_id=upload_id, size_bytes=size)
+        try:
+            await job.insert()
+        except Exception:
+            await self._delete_upload(job)
+            raise
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def delete_user_jobs(self, user: User) -> None:
+        """Delete a user's jobs and the uploads still stored for them."""
+        jobs = await IngestionJob.find(IngestionJob.user.id == user.id).to_list()
+        await IngestionJob.find(IngestionJob.user.id == user.id).delete()
+        for job in jobs:
+            await self._delete_upload(job)
+
+    # ============== Workers ==============
+
+    def start(self) -> None:
+        """Start the worker tasks (idempotent). Call from the running event loop."""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work(), name=f"ingestion-job-worker-{n}")
+                       for n in range(self.workers)]
+        logger.info(f"Ingestion job queue started ({self.workers} workers, id {self.worker_id})")
+
+    async def stop(self) -> None:
+        """Cancel the workers and put their unfinished jobs back in the queue."""
+        if not self._tasks:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # An interrupted shutdown is not a failed attempt
+        await self._collection().update_many(
+            {"status": IngestionJobStatus.RUNNING.value, "worker_id": self.worker_id},
+            {"$set": {"status": IngestionJobStatus.QUEUED.value, "worker_id": None, "lease_expires_at": None},
+             "$inc": {"attempts": -1}},
+        )
+
+    async def _work(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self._claim()
+            except Exception:
+                logger.exception("Failed to claim an ingestion job")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), settings.INGEST_JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Ingestion job {job.id} could not be completed")
+
+    def _lease(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=settings.INGEST_JOB_LEASE_SECONDS)
+
+    async def _claim(self) -> Optional[IngestionJob]:
+        """Take the oldest queued job, or a running one whose worker stopped renewing it."""
+        now = datetime.utcnow()
+        raw = await self._collection().find_one_and_update(
+            {"$or": [
+                {"status": IngestionJobStatus.QUEUED.value},
+                {"status": IngestionJobStatus.RUNNING.value, "lease_expires_at": {"$lt": now}},
+            ]},
+            {"$set": {"status": IngestionJobStatus.RUNNING.value, "worker_id": self.worker_id,
+                      "lease_expires_at": self._lease(), "started_at": now},
+             "$inc": {"attempts": 1}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        return await IngestionJob.get(raw["_id"]) if raw else None
+
+    async def _run(self, job: IngestionJob) -> None:
+        handler = self._handlers.get(job.kind)
+        user = await User.get(job.user.ref.id)
+        if user is not None and job.attempts > 1:
+            await self._recover(job, user)
+        if job.attempts > settings.INGEST_JOB_MAX_ATTEMPTS:
+            await self._finish(job, IngestionJobStatus.FAILED,
+                               errors=[f"Import was interrupted {job.attempts - 1} times; giving up"])
+            return
+        if handler is None or user is None:
+            reason = f"Unknown job kind: {job.kind}" if handler is None else "User no longer exists"
+            await self._finish(job, IngestionJobStatus.FAILED, errors=[reason])
+            return
+
+        progress = IngestionProgress(job.size_bytes)
+        task = asyncio.create_task(self._process(job, handler, user, progress))
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=settings.INGEST_JOB_PROGRESS_SECONDS)
+                if done:
+                    break
+                if not await self._report(job, progress):
+                    logger.warning(f"Lost the lease on ingestion job {job.id}; abandoning it")
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    return
+            result = task.result()
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        except ExecutorSaturatedError:
+            await self._requeue(job)
+            await asyncio.sleep(settings.INGEST_JOB_POLL_SECONDS)
+            return
+        except HTTPException as e:
+            await self._finish(job, IngestionJobStatus.FAILED, progress, errors=[str(e.detail)])
+            return
+        except Exception as e:
+            logger.exception(f"Ingestion job {job.id} failed")
+            await self._finish(job, IngestionJobStatus.FAILED, progress, errors=[str(e)])
+            return
+
+        status = IngestionJobStatus.FAILED if result.get("success") is False else IngestionJobStatus.SUCCEEDED
+        await self._finish(job, status, progress, result=result, errors=result.get("errors") or [])
+
+    async def _recover(self, job: IngestionJob, user: User) -> None:
+        """Rebuild the user's ledger rollups after an interrupted run of `job`."""
+        try:
+            months = await rebuild_rollups(user)
+        except Exception:
+            logger.exception(f"Could not rebuild ledger rollups before retrying ingestion job {job.id}")
+            return
+        logger.info(f"Rebuilt {months} ledger months before retrying ingestion job {job.id}")
+
+    async def _process(self, job: IngestionJob, handler: JobHandler, user: User,
+                       progress: IngestionProgress) -> Dict[str, Any]:
+        track_progress(progress)  # This task's context only
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+            await self._bucket().download_to_stream(job.upload_id, spool)
+            spool.seek(0)
+            upload = UploadFile(spool, size=job.size_bytes, filename=job.filename)
+            return await handler(upload, user, job.options)
+
+    @staticmethod
+    def _progress_fields(progress: IngestionProgress) -> Dict[str, Any]:
+        return {
+            "bytes_read": progress.bytes_read,
+            "rows_parsed": progress.rows_parsed,
+            "total_rows": progress.total_rows,
+            "months_upserted": progress.months_upserted,
+        }
+
+    async def _report(self, job: IngestionJob, progress: IngestionProgress) -> bool:
+        """Write progress and renew the lease; False if another worker took the job over."""
+        fraction = progress.fraction()
+        eta = progress.eta_seconds()
+        result = await self._collection().update_one(
+            {"_id": job.id, "status": IngestionJobStatus.RUNNING.value, "worker_id": self.worker_id},
+            {"$set": {**self._progress_fields(progress),
+                      "progress": round(fraction, 4) if fraction is not None else None,
+                      "eta_seconds": round(eta, 1) if eta is not None else None,
+                      "lease_expires_at": self._lease()}},
+        )
+        return result.matched_count == 1
+
+    async def _requeue(self, job: IngestionJob) -> None:
+        await self._collection().update_one(
+            {"_id": job.id, "worker_id": self.worker_id},
+            {"$set": {"status": IngestionJobStatus.QUEUED.value, "worker_id": None, "lease_expires_at": None},
+             "$inc": {"attempts": -1}},
+        )
+
+    async def _finish(self, job: IngestionJob, status: IngestionJobStatus,
+                      progress: Optional[IngestionProgress] = None,
+                      result: Optional[Dict[str, Any]] = None, errors: Optional[List[str]] = None) -> None:
+        fields: Dict[str, Any] = {
+            "status": status.value,
+            "result": result,
+            "errors": errors or [],
+            "eta_seconds": None,
+            "progress": 1.0 if status == IngestionJobStatus.SUCCEEDED else None,
+            "finished_at": datetime.utcnow(),
+            "lease_expires_at": None,
+        }
+        if progress is not None:
+            fields.update(self._progress_fields(progress))
+        finished = await self._collection().update_one(
+            {"_id": job.id, "worker_id": self.worker_id}, {"$set": fields}
+        )
+        if finished.matched_count:
+            await self._delete_upload(job)
+
+    async def _delete_upload(self, job: IngestionJob) -> None:
+        if job.upload_id is None:
+            return
+        try:
+            await self._bucket().delete(job.upload_id)
+        except gridfs.errors.NoFile:
+            pass
+
+
+ingestion_jobs = IngestionJobQueue(workers=settings.INGEST_JOB_WORKERS)
@@ -0,0 +1,278 @@
+"""
+Transaction Ledger for STRATA-AI
+
+Stripe and bank-statement imports keep the transactions they parse, as
+LedgerTransactions, instead of only their monthly totals:
+
+- Transactions are appended in one insert_many per parsed chunk. The
+  unique (user, source, external_id) index skips transactions imported
+  before, so overlapping exports and re-uploads only add what is new
+- FinancialRecord months are rollups, adjusted by the inserted
+  transactions' deltas: one pipeline upsert per month touched, whatever
+  the history behind it. FinancialRecord.ledger keeps each source's
+  running totals per month; forecasts keep reading the monthly fields
+- Removing a transaction appends a reversal, adjusting its month by the
+  negated amounts
+
+A monthly field shows the total of the highest source in
+SOURCE_PRECEDENCE whose transactions for it don't net to zero. This
+deliberately replaces last-import-wins: before the ledger, whichever of
+a Stripe export or a bank statement was imported last overwrote the
+month, while now the bank statement keeps it. Reversing all of a
+source's transactions hands the field back to the next source (or 0 if
+there is none). SEED_FIELDS only fill months the source's import
+creates, and then follow its total until something else writes the
+field (Stripe fees into expenses_other).
+
+rebuild_rollups() recomputes months' ledger totals from their
+transactions. A posting calls it on commit for the months where it met
+transactions imported before or failed to apply a rollup: an import that
+died between inserting a chunk and rolling it up left those months short,
+and importing the same file again (or the job retry) repairs them.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.models.financial import FinancialRecord
+from app.models.ledger_transaction import LedgerTransaction
+from app.models.user import User
+from app.services.import_pipeline import AMOUNT_FIELDS, current_merge
+from app.services.ingestion import BoundedErrors, current_progress
+from app.services.upload_fingerprints import current_upload, forget_months, month_hash
+
+DUPLICATE_KEY = 11000
+
+SOURCE_PRECEDENCE = ["bank_statement", "stripe"]  # Highest first
+SEED_FIELDS = {"stripe": {"expenses_other"}}
+ZERO = 0.005  # A source total below this (in absolute value) has nothing left for the field
+
+
+class LedgerPostResult(NamedTuple):
+    """Outcome of one LedgerPosting."""
+    transactions_added: int
+    duplicates: int  # Skipped: imported before
+    months_updated: int
+    errors: List[str]
+    months_failed: Tuple[str, ...] = ()  # Posted to, but their rollup could not be written
+
+
+def _field_total(field: str) -> Any:
+    """
+    Expression for a monthly field: the total of the first source with a
+    non-zero one, else the first source's zero, else the field unchanged.
+    """
+    totals = [f"$ledger.{source}.{field}" for source in SOURCE_PRECEDENCE
+              if field not in SEED_FIELDS.get(source, ())]
+    expression: Any = f"${field}"
+    for total in reversed(totals):
+        expression = {"$ifNull": [total, expression]}
+    for total in reversed(totals):
+        expression = {"$cond": [{"$gte": [{"$abs": {"$ifNull": [total, 0.0]}}, ZERO]}, total, expression]}
+    return expression
+
+
+def _rollup(user: User, source: str, month: str, amounts: Dict[str, float], absolute: bool = False) -> UpdateOne:
+    """Upsert adjusting a month's ledger totals by `amounts` (or setting them) and its fields to match."""
+    prefix = f"ledger.{source}."
+    is_new = {"$eq": [{"$type": "$created_at"}, "missing"]}
+    totals = {
+        prefix + field: amount if absolute else {"$add": [{"$ifNull": [f"${prefix}{field}", 0.0]}, amount]}
+        for field, amount in amounts.items()
+    }
+    seeds = SEED_FIELDS.get(source, set())
+    # Seed fields follow the total while they still hold its previous value
+    followed = {
+        field: {"$cond": [{"$or": [is_new, {"$eq": [f"${field}", f"${prefix}{field}"]}]},
+                          totals[prefix + field], f"${field}"]}
+        for field in amounts if field in seeds
+    }
+    pipeline = [
+        {"$set": {**totals, **followed}},
+        {"$set": {field: _field_total(field) for field in amounts if field not in seeds}},
+        {"$set": {**{field: {"$ifNull": [f"${field}", 0.0]} for field in AMOUNT_FIELDS},
+                  "created_at": {"$ifNull": ["$created_at", datetime.utcnow()]}}},
+    ]
+    pipeline = [stage for stage in pipeline if stage["$set"]]
+    return UpdateOne({"user": user.to_ref(), "month": month}, pipeline, upsert=True)
+
+
+async def _apply(operations: List[Tuple[str, UpdateOne]]) -> List[Tuple[str, str]]:
+    """Write (month, rollup) operations in one bulk_write; returns (month, error) per failed operation."""
+    if not operations:
+        return []
+    details: Dict[str, Any] = {}
+    errors = []
+    try:
+        result = await FinancialRecord.get_pymongo_collection().bulk_write(
+            [operation for _, operation in operations], ordered=False
+        )
+        details = result.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        for error in details.get("writeErrors", []):
+            month = operations[error["index"]][0]
+            errors.append((month, f"Error updating {month}: {error.get('errmsg', 'write failed')}"))
+    progress = current_progress()
+    if progress is not None:
+        progress.months_upserted += details.get("nUpserted", 0) + details.get("nMatched", 0)
+    return errors
+
+
+class LedgerPosting:
+    """
+    Transactions of one import from one source. add() them, flush() after
+    each parsed chunk, and commit() once at the end.
+    """
+
+    def __init__(self, user: User, source: str):
+        self.user = user
+        self.source = source
+        self.added = 0
+        self.duplicates = 0
+        self.errors = BoundedErrors()
+        self.months: Dict[str, Dict[str, float]] = {}  # Month -> field -> change posted
+        self._pending: List[Dict[str, Any]] = []
+        self._occurrences: Dict[str, int] = {}
+        self._unsure: Set[str] = set()  # Months to rebuild on commit
+
+    def content_id(self, *parts: Any) -> str:
+        """
+        External id for a transaction without one: a hash of its content
+        and how many identical transactions came before it in this import.
+        """
+        key = "\x1f".join(str(part) for part in parts)
+        occurrence = self._occurrences.get(key, 0)
+        self._occurrences[key] = occurrence + 1
+        return hashlib.sha256(f"{key}\x1e{occurrence}".encode()).hexdigest()[:32]
+
+    def add(self, external_id: str, month: str, amounts: Dict[str, float], description: str = "",
+            reverses: Optional[Any] = None) -> None:
+        """Queue a transaction adding `amounts` to FinancialRecord fields of `month`."""
+        self._pending.append({
+            "user": self.user.to_ref(),
+            "source": self.source,
+            "external_id": external_id,
+            "month": month,
+            "amounts": amounts,
+            "description": description,
+            "reverses": reverses,
+            "created_at": datetime.utcnow(),
+        })
+
+    async def flush(self) -> None:
+        """Append the queued transactions and roll the new ones up into their months."""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        skipped = set()
+        try:
+            await LedgerTransaction.get_pymongo_collection().insert_many(pending, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                skipped.add(error["index"])
+                if error.get("code") == DUPLICATE_KEY:
+                    self.duplicates += 1
+                    # The import that wrote it may not have rolled it up
+                    self._unsure.add(pending[error["index"]]["month"])
+                else:
+                    self.errors.append(f"Error saving transaction: {error.get('errmsg', 'write failed')}")
+
+        changes: Dict[str, Dict[str, float]] = {}
+        for index, transaction in enumerate(pending):
+            if index in skipped:
+                continue
+            self.added += 1
+            month = changes.setdefault(transaction["month"], {})
+            for field, amount in transaction["amounts"].items():
+                month[field] = month.get(field, 0.0) + amount
+        for month, amounts in changes.items():
+            posted = self.months.setdefault(month, {})
+            for field, amount in amounts.items():
+                posted[field] = posted.get(field, 0.0) + amount
+        failed = await _apply([
+            (month, _rollup(self.user, self.source, month, amounts)) for month, amounts in changes.items()
+        ])
+        self._unsure.update(month for month, _ in failed)  # Retried by commit()
+
+    async def commit(self) -> LedgerPostResult:
+        """Flush and repair unsure months, then record the months written for fingerprints and merged imports."""
+        await self.flush()
+        failed: List[Tuple[str, str]] = []
+        if self._unsure:
+            _, failed = await _rebuild(self.user, self._unsure)
+            self.errors.extend(error for _, error in failed)
+        failed_months = {month for month, _ in failed if month in self.months}
+        if self.months:
+            # Other uploads' hashes no longer describe these months
+            await forget_months(self.user, self.months)
+            upload = current_upload()
+            if upload is not None:
+                upload.record({month: month_hash(amounts) for month, amounts in self.months.items()
+                               if month not in failed_months}, failed_months)
+            merge = current_merge()
+            if merge is not None:
+                instance, rank = merge
+                seeds = SEED_FIELDS.get(self.source, set())
+                instance.claim(rank, {month: [field for field in amounts if field not in seeds]
+                                      for month, amounts in self.months.items()})
+        return LedgerPostResult(self.added, self.duplicates, len(self.months) - len(failed_months),
+                                self.errors.messages(), tuple(failed_months))
+
+
+async def reverse_transaction(user: User, transaction_id: Any) -> Optional[LedgerPostResult]:
+    """
+    Remove a transaction by appending its reversal.
+
+    Returns:
+        The posting result (no transaction added if it was already
+        reversed), or None if the user has no such transaction
+    """
+    transaction = await LedgerTransaction.find_one(
+        LedgerTransaction.id == transaction_id,
+        LedgerTransaction.user.id == user.id,
+        LedgerTransaction.reverses == None,  # noqa: E711 - reversals can't be reversed
+    )
+    if transaction is None:
+        return None
+    posting = LedgerPosting(user, transaction.source)
+    posting.add(f"reversal:{transaction.id}", transaction.month,
+                {field: -amount for field, amount in transaction.amounts.items()},
+                description=transaction.description, reverses=transaction.id)
+    return await posting.commit()
+
+
+async def rebuild_rollups(user: User, months: Optional[Iterable[str]] = None) -> int:
+    """
+    Reset the ledger totals of a user's months (all, or `months`) to the
+    sums of their transactions. Returns the number of months rewritten.
+    """
+    rewritten, failed = await _rebuild(user, months)
+    return len(rewritten - {month for month, _ in failed})
+
+
+async def _rebuild(user: User, months: Optional[Iterable[str]]) -> Tuple[Set[str], List[Tuple[str, str]]]:
+    match: Dict[str, Any] = {"user": user.to_ref()}
+    if months is not None:
+        match["month"] = {"$in": list(months)}
+    rows = await LedgerTransaction.aggregate([
+        {"$match": match},
+        {"$project": {"source": 1, "month": 1, "amounts": {"$objectToArray": "$amounts"}}},
+        {"$unwind": "$amounts"},
+        {"$group": {"_id": {"source": "$source", "month": "$month", "field": "$amounts.k"},
+                    "total": {"$sum": "$amounts.v"}}},
+    ]).to_list()
+    totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+    for row in rows:
+        key = row["_id"]
+        totals.setdefault((key["source"], key["month"]), {})[key["field"]] = row["total"]
+    failed = await _apply([
+        (month, _rollup(user, source, month, amounts, absolute=True)) for (source, month), amounts in totals.items()
+    ])
+    rewritten = {month for _, month in totals}
+    await forget_months(user, rewritten)
+    return rewritten, failed
@@ -1,53 +1,86 @@
-import pandas as pd
+"""
+Revenue Trend Forecaster for STRATA-AI
+
+Linear revenue trend behind /financials/forecast, fit on calendar dates
+(day ordinals of each month's first day) with the closed-form regression
+kernel. NumPy only: months are parsed as datetime64 and every horizon is
+predicted in one call.
+
+RevenueForecaster holds no per-request state, so the shared `forecaster`
+instance is safe under concurrent requests and executor threads, and
+predict_batch forecasts many users' histories as one stacked fit.
+"""
+
+from datetime import date
+from typing import Dict, Hashable, List, Mapping
+
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from datetime import datetime, timedelta
-from typing import List, Dict
+
+from app.services.regression import fit_linear, predict
+
+MIN_HISTORY_MONTHS = 3  # Fewer months than this get no forecast
+
+# datetime64 day counts start at 1970-01-01; date.toordinal() at 0001-01-01
+_ORDINAL_OFFSET = date(1970, 1, 1).toordinal()
+
+
+def _month_ordinals(months: np.ndarray) -> np.ndarray:
+    """date.toordinal() of the first day of each datetime64[M] month."""
+    return months.astype("datetime64[D]").astype(np.int64) + _ORDINAL_OFFSET
+
 
 class RevenueForecaster:
-    def __init__(self):
-        self.model = LinearRegression()
+    """Stateless linear-trend revenue forecaster."""
 
     def predict_next_months(self, history: List[Dict], months_ahead: int = 6) -> List[Dict]:
         """
         Takes historical data [{'month': '2024-01', 'revenue': 5000}, ...]
         Returns predicted data [{'month': '2024-06', 'revenue': 5200}, ...]
         """
-        if len(history) < 3:
-            return [] # Not enough data to forecast
-
-        # 1. Prepare Data
-        df = pd.DataFrame(history)
-        df['date'] = pd.to_datetime(df['month'])
+        return self.predict_batch({0: history}, months_ahead=months_ahead)[0]
 
-        # Convert dates to ordinal (numbers) for regression
-        df['date_ordinal'] = df['date'].map(datetime.toordinal)
-
-        X = df[['date_ordinal']]
-        y = df['revenue']
+    def predict_batch(self, histories: Mapping[Hashable, List[Dict]],
+                      months_ahead: int = 6) -> Dict[Hashable, List[Dict]]:
+        """
+        Forecast many histories at once with one stacked regression.
 
-        # 2. Train Model (Simple Linear Trend)
-        self.model.fit(X, y)
+        Args:
+            histories: Mapping of key (e.g. user id) -> history in the
+                       predict_next_months format
+            months_ahead: Months to predict after each history's last month
 
-        # 3. Predict Future
-        last_date = df['date'].max()
-        predictions = []
+        Returns:
+            Mapping of key -> predictions; empty for histories shorter than
+            MIN_HISTORY_MONTHS
+        """
+        results: Dict[Hashable, List[Dict]] = {key: [] for key in histories}
+        eligible = [key for key, history in histories.items() if len(history) >= MIN_HISTORY_MONTHS]
+        if not eligible or months_ahead < 1:
+            return results
 
-        for i in range(1, months_ahead + 1):
-            next_date = last_date + pd.DateOffset(months=i)
-            next_ordinal = np.array([[next_date.toordinal()]])
+        # Left-aligned, padded (histories x months) arrays
+        lengths = np.array([len(histories[key]) for key in eligible])
+        months = np.zeros((len(eligible), lengths.max()), dtype="datetime64[M]")
+        revenues = np.zeros(months.shape)
+        for row, key in enumerate(eligible):
+            history = histories[key]
+            months[row, :lengths[row]] = [point["month"][:7] for point in history]
+            revenues[row, :lengths[row]] = [point["revenue"] for point in history]
 
-            pred_revenue = self.model.predict(next_ordinal)[0]
+        fit = fit_linear(revenues, x=_month_ordinals(months), lengths=lengths)
 
-            # Don't predict negative revenue
-            pred_revenue = max(0, round(pred_revenue, 2))
+        # Padding is the epoch (1970-01), so the row max is the last real month
+        future = months.max(axis=1)[:, None] + np.arange(1, months_ahead + 1)
+        # Don't predict negative revenue
+        predicted = np.round(np.maximum(predict(fit, _month_ordinals(future)), 0), 2)
+        labels = np.datetime_as_string(future, unit="M")
 
-            predictions.append({
-                "month": next_date.strftime("%Y-%m"),
-                "revenue": pred_revenue,
-                "is_projected": True
-            })
+        for row, key in enumerate(eligible):
+            results[key] = [
+                {"month": month, "revenue": revenue, "is_projected": True}
+                for month, revenue in zip(labels[row].tolist(), predicted[row].tolist())
+            ]
+        return results
 
-        return predictions
 
 forecaster = RevenueForecaster()
@@ -0,0 +1,492 @@
+"""
+Onboarding File Extraction for STRATA-AI
+
+Imports one onboarding upload (financial CSV or Excel, Stripe export,
+bank statement or pitch deck PDF) with the processor for its extension
+and type hint, and reports what was extracted as an ExtractionResponse.
+
+- extract_file: a single upload, fingerprinted so an identical
+  re-upload is answered from the stored response (used by
+  /onboarding/extract-from-file-enhanced and its background job)
+- extract_upload: the import itself, also run per file by
+  /onboarding/extract-from-files under a MergedImport
+- import_sheet_csv: a Google Sheet's CSV export (sheet_sync's importer)
+"""
+
+import asyncio
+import csv
+from importlib.util import find_spec
+from typing import Any, Dict, Optional, Set
+
+from fastapi import UploadFile
+
+from app.core.executor import ExecutorSaturatedError, run_cpu_bound
+from app.models.user import User
+from app.schemas.onboarding import (
+    BankStatementData,
+    ExtractionResponse,
+    FinancialDataExtracted,
+    StartupDataExtracted,
+    StripeData,
+)
+from app.services.excel_ingestion import ROWS_PER_YIELD, iter_sheet_rows, open_workbook, select_sheet
+from app.services.forecast_state import financial_records_changed
+from app.services.import_pipeline import MonthlyUpsertBatch
+from app.services.ingestion import BoundedErrors, UploadCSVReader, open_upload, read_upload
+from app.services.ledger import LedgerPosting
+from app.services.pdf_extraction import extract_bank_statement, extract_pitch_deck
+from app.services.schema_inference import RowParser, infer_schema_from_rows, infer_schema_from_stream
+from app.services.spreadsheet_parsing import (
+    FinancialTotals,
+    fold_row,
+    parse_financial_csv,
+    parse_financial_excel,
+)
+from app.services.stripe_aggregation import StripeTotals, aggregate_stripe_export
+from app.services.upload_fingerprints import UploadImport
+
+# Optional parsers are detected here but imported on first use (they add
+# ~250ms to cold start)
+PDF_SUPPORT = find_spec("fitz") is not None  # PyMuPDF
+EXCEL_SUPPORT = find_spec("openpyxl") is not None
+
+
+# ============== Processors ==============
+
+async def process_financial_csv(file: UploadFile, user: User, off_loop: bool = False) -> Dict[str, Any]:
+    """
+    Process a financial CSV file and create FinancialRecords (streamed row
+    by row, or read whole and parsed on the CPU executor if `off_loop`).
+    """
+    records_created = 0
+    errors = BoundedErrors()
+    batch = MonthlyUpsertBatch(user)
+    totals = FinancialTotals()
+    schema = None
+
+    try:
+        if off_loop:
+            parsed = await run_cpu_bound(parse_financial_csv, await read_upload(file))
+            if parsed.error:
+                return {"error": parsed.error}
+            batch.extend(parsed.batch)
+            totals, schema = parsed.totals, parsed.schema
+            errors.extend(parsed.errors)
+        else:
+            reader = UploadCSVReader(file)
+
+            fieldnames = await reader.read_fieldnames()
+            if not fieldnames:
+                return {"error": "No columns found in CSV"}
+
+            # Column mapping and value formats are inferred once from the first rows
+            schema, rows = await infer_schema_from_stream(fieldnames, aiter(reader))
+            parser = RowParser(schema)
+
+            async for row in rows:
+                fold_row(parser, row, batch, totals, errors, report_dates=True)
+
+        # All months in one bulk upsert
+        result = await batch.write()
+        records_created = result.rows_written
+        errors.extend(result.errors)
+
+    except ExecutorSaturatedError:
+        raise  # 503 with Retry-After
+    except Exception as e:
+        errors.append(f"Error reading CSV: {str(e)}")
+
+    if records_created:
+        await financial_records_changed(user)
+
+    return {
+        "records_created": records_created,
+        "errors": errors.messages(),
+        "financial_data": FinancialDataExtracted(**totals.figures(months_of_data=len(batch),
+                                                                  records_parsed=records_created)),
+        "inferred_schema": schema
+    }
+
+
+async def process_stripe_csv(file: UploadFile, user: User) -> Dict[str, Any]:
+    """Process a Stripe export CSV file."""
+    totals = StripeTotals()  # Partial totals are still reported if reading fails
+    errors = BoundedErrors()
+    records_created = 0
+
+    try:
+        # Aggregated column-wise, one streamed chunk at a time; each chunk's charges and
+        # refunds are appended to the ledger and rolled up into their months (fees only
+        # seed new months)
+        ledger = LedgerPosting(user, "stripe")
+        try:
+            await aggregate_stripe_export(file, totals, ledger)
+        finally:
+            result = await ledger.commit()
+        records_created = result.months_updated
+        errors.extend(result.errors)
+
+    except Exception as e:
+        errors.append(f"Error reading Stripe CSV: {str(e)}")
+
+    if records_created:
+        await financial_records_changed(user)
+
+    return {
+        "records_created": records_created,
+        "errors": errors.messages(),
+        "stripe_data": StripeData(
+            total_revenue=totals.total_revenue,
+            total_refunds=totals.total_refunds,
+            net_revenue=totals.total_revenue - totals.total_fees - totals.total_refunds,
+            transaction_count=totals.transaction_count
+        )
+    }
+
+
+async def process_pdf_pitch_deck(file: UploadFile) -> Dict[str, Any]:
+    """Extract startup information from a PDF pitch deck using text analysis."""
+    if not PDF_SUPPORT:
+        return {"error": "PDF support not available. Install pymupdf."}
+
+    errors = []
+    startup_data = StartupDataExtracted()
+
+    try:
+        content = await read_upload(file)
+
+        # Read on the PDF pool, stopping once every field is found
+        fields, warnings = await extract_pitch_deck(content)
+        startup_data = StartupDataExtracted(**fields)
+        errors.extend(warnings)
+
+    except ExecutorSaturatedError:
+        raise  # 503 with Retry-After
+    except Exception as e:
+        errors.append(f"Error processing PDF: {str(e)}")
+
+    return {
+        "startup_data": startup_data,
+        "errors": errors
+    }
+
+
+async def process_pdf_bank_statement(file: UploadFile, user: User) -> Dict[str, Any]:
+    """Extract financial data from a PDF bank statement."""
+    if not PDF_SUPPORT:
+        return {"error": "PDF support not available. Install pymupdf."}
+
+    errors = []
+    bank_data = BankStatementData()
+    records_created = 0  # Months written
+
+    try:
+        content = await read_upload(file)
+
+        # Text extraction (parallel page ranges) and the statement scan run on the PDF pool
+        statement, warnings = await extract_bank_statement(content)
+        errors.extend(warnings)
+        bank_data = BankStatementData(
+            closing_balance=statement["closing_balance"],
+            monthly_income_estimate=statement["monthly_income_estimate"],
+            monthly_expense_estimate=statement["monthly_expense_estimate"],
+            months_of_data=len(statement["months"]),
+            transaction_count=statement["transaction_count"],
+        )
+
+        # Transactions go to the ledger, which rolls them up into every month covered;
+        # closing balances are upserted per month
+        batch = MonthlyUpsertBatch(user)
+        ledger_months: Set[str] = set()
+        balance_months: Set[str] = set()
+        if statement["transaction_count"]:
+            ledger = LedgerPosting(user, "bank_statement")
+            for transaction in statement["transactions"]:
+                field = "revenue_recurring" if transaction["amount"] > 0 else "expenses_other"
+                ledger.add(ledger.content_id(transaction["date"], transaction["description"], transaction["amount"]),
+                           transaction["month"], {field: abs(transaction["amount"])}, transaction["description"])
+            posted = await ledger.commit()
+            errors.extend(posted.errors)
+            ledger_months = set(ledger.months).difference(posted.months_failed)
+            for month, totals in statement["months"].items():
+                if totals["closing_balance"] is not None:
+                    batch.add(month, {"cash_balance": totals["closing_balance"]})
+                    balance_months.add(month)
+        elif bank_data.closing_balance:
+            # No transaction lines: the statement's totals, for its month
+            values = {"cash_balance": bank_data.closing_balance}
+            if bank_data.monthly_income_estimate:
+                values["revenue_recurring"] = bank_data.monthly_income_estimate
+            if bank_data.monthly_expense_estimate:
+                values["expenses_other"] = bank_data.monthly_expense_estimate
+            batch.add(statement["target_month"], values)
+            balance_months.add(statement["target_month"])
+        result = await batch.write()
+        errors.extend(result.errors)
+        records_created = len(ledger_months | balance_months.difference(result.months_failed))
+        if records_created:
+            await financial_records_changed(user)
+
+    except ExecutorSaturatedError:
+        raise  # 503 with Retry-After
+    except Exception as e:
+        errors.append(f"Error processing bank statement PDF: {str(e)}")
+
+    return {
+        "bank_statement_data": bank_data,
+        "errors": errors,
+        "records_created": records_created
+    }
+
+
+async def process_excel_file(file: UploadFile, user: User, sheet_name: Optional[str] = None,
+                             off_loop: bool = False) -> Dict[str, Any]:
+    """
+    Process an Excel file and extract financial data (one sheet, streamed,
+    or read whole and parsed on the CPU executor if `off_loop`).
+    """
+    if not EXCEL_SUPPORT:
+        return {"error": "Excel support not available. Install openpyxl."}
+
+    records_created = 0
+    errors = BoundedErrors()
+    batch = MonthlyUpsertBatch(user)
+    totals = FinancialTotals()
+    schema = None
+    sheet = None
+
+    try:
+        if off_loop:
+            parsed = await run_cpu_bound(parse_financial_excel, await read_upload(file), sheet_name)
+            batch.extend(parsed.batch)
+            totals, schema, sheet = parsed.totals, parsed.schema, parsed.sheet
+            errors.extend(parsed.errors)
+        else:
+            # Read-only workbook: rows are parsed from the file as they are iterated
+            wb = open_workbook(open_upload(file))
+            try:
+                selected = select_sheet(wb, sheet_name)
+                sheet = selected.name
+
+                # Column mapping and value formats are inferred once from the first rows
+                schema, rows = infer_schema_from_rows(selected.headers, iter_sheet_rows(wb, selected))
+                parser = RowParser(schema)
+
+                for row_number, row_dict in enumerate(rows, start=1):
+                    if row_number % ROWS_PER_YIELD == 0:
+                        await asyncio.sleep(0)  # Let other requests run during long sheets
+                    fold_row(parser, row_dict, batch, totals, errors, label="Excel row")
+            finally:
+                wb.close()
+
+        # All months in one bulk upsert
+        result = await batch.write()
+        records_created = result.rows_written
+        errors.extend(result.errors)
+
+    except ExecutorSaturatedError:
+        raise  # 503 with Retry-After
+    except Exception as e:
+        errors.append(f"Error reading Excel file: {str(e)}")
+
+    if records_created:
+        await financial_records_changed(user)
+
+    return {
+        "records_created": records_created,
+        "errors": errors.messages(),
+        "financial_data": FinancialDataExtracted(**totals.figures(months_of_data=records_created,
+                                                                  records_parsed=records_created)),
+        "inferred_schema": schema,
+        "sheet": sheet
+    }
+
+
+async def import_sheet_csv(csv_content: str, user: User) -> ExtractionResponse:
+    """Import a Google Sheet's CSV export (see app/services/sheet_sync.py for fetching)."""
+    try:
+        records_created = 0
+        errors = BoundedErrors()
+        batch = MonthlyUpsertBatch(user)
+        totals = FinancialTotals()
+
+        reader = csv.DictReader(csv_content.splitlines())
+
+        if not reader.fieldnames:
+            return ExtractionResponse(
+                success=False,
+                message="No columns found in Google Sheet.",
+                errors=["Empty or invalid spreadsheet"]
+            )
+
+        # Column mapping and value formats are inferred once from the first rows
+        schema, rows = infer_schema_from_rows(reader.fieldnames, reader)
+        parser = RowParser(schema)
+
+        for row in rows:
+            fold_row(parser, row, batch, totals, errors)
+
+        # All months in one bulk upsert
+        result = await batch.write()
+        records_created = result.rows_written
+        errors.extend(result.errors)
+
+        if records_created:
+            await financial_records_changed(user)
+
+        return ExtractionResponse(
+            success=True,
+            message=f"Successfully imported {records_created} financial records from Google Sheets.",
+            financial_data=FinancialDataExtracted(**totals.figures(months_of_data=records_created,
+                                                                   records_parsed=records_created)),
+            inferred_schema=schema,
+            records_created=records_created,
+            errors=errors.messages()
+        )
+
+    except Exception as e:
+        return ExtractionResponse(
+            success=False,
+            message=f"Failed to process Google Sheet: {str(e)}",
+            errors=[str(e)]
+        )
+
+
+# ============== Extraction ==============
+
+async def extract_file(file: UploadFile, user: User, file_type_hint: str = "spreadsheet",
+                       sheet: Optional[str] = None) -> ExtractionResponse:
+    """
+    Import one upload (CSV, Excel or PDF; see extract_upload).
+
+    Re-uploading a file already imported the same way returns the stored
+    response (`deduplicated: true`) unless its months were overwritten
+    since; a changed file only rewrites the months that changed.
+    """
+    filename = file.filename.lower() if file.filename else ""
+
+    # Identical re-uploads are answered from the fingerprint store without parsing
+    extension = filename.rsplit('.', 1)[-1]
+    upload = await UploadImport.open(file, user, f"extract:{extension}:{file_type_hint}:{sheet or ''}")
+    duplicate = await upload.duplicate_response()
+    if duplicate is not None:
+        return ExtractionResponse(**{**duplicate, "deduplicated": True})
+
+    with upload:
+        response = await extract_upload(file, filename, file_type_hint, sheet, user)
+    if response.success:
+        await upload.save(response.model_dump(mode="json"))
+    return response
+
+
+async def extract_upload(file: UploadFile, filename: str, file_type_hint: str, sheet: Optional[str],
+                         current_user: User, off_loop: bool = False) -> ExtractionResponse:
+    """
+    Import an upload with the processor for its extension and type hint
+    (spreadsheets are parsed on the CPU executor if `off_loop`).
+    """
+    try:
+        # Handle PDF files
+        if filename.endswith('.pdf'):
+            if file_type_hint in ('pitch_deck', 'pitch'):
+                if not PDF_SUPPORT:
+                    return ExtractionResponse(
+                        success=False,
+                        message="PDF support not available. Please install pymupdf.",
+                        errors=["PDF parsing library not installed"]
+                    )
+                result = await process_pdf_pitch_deck(file)
+                if "error" in result:
+                    return ExtractionResponse(
+                        success=False,
+                        message=result["error"],
+                        errors=[result["error"]]
+                    )
+                return ExtractionResponse(
+                    success=True,
+                    message="Successfully extracted startup information from pitch deck.",
+                    startup_data=result['startup_data'],
+                    errors=result.get('errors', [])
+                )
+            elif file_type_hint == 'bank_statement':
+                if not PDF_SUPPORT:
+                    return ExtractionResponse(
+                        success=False,
+                        message="PDF support not available. Please install pymupdf.",
+                        errors=["PDF parsing library not installed"]
+                    )
+                result = await process_pdf_bank_statement(file, current_user)
+                if "error" in result:
+                    return ExtractionResponse(
+                        success=False,
+                        message=result["error"],
+                        errors=[result["error"]]
+                    )
+                return ExtractionResponse(
+                    success=True,
+                    message="Successfully extracted financial data from bank statement.",
+                    bank_statement_data=result['bank_statement_data'],
+                    records_created=result.get('records_created', 0),
+                    errors=result.get('errors', [])
+                )
+            else:
+                return ExtractionResponse(
+                    success=False,
+                    message="Please specify file_type_hint as 'pitch_deck' or 'bank_statement' for PDF files.",
+                    errors=["Unknown PDF file type"]
+                )
+
+        # Handle Excel files
+        if filename.endswith(('.xlsx', '.xls')):
+            if not EXCEL_SUPPORT:
+                return ExtractionResponse(
+                    success=False,
+                    message="Excel support not available. Please install openpyxl.",
+                    errors=["Excel parsing library not installed"]
+                )
+            result = await process_excel_file(file, current_user, sheet_name=sheet, off_loop=off_loop)
+            if "error" in result:
+                return ExtractionResponse(
+                    success=False,
+                    message=result["error"],
+                    errors=[result["error"]]
+                )
+            return ExtractionResponse(
+                success=True,
+                message=f"Successfully imported {result['records_created']} financial records from Excel sheet '{result['sheet']}'.",
+                financial_data=result['financial_data'],
+                inferred_schema=result['inferred_schema'],
+                records_created=result['records_created'],
+                errors=result.get('errors', [])
+            )
+
+        # Handle CSV files
+        if file_type_hint in ("stripe", "stripe_csv"):
+            result = await process_stripe_csv(file, current_user)
+            return ExtractionResponse(
+                success=True,
+                message=f"Successfully processed Stripe export. Found {result['stripe_data'].transaction_count} transactions.",
+                stripe_data=result['stripe_data'],
+                records_created=result['records_created'],
+                errors=result['errors']
+            )
+        else:
+            # Default: treat as financial spreadsheet
+            result = await process_financial_csv(file, current_user, off_loop=off_loop)
+            return ExtractionResponse(
+                success=True,
+                message=f"Successfully imported {result['records_created']} financial records.",
+                financial_data=result['financial_data'],
+                inferred_schema=result['inferred_schema'],
+                records_created=result['records_created'],
+                errors=result['errors']
+            )
+
+    except ExecutorSaturatedError:
+        raise  # 503 with Retry-After
+    except Exception as e:
+        return ExtractionResponse(
+            success=False,
+            message=f"Failed to process file: {str(e)}",
+            errors=[str(e)]
+        )
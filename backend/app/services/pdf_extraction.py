@@ -0,0 +1,262 @@
+"""
+PDF Extraction for STRATA-AI
+
+PyMuPDF text extraction and the regex scans over it are CPU-bound and
+hold the GIL, so run inline they block the event loop for multi-second
+documents. All of it runs on pdf_executor (a process pool by default):
+
+- Pitch decks are read page by page in one job that stops as soon as
+  name, industry, stage and team size are known, instead of extracting
+  every page first
+- Bank statements longer than PDF_PAGES_PER_JOB pages are extracted as
+  page ranges of that size, as many at once as the pool has workers, then
+  scanned in one more job (a single pass, see
+  statement_scanner.py)
+
+Every document gets a budget of PDF_MAX_PAGES pages and
+PDF_TIME_BUDGET_SECONDS of extraction time. Pages past the budget are
+skipped and reported as a warning, not as a failure.
+
+Functions submitted to the pool are module-level and take and return
+plain values (bytes, str, dict), so they pickle for process pools.
+PyMuPDF is imported inside them, keeping it out of API startup.
+"""
+
+import asyncio
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from app.core.config import settings
+from app.core.executor import pdf_executor
+from app.services.statement_scanner import scan_statement
+
+NAME_LINES = 20  # Lines at the start of a deck searched for the company name
+NAME_SKIP_WORDS = ['pitch deck', 'presentation', 'confidential', 'investor', 'series', 'seed', 'round']
+
+INDUSTRY_KEYWORDS = {
+    'SaaS': ['saas', 'software as a service', 'subscription', 'b2b software', 'cloud platform'],
+    'Fintech': ['fintech', 'financial technology', 'payments', 'banking', 'lending', 'insurtech'],
+    'Healthcare': ['healthcare', 'health tech', 'medical', 'biotech', 'healthtech', 'telemedicine'],
+    'E-commerce': ['ecommerce', 'e-commerce', 'marketplace', 'retail', 'shopping', 'dtc', 'direct to consumer'],
+    'EdTech': ['edtech', 'education', 'learning', 'e-learning', 'online education', 'training'],
+    'AI/ML': ['artificial intelligence', 'machine learning', 'ai-powered', 'deep learning', 'neural', 'nlp'],
+    'Cybersecurity': ['cybersecurity', 'security', 'infosec', 'data protection', 'encryption'],
+    'PropTech': ['proptech', 'real estate', 'property', 'housing'],
+    'CleanTech': ['cleantech', 'clean energy', 'renewable', 'sustainability', 'green tech'],
+    'FoodTech': ['foodtech', 'food delivery', 'restaurant tech', 'agtech'],
+}
+
+STAGE_KEYWORDS = {
+    'idea': ['idea stage', 'concept', 'pre-product', 'ideation'],
+    'mvp': ['mvp', 'minimum viable', 'beta', 'prototype', 'early stage', 'pre-seed'],
+    'growth': ['growth stage', 'series a', 'scaling', 'product-market fit', 'pmf'],
+    'scale': ['series b', 'series c', 'scale stage', 'expansion', 'international'],
+}
+
+# Patterns like "X team members", "team of X"
+TEAM_PATTERNS = [
+    r'(\d+)\s*(?:team members|employees|people|person team)',
+    r'team of\s*(\d+)',
+    r'(\d+)\s*(?:founders?|co-founders?)',
+]
+
+def _open(content: bytes):
+    import fitz  # PyMuPDF
+
+    return fitz.open(stream=content, filetype="pdf")
+
+
+def _budget_warning(pages_read: int, page_count: int) -> str:
+    return (f"Only the first {pages_read} of {page_count} pages were read "
+            f"(limit: {settings.PDF_MAX_PAGES} pages, {settings.PDF_TIME_BUDGET_SECONDS:g}s)")
+
+
+# ============== Pool jobs ==============
+
+def page_count(content: bytes) -> int:
+    doc = _open(content)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+def extract_pages(content: bytes, start: int, stop: int, deadline: float) -> List[str]:
+    """
+    Text of pages [start, stop), ending early at `deadline` (time.time()).
+    Returns one entry per page read.
+    """
+    doc = _open(content)
+    try:
+        texts = []
+        for number in range(start, min(stop, doc.page_count)):
+            if time.time() > deadline:
+                break
+            texts.append(doc[number].get_text())
+        return texts
+    finally:
+        doc.close()
+
+
+def scan_pitch_deck(content: bytes, max_pages: int, deadline: float) -> Dict[str, Any]:
+    """
+    Read a pitch deck page by page until name, industry, stage and team
+    size are all found (or the budget runs out). The earliest page with a
+    match decides each field.
+
+    Returns:
+        Dict with startup_data fields, pages_read, page_count and
+        out_of_budget (True when pages were left unread for the budget)
+    """
+    fields: Dict[str, Any] = {"name": None, "industry": None, "stage": None, "team_size": None}
+    name_lines_left = NAME_LINES
+    pages_read = 0
+    out_of_budget = False
+
+    doc = _open(content)
+    try:
+        total_pages = doc.page_count
+        for page in doc:
+            if pages_read >= max_pages or time.time() > deadline:
+                out_of_budget = True
+                break
+            text = page.get_text()
+            pages_read += 1
+
+            # Company name: a Title Case or ALL CAPS line near the start of the deck
+            if fields["name"] is None and name_lines_left:
+                for line in text.split('\n')[:name_lines_left]:
+                    line = line.strip()
+                    if 2 < len(line) < 50 and not any(word in line.lower() for word in NAME_SKIP_WORDS):
+                        if line.istitle() or (line.isupper() and len(line) < 30):
+                            fields["name"] = line.title()
+                            break
+                # The joined text ends every page with a newline
+                name_lines_left = max(name_lines_left - (text.count('\n') + 1), 0)
+
+            text_lower = text.lower()
+            if fields["industry"] is None:
+                fields["industry"] = next((industry for industry, keywords in INDUSTRY_KEYWORDS.items()
+                                           if any(kw in text_lower for kw in keywords)), None)
+            if fields["stage"] is None:
+                fields["stage"] = next((stage for stage, keywords in STAGE_KEYWORDS.items()
+                                        if any(kw in text_lower for kw in keywords)), None)
+            if fields["team_size"] is None:
+                for pattern in TEAM_PATTERNS:
+                    match = re.search(pattern, text_lower)
+                    if match:
+                        fields["team_size"] = int(match.group(1))
+                        break
+
+            name_settled = fields["name"] is not None or not name_lines_left
+            if name_settled and None not in (fields["industry"], fields["stage"], fields["team_size"]):
+                break
+    finally:
+        doc.close()
+
+    fields["industry"] = fields["industry"] or 'Technology'
+    fields["stage"] = fields["stage"] or 'mvp'
+    return {"startup_data": fields, "pages_read": pages_read, "page_count": total_pages,
+            "out_of_budget": out_of_budget}
+
+
+def parse_bank_statement(text: str) -> Dict[str, Any]:
+    """
+    Balance, income and expense figures of a statement, in total and per month.
+
+    Returns:
+        Dict with closing_balance, monthly_income_estimate,
+        monthly_expense_estimate (None when not found), target_month
+        (the last month covered, else the statement period's month, else
+        the current month), months and transactions (as returned by
+        scan_statement) and transaction_count
+    """
+    scan = scan_statement(text)
+    summary = scan["summary"]
+    months = scan["months"]
+    closing_balance = summary["balance"]
+    income, expense = summary["income"], summary["expense"]
+    if scan["transaction_count"]:
+        # Transactions give real monthly figures; statement totals may span several months
+        income = sum(m["income"] for m in months.values()) / len(months) or None
+        expense = sum(m["expense"] for m in months.values()) / len(months) or None
+    last_month = next(reversed(months), None)
+    if closing_balance is None:
+        closing_balance = next((m["closing_balance"] for m in reversed(months.values())
+                                if m["closing_balance"] is not None), None)
+    elif last_month and months[last_month]["closing_balance"] is None:
+        months[last_month]["closing_balance"] = closing_balance  # No running balances
+
+    return {
+        "closing_balance": closing_balance,
+        "monthly_income_estimate": income,
+        "monthly_expense_estimate": expense,
+        "target_month": last_month or scan["period_month"] or datetime.utcnow().strftime("%Y-%m"),
+        "months": months,
+        "transactions": scan["transactions"],
+        "transaction_count": scan["transaction_count"],
+    }
+
+
+# ============== Async entry points ==============
+
+def _deadline() -> float:
+    return time.time() + settings.PDF_TIME_BUDGET_SECONDS
+
+
+async def extract_pitch_deck(content: bytes) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Startup fields from a pitch deck, read on the PDF pool.
+
+    Returns:
+        Tuple of (StartupDataExtracted fields, warnings)
+    """
+    result = await pdf_executor.run(scan_pitch_deck, content, settings.PDF_MAX_PAGES, _deadline())
+    warnings = [_budget_warning(result["pages_read"], result["page_count"])] if result["out_of_budget"] else []
+    return result["startup_data"], warnings
+
+
+async def extract_text(content: bytes) -> Tuple[str, List[str]]:
+    """
+    Full text of a document (within budget), extracted in ranges of
+    PDF_PAGES_PER_JOB pages. At most one range per pool worker is
+    submitted at a time; the rest wait here, not in the pool's queue,
+    so a long statement doesn't fill it.
+
+    Returns:
+        Tuple of (text with a newline after every page, warnings)
+    """
+    deadline = _deadline()
+    total_pages = await pdf_executor.run(page_count, content)
+    pages = min(total_pages, settings.PDF_MAX_PAGES)
+    per_job = settings.PDF_PAGES_PER_JOB
+    ranges = [(start, min(start + per_job, pages)) for start in range(0, pages, per_job)]
+    slots = asyncio.Semaphore(pdf_executor.workers)
+
+    async def extract_range(start: int, stop: int) -> List[str]:
+        async with slots:
+            return await pdf_executor.run(extract_pages, content, start, stop, deadline)
+
+    results = await asyncio.gather(*(extract_range(start, stop) for start, stop in ranges))
+
+    # Keep the pages read without a gap; a range cut short by the deadline ends the text
+    texts: List[str] = []
+    for (start, stop), range_texts in zip(ranges, results):
+        texts.extend(range_texts)
+        if len(range_texts) < stop - start:
+            break
+    warnings = [_budget_warning(len(texts), total_pages)] if len(texts) < total_pages else []
+    return "".join(text + "\n" for text in texts), warnings
+
+
+async def extract_bank_statement(content: bytes) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    parse_bank_statement() of a statement PDF, run on the PDF pool.
+
+    Returns:
+        Tuple of (parse_bank_statement result, warnings)
+    """
+    text, warnings = await extract_text(content)
+    return await pdf_executor.run(parse_bank_statement, text), warnings
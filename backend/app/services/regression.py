@@ -0,0 +1,169 @@
+"""
+Closed-Form Regression Kernel for STRATA-AI
+
+NumPy-only simple linear regression used by the forecasting hot paths
+in place of a per-request sklearn LinearRegression fit. Works on one
+series or on a stacked (series x points) batch of left-aligned,
+zero-padded rows with per-row lengths.
+
+Provides:
+- Closed-form slope / intercept
+- Residual variance
+- Prediction intervals (normal approximation)
+
+Run `python -m app.services.regression` for a benchmark against the
+per-call sklearn fit it replaces.
+"""
+
+from typing import NamedTuple, Optional, Tuple
+import numpy as np
+
+
+class LinearFit(NamedTuple):
+    """Fitted y = intercept + slope * x, per series (scalars for a single series)."""
+    slope: np.ndarray
+    intercept: np.ndarray
+    residual_variance: np.ndarray  # RSS / (n - 2); 0 when n <= 2
+    n: np.ndarray
+    x_mean: np.ndarray
+    sxx: np.ndarray  # Sum of squared x deviations
+
+
+def sequential_total(values: np.ndarray, lengths: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Left-to-right sum of a series, or of each row's first `lengths` entries.
+
+    np.sum uses pairwise summation whose grouping depends on the (padded)
+    width; a cumulative sum keeps the order strictly sequential so a padded
+    batch row and the same unpadded series give bit-identical totals.
+    """
+    totals = np.cumsum(values, axis=-1)
+    if lengths is None:
+        return totals[..., -1]
+    return np.take_along_axis(totals, (lengths - 1)[:, None], axis=1)[:, 0]
+
+
+def fit_linear(y: np.ndarray, x: Optional[np.ndarray] = None,
+               lengths: Optional[np.ndarray] = None) -> LinearFit:
+    """
+    Fit ordinary least squares y = a + b * x in closed form.
+
+    Args:
+        y: Values, shape (points,) or (series, points)
+        x: Regressor of the same shape as y; None means the time index 0..n-1
+        lengths: Valid points per row for a padded batch (None = all points)
+
+    Returns:
+        LinearFit. Series with fewer than two points get slope 0 and their
+        mean as intercept.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    single = y.ndim == 1
+    y = np.atleast_2d(y)
+    if lengths is None:
+        lengths = np.full(len(y), y.shape[1])
+    lengths = np.asarray(lengths)
+    n = lengths.astype(np.float64)
+
+    if x is None:
+        # Exact moments of the time index 0..n-1
+        x = np.broadcast_to(np.arange(y.shape[1], dtype=np.float64), y.shape)
+        x_mean = (n - 1) / 2
+        sxx = n * (n * n - 1) / 12
+    else:
+        x = np.atleast_2d(np.asarray(x, dtype=np.float64))
+        x_mean = sequential_total(x, lengths) / n
+        sxx = sequential_total((x - x_mean[:, None]) ** 2, lengths)
+
+    y_mean = sequential_total(y, lengths) / n
+    sxy = sequential_total((x - x_mean[:, None]) * y, lengths)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where((n >= 2) & (sxx > 0), sxy / sxx, 0.0)
+    intercept = y_mean - slope * x_mean
+
+    residuals = y - (intercept[:, None] + slope[:, None] * x)
+    rss = sequential_total(residuals ** 2, lengths)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        residual_variance = np.where(n > 2, rss / (n - 2), 0.0)
+
+    fit = LinearFit(slope, intercept, residual_variance, n, x_mean, sxx)
+    if single:
+        return LinearFit(*(value[0] for value in fit))
+    return fit
+
+
+def _per_series(fit: LinearFit, value: np.ndarray) -> np.ndarray:
+    """Add a trailing axis to batched per-series values so they broadcast over x."""
+    return value[:, None] if np.ndim(fit.slope) else value
+
+
+def predict(fit: LinearFit, x_new: np.ndarray) -> np.ndarray:
+    """
+    Predict at new x values.
+
+    Args:
+        x_new: Shape (k,), or (series, k) for per-series x values in a batch
+    """
+    x_new = np.asarray(x_new, dtype=np.float64)
+    return _per_series(fit, fit.intercept) + _per_series(fit, fit.slope) * x_new
+
+
+def prediction_interval(fit: LinearFit, x_new: np.ndarray,
+                        z: float = 1.96) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Normal-approximation prediction interval for new observations.
+
+    Half-width = z * sqrt(s^2 * (1 + 1/n + (x - x_mean)^2 / Sxx)).
+
+    Returns:
+        Tuple of (lower_bounds, upper_bounds)
+    """
+    x_new = np.asarray(x_new, dtype=np.float64)
+    predictions = predict(fit, x_new)
+    sxx = _per_series(fit, fit.sxx)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        leverage = np.where(sxx > 0, (x_new - _per_series(fit, fit.x_mean)) ** 2 / sxx, 0.0)
+    variance = _per_series(fit, fit.residual_variance) * (1 + 1 / _per_series(fit, fit.n) + leverage)
+    half_width = z * np.sqrt(variance)
+    return predictions - half_width, predictions + half_width
+
+
+if __name__ == "__main__":
+    import time
+
+    def _best_of(fn, repeats: int = 5) -> float:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    rng = np.random.default_rng(0)
+    months, calls, batch = 24, 1000, 10000
+    series = rng.normal(20000, 3000, size=(batch, months)).cumsum(axis=1)
+    t = np.arange(months).reshape(-1, 1)
+
+    def kernel_per_call():
+        for row in series[:calls]:
+            predict(fit_linear(row), np.arange(months, months + 12))
+
+    kernel_time = _best_of(kernel_per_call)
+    batch_time = _best_of(lambda: predict(fit_linear(series), np.arange(months, months + 12)))
+    print(f"closed-form kernel, {calls} single fits: {kernel_time * 1000:8.2f} ms")
+    print(f"closed-form kernel, {batch} stacked fits: {batch_time * 1000:8.2f} ms")
+
+    try:
+        from sklearn.linear_model import LinearRegression
+    except ImportError:
+        print("scikit-learn not installed; skipping baseline")
+    else:
+        def sklearn_per_call():
+            for row in series[:calls]:
+                model = LinearRegression()
+                model.fit(t, row)
+                model.predict(np.arange(months, months + 12).reshape(-1, 1))
+
+        sklearn_time = _best_of(sklearn_per_call, repeats=3)
+        print(f"sklearn LinearRegression, {calls} fits: {sklearn_time * 1000:8.2f} ms")
+        print(f"speedup per call: {sklearn_time / kernel_time:.1f}x")
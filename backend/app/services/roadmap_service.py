@@ -17,8 +17,8 @@ import json
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 from pydantic import BaseModel, Field
-from groq import AsyncGroq
 from app.core.config import settings
+from app.services.ai_service import get_groq_client
 
 
 class TaskItem(BaseModel):
@@ -73,10 +73,6 @@ class RoadmapRequest(BaseModel):
     priority: Optional[str] = Field(None, description="Priority level: low, medium, high")
 
 
-# Initialize Groq client
-client = AsyncGroq(api_key=settings.GROQ_API_KEY)
-
-
 ROADMAP_SYSTEM_PROMPT = """You are an expert startup execution strategist. Your task is to convert business strategies into detailed, actionable execution roadmaps.
 
 Guidelines:
@@ -166,7 +162,7 @@ async def generate_roadmap(request: RoadmapRequest, user_context: str = "") -> E
     user_prompt += "\n\nGenerate a detailed execution roadmap for this strategy."
     
     try:
-        chat_completion = await client.chat.completions.create(
+        chat_completion = await get_groq_client().chat.completions.create(
             messages=[
                 {"role": "system", "content": ROADMAP_SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt}
@@ -0,0 +1,236 @@
+"""
+Spreadsheet Schema Inference for STRATA-AI
+
+Financial spreadsheets (CSV, Excel, Google Sheets) used to be parsed by
+trial and error on every row: each row's keys went through
+normalize_column_name and each date through up to ten strptime formats
+before the regex fallback.
+
+infer_schema instead samples the first INGEST_SCHEMA_SAMPLE_ROWS rows once
+and fixes:
+- the source column behind month, revenue, expenses and cash_balance
+  (when several columns normalize to the same field, the one whose
+  samples parse best; ties go to the last column, as before)
+- the date format most sample dates match, so an ambiguous day/month
+  order is decided once for the whole file
+- the number format: currency symbols, thousands separators, accounting
+  parentheses
+
+RowParser compiles the schema into one date regex and one number
+translation. Cells that do not fit fall back to the lenient
+parse_date_to_month / parse_float, so no row parses worse than before.
+The schema is returned in ExtractionResponse for clients to confirm.
+"""
+
+import calendar
+import re
+from datetime import date, datetime
+from itertools import chain, islice
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.services.ingestion import DATE_FORMATS, normalize_column_name, parse_date_to_month, parse_float
+
+DATE_FIELDS = ("month", "date")  # Normalized date column names, by priority
+AMOUNT_FIELDS = ("revenue", "expenses", "cash_balance")
+CURRENCY_SYMBOLS = "$€£¥"
+
+# Timestamps resolve to the same month as parse_date_to_month's regex fallback
+INFERRED_DATE_FORMATS = DATE_FORMATS + ["%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S"]
+
+_DIRECTIVES = {
+    "%Y": r"(?P<year>\d{4})",
+    "%m": r"(?P<month>\d{1,2})",
+    "%d": r"(?P<day>\d{1,2})",
+    "%B": r"(?P<month_name>[a-z]+)",
+    "%b": r"(?P<month_name>[a-z]+)",
+    "%H": r"\d{1,2}",
+    "%M": r"\d{1,2}",
+    "%S": r"\d{1,2}",
+}
+_MONTH_NAMES = {
+    "%B": {name.lower(): number for number, name in enumerate(calendar.month_name) if name},
+    "%b": {name.lower(): number for number, name in enumerate(calendar.month_abbr) if name},
+}
+_NUMBER_TRANSLATION = str.maketrans({**dict.fromkeys(CURRENCY_SYMBOLS + ","), "(": "-", ")": None})
+
+
+class InferredSchema(BaseModel):
+    """Column mapping and value formats inferred from the first rows of a spreadsheet."""
+    columns: Dict[str, str] = {}  # Field (month, revenue, expenses, cash_balance) -> source column
+    date_format: Optional[str] = None  # strptime format; None when dates are parsed row by row
+    currency_symbols: bool = False
+    thousands_separators: bool = False
+    accounting_negatives: bool = False
+    sample_rows: int = 0
+
+
+def _text(value: Any) -> str:
+    return "" if value is None else value if isinstance(value, str) else str(value)
+
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text.strip().translate(_NUMBER_TRANSLATION))
+        return True
+    except ValueError:
+        return False
+
+
+def _matches_format(text: str, date_format: str) -> bool:
+    try:
+        datetime.strptime(text.strip(), date_format)
+        return True
+    except ValueError:
+        return False
+
+
+def _best(candidates: List[str], score: Callable[[str], int]) -> str:
+    """Highest-scoring candidate; the last one on ties."""
+    return max(reversed(candidates), key=score)
+
+
+def infer_schema(fieldnames: Iterable[str], sample: List[Mapping[str, Any]]) -> InferredSchema:
+    """
+    Infer a spreadsheet's schema from its header and first rows.
+
+    Args:
+        fieldnames: Source column names
+        sample: First rows, keyed by source column name
+    """
+    candidates: Dict[str, List[str]] = {}
+    for column in fieldnames:
+        if column:
+            candidates.setdefault(normalize_column_name(column), []).append(column)
+
+    def values(column: str) -> List[str]:
+        return [text for row in sample if (text := _text(row.get(column)).strip())]
+
+    schema = InferredSchema(sample_rows=len(sample))
+
+    date_candidates = next((candidates[field] for field in DATE_FIELDS if field in candidates), None)
+    if date_candidates:
+        column = _best(date_candidates, lambda c: sum(parse_date_to_month(v) is not None for v in values(c)))
+        schema.columns["month"] = column
+        dates = values(column)
+        matches = [sum(_matches_format(date, fmt) for date in dates) for fmt in INFERRED_DATE_FORMATS]
+        if dates and max(matches):
+            # The first format on ties keeps parse_date_to_month's preference
+            schema.date_format = INFERRED_DATE_FORMATS[matches.index(max(matches))]
+
+    numbers: List[str] = []
+    for field in AMOUNT_FIELDS:
+        if field in candidates:
+            column = _best(candidates[field], lambda c: sum(_is_number(v) for v in values(c)))
+            schema.columns[field] = column
+            numbers.extend(values(column))
+    schema.currency_symbols = any(symbol in number for number in numbers for symbol in CURRENCY_SYMBOLS)
+    schema.thousands_separators = any("," in number for number in numbers)
+    schema.accounting_negatives = any("(" in number for number in numbers)
+    return schema
+
+
+def compile_date_parser(date_format: str) -> Callable[[str], Optional[str]]:
+    """
+    YYYY-MM parser for one strptime format, as a single regex match.
+    Text in any other format falls back to parse_date_to_month.
+    """
+    pattern = re.compile(
+        "".join(_DIRECTIVES.get(part, re.escape(part)) for part in re.split(r"(%[a-zA-Z])", date_format)),
+        re.IGNORECASE,
+    )
+    month_names = _MONTH_NAMES.get("%B" if "%B" in date_format else "%b", {})
+
+    def parse(text: str) -> Optional[str]:
+        match = pattern.fullmatch(text.strip())
+        if match:
+            fields = match.groupdict()
+            year = int(fields["year"])
+            if fields.get("month_name") is not None:
+                month = month_names.get(fields["month_name"].lower(), 0)
+            else:
+                month = int(fields["month"])
+            day = int(fields.get("day") or 1)
+            if year and 1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]:
+                return f"{year:04d}-{month:02d}"
+        return parse_date_to_month(text)
+
+    return parse
+
+
+def compile_number_parser(schema: InferredSchema) -> Callable[[Any], float]:
+    """float parser for the schema's number format, falling back to parse_float."""
+    formatted = schema.currency_symbols or schema.thousands_separators or schema.accounting_negatives
+
+    def parse(value: Any) -> float:
+        if isinstance(value, (int, float)):
+            return float(value)
+        if not value:
+            return 0.0
+        try:
+            return float(value.translate(_NUMBER_TRANSLATION) if formatted else value)
+        except (AttributeError, TypeError, ValueError):
+            return parse_float(value)
+
+    return parse
+
+
+class RowParser:
+    """Parses spreadsheet rows (keyed by source column) with a compiled InferredSchema."""
+
+    def __init__(self, schema: InferredSchema):
+        self._date_column = schema.columns.get("month")
+        self._amount_columns = [schema.columns.get(field) for field in AMOUNT_FIELDS]
+        self.parse_date = compile_date_parser(schema.date_format) if schema.date_format else parse_date_to_month
+        self.parse_number = compile_number_parser(schema)
+
+    def date_text(self, row: Mapping[str, Any]) -> str:
+        return _text(row.get(self._date_column)) if self._date_column else ""
+
+    def month(self, row: Mapping[str, Any]) -> Optional[str]:
+        value = row.get(self._date_column) if self._date_column else None
+        if isinstance(value, date):  # Excel date cells
+            return f"{value.year:04d}-{value.month:02d}"
+        return self.parse_date(_text(value))
+
+    def amounts(self, row: Mapping[str, Any]) -> Tuple[float, float, float]:
+        """(revenue, expenses, cash_balance); 0 for unmapped columns."""
+        revenue, expenses, cash = (
+            self.parse_number(row.get(column)) if column else 0.0 for column in self._amount_columns
+        )
+        return revenue, expenses, cash
+
+
+def infer_schema_from_rows(fieldnames: Iterable[str], rows: Iterable[Mapping[str, Any]],
+                           sample_size: Optional[int] = None) -> Tuple[InferredSchema, Iterator[Mapping[str, Any]]]:
+    """
+    Infer the schema from the first rows of `rows`.
+
+    Returns:
+        Tuple of (schema, iterator over all rows, sampled ones included)
+    """
+    rows = iter(rows)
+    sample = list(islice(rows, sample_size or settings.INGEST_SCHEMA_SAMPLE_ROWS))
+    return infer_schema(fieldnames, sample), chain(sample, rows)
+
+
+async def infer_schema_from_stream(fieldnames: Iterable[str], rows: AsyncIterator[Mapping[str, Any]],
+                                   sample_size: Optional[int] = None
+                                   ) -> Tuple[InferredSchema, AsyncIterator[Mapping[str, Any]]]:
+    """Async counterpart of infer_schema_from_rows, for streamed uploads."""
+    sample_size = sample_size or settings.INGEST_SCHEMA_SAMPLE_ROWS
+    sample: List[Mapping[str, Any]] = []
+    async for row in rows:
+        sample.append(row)
+        if len(sample) >= sample_size:
+            break
+
+    async def replay() -> AsyncIterator[Mapping[str, Any]]:
+        for row in sample:
+            yield row
+        async for row in rows:
+            yield row
+
+    return infer_schema(fieldnames, sample), replay()
@@ -0,0 +1,294 @@
+"""
+Google Sheets Sync for STRATA-AI
+
+A connected sheet is a SheetConnection, re-imported on demand and in the
+background, instead of a one-off download:
+
+- Exports are fetched with one pooled httpx.AsyncClient, conditionally
+  (If-None-Match / If-Modified-Since from the last sync). A 304, or an
+  export whose SHA-256 matches the last import, ends the sync without
+  parsing
+- A changed export is imported under an UploadImport (see
+  upload_fingerprints.py), so only months whose values changed are
+  upserted
+- The scheduler wakes every SHEETS_SYNC_POLL_SECONDS and refreshes the
+  connections due (every SHEETS_SYNC_INTERVAL_SECONDS), at most
+  SHEETS_SYNC_CONCURRENCY at a time. A connection is claimed by moving
+  its next_sync_at forward, so API processes never sync the same sheet
+  at once
+
+The HTTP transport is pluggable: configure(transport=...) accepts any
+httpx.AsyncBaseTransport, e.g. httpx.MockTransport serving local CSV
+files in tests. The CSV importer is registered by the onboarding
+endpoints, which own the spreadsheet parsing.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.models.sheet_connection import SheetConnection
+from app.models.user import User
+from app.services.ingestion import IngestionLimitError
+from app.services.upload_fingerprints import UploadImport
+
+logger = logging.getLogger(__name__)
+
+SHEET_ID_PATTERNS = [
+    r'/spreadsheets/d/([a-zA-Z0-9-_]+)',
+    r'id=([a-zA-Z0-9-_]+)',
+]
+EXPORT_URL = "https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
+
+SheetImporter = Callable[[str, User], Awaitable[Dict[str, Any]]]  # (CSV text, user) -> response body
+
+
+class SheetFetchError(RuntimeError):
+    """Raised when a sheet's CSV export cannot be downloaded."""
+
+
+class SheetExport(NamedTuple):
+    """A fetched CSV export; text is None when the sheet is unchanged (304)."""
+    text: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+def extract_sheet_id(sheet_url: str) -> Optional[str]:
+    """Sheet id from the usual Google Sheets URL formats."""
+    for pattern in SHEET_ID_PATTERNS:
+        match = re.search(pattern, sheet_url)
+        if match:
+            return match.group(1)
+    return None
+
+
+class SheetSync:
+    """Fetches and imports connected sheets, and refreshes them in the background."""
+
+    def __init__(self, concurrency: int = 4):
+        """
+        Args:
+            concurrency: Sheets refreshed at once by the scheduler
+        """
+        self.concurrency = concurrency
+        self._importer: Optional[SheetImporter] = None
+        self._transport: Optional[httpx.AsyncBaseTransport] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def configure(self, importer: Optional[SheetImporter] = None,
+                  transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        """Set the CSV importer and/or the HTTP transport (before the first fetch)."""
+        if importer is not None:
+            self._importer = importer
+        if transport is not None:
+            self._transport = transport
+
+    def client(self) -> httpx.AsyncClient:
+        """The pooled HTTP client, created on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                follow_redirects=True,  # Exports redirect to googleusercontent.com
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=self.concurrency * 2,
+                                    max_keepalive_connections=self.concurrency),
+            )
+        return self._client
+
+    # ============== Fetch and import ==============
+
+    async def fetch(self, sheet_id: str, etag: Optional[str] = None,
+                    last_modified: Optional[str] = None) -> SheetExport:
+        """
+        Download a sheet's CSV export, conditionally when validators are given.
+
+        Raises:
+            SheetFetchError: If the sheet can't be downloaded
+            IngestionLimitError: If the export exceeds INGEST_MAX_DOCUMENT_BYTES
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        max_bytes = settings.INGEST_MAX_DOCUMENT_BYTES
+        try:
+            async with self.client().stream("GET", EXPORT_URL.format(sheet_id=sheet_id), headers=headers) as response:
+                if response.status_code == 304:
+                    return SheetExport(None, etag, last_modified)
+                if response.status_code != 200:
+                    raise SheetFetchError(f"Sheet export returned HTTP {response.status_code}")
+                chunks: List[bytes] = []
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise IngestionLimitError(f"Sheet is larger than {max_bytes // (1024 * 1024)} MB")
+                    chunks.append(chunk)
+                text = b"".join(chunks).decode(response.encoding or "utf-8", errors="replace")
+                return SheetExport(text, response.headers.get("etag"), response.headers.get("last-modified"))
+        except httpx.HTTPError as e:
+            raise SheetFetchError(f"Could not download sheet: {e}") from e
+
+    async def connect(self, user: User, sheet_url: str) -> Tuple[SheetConnection, Dict[str, Any]]:
+        """
+        Create or reuse (updating its URL) the user's connection to a sheet
+        and sync it now.
+
+        Raises:
+            ValueError: If no sheet id can be found in the URL
+            SheetFetchError: If the sheet can't be downloaded
+        """
+        sheet_id = extract_sheet_id(sheet_url)
+        if not sheet_id:
+            raise ValueError("No sheet id in URL")
+        connection = await self._connection(user, sheet_id)
+        if connection is None:
+            connection = SheetConnection(user=user, sheet_id=sheet_id, sheet_url=sheet_url)
+            try:
+                await connection.insert()
+            except DuplicateKeyError:
+                # A concurrent connect inserted it first; reuse that one
+                connection = await self._connection(user, sheet_id)
+        if connection.sheet_url != sheet_url:
+            await connection.set({SheetConnection.sheet_url: sheet_url})
+        return connection, await self.sync(connection, user)
+
+    @staticmethod
+    async def _connection(user: User, sheet_id: str) -> Optional[SheetConnection]:
+        return await SheetConnection.find_one(
+            SheetConnection.user.id == user.id, SheetConnection.sheet_id == sheet_id
+        )
+
+    async def sync(self, connection: SheetConnection, user: User) -> Dict[str, Any]:
+        """
+        Fetch and import a connected sheet, skipping whatever is unchanged.
+
+        Returns:
+            The importer's response body; the stored one, with
+            deduplicated=True, when the sheet hasn't changed
+
+        Raises:
+            SheetFetchError: If the sheet can't be downloaded
+        """
+        now = datetime.utcnow()
+        kind = f"google_sheets:{connection.sheet_id}"
+        try:
+            export = await self.fetch(connection.sheet_id, connection.etag, connection.last_modified)
+            if export.text is None:
+                # Not modified: done, unless another import overwrote some of its months
+                upload = await UploadImport.lookup(user, kind, connection.content_hash or "")
+                response = await upload.duplicate_response()
+                if response is None:
+                    export = await self.fetch(connection.sheet_id)
+        except (SheetFetchError, IngestionLimitError) as e:
+            await connection.set({SheetConnection.last_error: str(e),
+                                  SheetConnection.next_sync_at: self._next_sync(now)})
+            raise SheetFetchError(str(e)) from e
+
+        imported = False
+        if export.text is not None:
+            digest = hashlib.sha256(export.text.encode()).hexdigest()
+            upload = await UploadImport.lookup(user, kind, digest)
+            response = await upload.duplicate_response()
+            if response is None:
+                with upload:
+                    response = await self._importer(export.text, user)
+                imported = True
+                if response.get("success"):
+                    await upload.save(response)
+            if response.get("success"):
+                connection.content_hash = digest
+        if response.get("success"):
+            # Validators only once the content they stand for is imported
+            connection.etag = export.etag
+            connection.last_modified = export.last_modified
+            connection.last_response = response
+        connection.last_error = None if response.get("success") else response.get("message")
+        connection.last_synced_at = now
+        connection.next_sync_at = self._next_sync(now)
+        await connection.save()
+        return {**response, "deduplicated": not imported}
+
+    @staticmethod
+    def _next_sync(now: datetime) -> datetime:
+        return now + timedelta(seconds=settings.SHEETS_SYNC_INTERVAL_SECONDS)
+
+    # ============== Background refresh ==============
+
+    def start(self) -> None:
+        """Start the refresh loop (idempotent; disabled when SHEETS_SYNC_INTERVAL_SECONDS is 0)."""
+        if self._task is None and settings.SHEETS_SYNC_INTERVAL_SECONDS > 0:
+            self._task = asyncio.create_task(self._run(), name="sheet-sync-scheduler")
+            logger.info(f"Sheet sync scheduler started (every {settings.SHEETS_SYNC_INTERVAL_SECONDS}s, "
+                        f"{self.concurrency} at a time)")
+
+    async def stop(self) -> None:
+        """Stop the refresh loop and close the HTTP client."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh_due()
+            except Exception:
+                logger.exception("Sheet sync refresh failed")
+            await asyncio.sleep(settings.SHEETS_SYNC_POLL_SECONDS)
+
+    async def _claim_due(self) -> Optional[SheetConnection]:
+        """Take the most overdue connection, pushing its next sync forward."""
+        now = datetime.utcnow()
+        raw = await SheetConnection.get_pymongo_collection().find_one_and_update(
+            {"next_sync_at": {"$lte": now}},
+            {"$set": {"next_sync_at": self._next_sync(now)}},
+            sort=[("next_sync_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        return await SheetConnection.get(raw["_id"]) if raw else None
+
+    async def refresh_due(self) -> int:
+        """Sync every connection that is due, SHEETS_SYNC_CONCURRENCY at a time. Returns the count."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks: List[asyncio.Task] = []
+        while True:
+            await semaphore.acquire()  # Claim no faster than sheets finish
+            connection = await self._claim_due()
+            if connection is None:
+                semaphore.release()
+                break
+            tasks.append(asyncio.create_task(self._refresh(connection, semaphore)))
+        await asyncio.gather(*tasks)
+        return len(tasks)
+
+    async def _refresh(self, connection: SheetConnection, semaphore: asyncio.Semaphore) -> None:
+        try:
+            user = await User.get(connection.user.ref.id)
+            if user is None:
+                await connection.delete()
+                return
+            await self.sync(connection, user)
+        except SheetFetchError as e:
+            logger.warning(f"Sheet {connection.sheet_id} not refreshed: {e}")
+        except Exception:
+            logger.exception(f"Sheet {connection.sheet_id} refresh failed")
+        finally:
+            semaphore.release()
+
+
+sheet_sync = SheetSync(concurrency=settings.SHEETS_SYNC_CONCURRENCY)
@@ -0,0 +1,139 @@
+"""
+Whole-File Spreadsheet Parsing for STRATA-AI
+
+The import endpoints stream a financial CSV or Excel upload on the event
+loop, yielding between chunks, so one large file never blocks the
+worker. /onboarding/extract-from-files imports several files at once,
+though, and on the loop their spreadsheets would only take turns. There,
+each spreadsheet is read whole (as PDFs are) and parsed here, on
+cpu_executor, so the files are parsed in parallel:
+
+- parse_financial_csv / parse_financial_excel take the upload's bytes
+  and return a ParsedSpreadsheet: the months in a MonthlyUpsertBatch
+  without a user (the caller extend()s it into its own and writes it),
+  FinancialTotals, row errors and the inferred schema
+- Both take and return plain values, so they pickle for process pools
+
+fold_row() is the row handling shared with the streamed importers in
+onboarding.py.
+"""
+
+import csv
+import io
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional
+
+from app.services.excel_ingestion import iter_sheet_rows, open_workbook, select_sheet
+from app.services.import_pipeline import MonthlyUpsertBatch
+from app.services.ingestion import BoundedErrors, IngestionLimitError
+from app.services.schema_inference import InferredSchema, RowParser, infer_schema_from_rows
+
+
+def month_values(revenue: float, expense: float, cash: float) -> Dict[str, float]:
+    """FinancialRecord fields for a month given as totals (expenses split 60/20/10/10)."""
+    return {
+        "revenue_recurring": revenue,
+        "expenses_salaries": expense * 0.6,
+        "expenses_marketing": expense * 0.2,
+        "expenses_infrastructure": expense * 0.1,
+        "expenses_other": expense * 0.1,
+        "cash_balance": cash,
+    }
+
+
+class FinancialTotals:
+    """Running figures behind the extracted financial data, kept in O(1) memory."""
+
+    def __init__(self):
+        self.revenue_sum = 0.0
+        self.revenue_months = 0
+        self.expense_sum = 0.0
+        self.expense_months = 0
+        self.latest_cash_balance: Optional[float] = None
+
+    def add(self, revenue: float, expense: float, cash: float):
+        if revenue > 0:
+            self.revenue_sum += revenue
+            self.revenue_months += 1
+        if expense > 0:
+            self.expense_sum += expense
+            self.expense_months += 1
+        if cash > 0:
+            self.latest_cash_balance = cash
+
+    def figures(self, months_of_data: int, records_parsed: int) -> Dict[str, Any]:
+        """Fields of FinancialDataExtracted."""
+        return {
+            "latest_cash_balance": self.latest_cash_balance,
+            "average_monthly_expenses": self.expense_sum / self.expense_months if self.expense_months else None,
+            "average_monthly_revenue": self.revenue_sum / self.revenue_months if self.revenue_months else None,
+            "months_of_data": months_of_data,
+            "records_parsed": records_parsed,
+        }
+
+
+def fold_row(parser: RowParser, row: Mapping[str, Any], batch: MonthlyUpsertBatch, totals: FinancialTotals,
+             errors: BoundedErrors, report_dates: bool = False, label: str = "row") -> None:
+    """
+    Add one spreadsheet row to `batch` and `totals`. Rows without a month
+    are skipped (and reported if `report_dates`); other row problems are
+    reported, except IngestionLimitError, which ends the import.
+    """
+    try:
+        month = parser.month(row)
+        if not month:
+            if report_dates:
+                errors.append(f"Could not parse date: {parser.date_text(row)}")
+            return
+        revenue, expense, cash = parser.amounts(row)
+        totals.add(revenue, expense, cash)  # Track for averages
+        batch.add(month, month_values(revenue, expense, cash))
+    except IngestionLimitError:
+        raise
+    except Exception as e:
+        errors.append(f"Error processing {label}: {str(e)}")
+
+
+class ParsedSpreadsheet(NamedTuple):
+    """A financial spreadsheet parsed off the event loop."""
+    batch: MonthlyUpsertBatch  # No user; extend() a real batch with it
+    totals: FinancialTotals
+    errors: List[str]
+    schema: Optional[InferredSchema]
+    sheet: Optional[str] = None  # Excel sheet imported
+    error: Optional[str] = None  # Set when nothing could be parsed
+
+
+def parse_financial_csv(content: bytes) -> ParsedSpreadsheet:
+    """Parse a whole financial CSV upload."""
+    batch = MonthlyUpsertBatch(None)
+    totals = FinancialTotals()
+    errors = BoundedErrors()
+
+    reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig"), newline=""))
+    if not reader.fieldnames:
+        return ParsedSpreadsheet(batch, totals, [], None, error="No columns found in CSV")
+
+    # Column mapping and value formats are inferred once from the first rows
+    schema, rows = infer_schema_from_rows(reader.fieldnames, reader)
+    parser = RowParser(schema)
+    for row in rows:
+        fold_row(parser, row, batch, totals, errors, report_dates=True)
+    return ParsedSpreadsheet(batch, totals, errors.messages(), schema)
+
+
+def parse_financial_excel(content: bytes, sheet_name: Optional[str] = None) -> ParsedSpreadsheet:
+    """Parse one sheet of a whole Excel upload (auto-detected unless `sheet_name`)."""
+    batch = MonthlyUpsertBatch(None)
+    totals = FinancialTotals()
+    errors = BoundedErrors()
+
+    workbook = open_workbook(io.BytesIO(content))
+    try:
+        sheet = select_sheet(workbook, sheet_name)
+        schema, rows = infer_schema_from_rows(sheet.headers, iter_sheet_rows(workbook, sheet))
+        parser = RowParser(schema)
+        for row in rows:
+            fold_row(parser, row, batch, totals, errors, label="Excel row")
+    finally:
+        workbook.close()
+    return ParsedSpreadsheet(batch, totals, errors.messages(), schema, sheet=sheet.name)
@@ -0,0 +1,267 @@
+"""
+Bank Statement Scanner for STRATA-AI
+
+scan_statement walks a statement's extracted text once, line by line,
+with a handful of patterns compiled at import:
+
+- Lines starting with a date are transactions. The first amount on the
+  line is the transaction, a last one the running balance. A transaction
+  is income or expense by, in order: the change in running balance, its
+  sign (-, parentheses, CR/DR), then keywords in its description
+- Other lines are matched against one alternation of the summary labels
+  (closing balance, total deposits, total withdrawals, ...). A label at
+  the end of a line takes its amount from the next line, as PDF table
+  cells often come out one per line
+- Transactions are listed (for the ledger, see ledger.py) and summed per
+  month (income, expenses, last running balance), giving every month the
+  statement covers
+
+Dates without a year take the statement period's year, rolling over
+when the month goes from December to January. Numeric dates are read as
+MM/DD unless the first number can only be a day; dotted ones need a
+year, or a line starting with an amount (12.50 fee ...) would be dated.
+
+Run `python -m app.services.statement_scanner [months]` for a benchmark
+on a generated statement (120 months by default).
+"""
+
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.ingestion import parse_float
+
+MONTH_NAMES = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+_MONTH = r'(?:' + '|'.join(MONTH_NAMES) + r')[a-z]*\.?'
+
+# Summary labels, in priority order within each kind: the first label
+# (not the first line) with a positive amount decides the figure
+SUMMARY_LABELS: List[Tuple[str, str]] = [
+    ("balance", r'(?:closing|ending|final|current)\s*balance'),
+    ("balance", r'balance'),
+    ("balance", r'available\s*balance'),
+    ("income", r'(?:total\s*)?deposits?'),  # Total deposits/credits (income estimate)
+    ("income", r'(?:total\s*)?credits?'),
+    ("income", r'(?:money\s*in|incoming)'),
+    ("expense", r'(?:total\s*)?withdrawals?'),  # Total withdrawals/debits (expense estimate)
+    ("expense", r'(?:total\s*)?debits?'),
+    ("expense", r'(?:money\s*out|outgoing)'),
+]
+
+SUMMARY_PATTERN = re.compile('|'.join(
+    rf'{label}[:\s]*[$]?(?P<s{index}>[\d,]+\.?\d*)' for index, (_, label) in enumerate(SUMMARY_LABELS)
+), re.IGNORECASE)
+SUMMARY_LABEL_AT_END = re.compile(
+    r'(?:' + '|'.join(label for _, label in SUMMARY_LABELS) + r')[:\s]*[$]?\s*$', re.IGNORECASE
+)
+
+STATEMENT_PERIOD_PATTERN = re.compile(
+    r'(?:statement\s*period|period)[:\s]*.*?(\w+)\s*\d{1,2}\s*[-,]\s*\d{1,2},?\s*(\d{4})', re.IGNORECASE
+)
+
+DATE_PATTERN = re.compile(
+    r'\s*(?:'
+    r'(?P<iy>\d{4})-(?P<im>\d{1,2})-\d{1,2}'
+    r'|(?P<n1>\d{1,2})(?:/|\.(?=\d{1,2}\.\d{2}))(?P<n2>\d{1,2})(?:[/.](?P<ny>\d{4}|\d{2}))?'  # 12.50 is an amount
+    rf'|(?P<mname>{_MONTH})\s+\d{{1,2}}(?:,?\s+(?P<my>\d{{4}}))?'
+    rf'|\d{{1,2}}\s+(?P<dname>{_MONTH})(?:,?\s+(?P<dy>\d{{4}}))?'
+    r')(?!\S)',
+    re.IGNORECASE,
+)
+
+# Amounts in transaction lines have cents, which tells them from dates and references
+AMOUNT_PATTERN = re.compile(r'(?P<open>-|\()?\s?[$]?(?P<value>\d{1,3}(?:,\d{3})+\.\d{2}|\d+\.\d{2})\)?(?:\s*(?P<mark>CR|DR)\b)?',
+                            re.IGNORECASE)
+
+INCOME_WORDS = re.compile(
+    r'\b(?:deposit|credit|received|payout|interest|refund|transfer\s+in|incoming|salary|invoice\s+paid)\b',
+    re.IGNORECASE,
+)
+EXPENSE_WORDS = re.compile(
+    r'\b(?:withdrawal|debit|purchase|payment\s+to|fee|charge|card|atm|transfer\s+out|outgoing|bill|payroll)\b',
+    re.IGNORECASE,
+)
+BALANCE_WORDS = re.compile(r'\bbalance\b', re.IGNORECASE)
+
+
+def _amount(match: re.Match) -> float:
+    """Signed value of an AMOUNT_PATTERN match."""
+    value = float(match.group("value").replace(",", ""))
+    return -value if match.group("open") else value
+
+
+def _period_month(text: str) -> Optional[str]:
+    match = STATEMENT_PERIOD_PATTERN.search(text)
+    if match:
+        month_name, year = match.groups()
+        try:
+            return datetime.strptime(f"{month_name} {year}", "%B %Y").strftime("%Y-%m")
+        except ValueError:
+            pass
+    return None
+
+
+class _Dates:
+    """Turns date prefixes into months, filling in missing years."""
+
+    def __init__(self, year: int):
+        self.year = year
+        self.last_month: Optional[int] = None
+
+    def month(self, match: re.Match) -> Optional[str]:
+        groups = match.groupdict()
+        year_text = None
+        if groups["iy"]:
+            year_text, month = groups["iy"], int(groups["im"])
+        elif groups["n1"]:
+            first, second = int(groups["n1"]), int(groups["n2"])
+            month = second if first > 12 else first  # DD/MM only when it can't be MM/DD
+            year_text = groups["ny"]
+        else:
+            name = groups["mname"] or groups["dname"]
+            month = MONTH_NAMES.index(name[:3].lower()) + 1
+            year_text = groups["my"] or groups["dy"]
+        if not 1 <= month <= 12:
+            return None
+
+        if year_text:
+            self.year = int(year_text) + (2000 if len(year_text) == 2 else 0)
+        elif self.last_month is not None and month < self.last_month:
+            self.year += 1  # December -> January
+        self.last_month = month
+        return f"{self.year:04d}-{month:02d}"
+
+
+def _classify(description: str, amount: float, signed: Optional[bool], delta: Optional[float]) -> Optional[bool]:
+    """True for income, False for an expense, None when it can't be told."""
+    if delta is not None and abs(abs(delta) - amount) < 0.005:
+        return delta > 0
+    if signed is not None:
+        return signed
+    income = INCOME_WORDS.search(description) is not None
+    expense = EXPENSE_WORDS.search(description) is not None
+    if income != expense:
+        return income
+    return None
+
+
+def scan_statement(text: str) -> Dict[str, Any]:
+    """
+    Summary figures, transactions and per-month totals of a statement.
+
+    Returns:
+        Dict with:
+        - summary: {"balance", "income", "expense"}, each the first
+          positive amount of the highest-priority label found, else None
+        - period_month: the statement period's month, if stated
+        - months: {YYYY-MM: {"income", "expense", "closing_balance"}} in
+          statement order; closing_balance is the month's last running
+          balance, else None
+        - transactions: [{"month", "date", "description", "amount"}],
+          amount positive for income and negative for expenses
+        - transaction_count / unclassified: dated lines summed / skipped
+    """
+    period_month = None
+    dates = _Dates(datetime.utcnow().year)
+    summary: Dict[int, float] = {}  # SUMMARY_LABELS index -> first positive amount
+    months: Dict[str, Dict[str, Any]] = {}
+    transactions: List[Dict[str, Any]] = []
+    transaction_count = 0
+    unclassified = 0
+    running_balance: Optional[float] = None
+    pending_label = ""
+
+    for line in text.splitlines():
+        date = DATE_PATTERN.match(line)
+        if date is not None:
+            amounts = list(AMOUNT_PATTERN.finditer(line, date.end()))
+            month = dates.month(date) if amounts else None
+            if month is None:
+                continue
+            totals = months.setdefault(month, {"income": 0.0, "expense": 0.0, "closing_balance": None})
+            description = line[date.end():amounts[0].start()]
+            balance = _amount(amounts[-1]) if len(amounts) > 1 else None
+
+            if BALANCE_WORDS.search(description):
+                # Opening/closing balance rows carry a balance, not a transaction
+                running_balance = _amount(amounts[-1])
+                totals["closing_balance"] = running_balance
+                continue
+
+            first = amounts[0]
+            amount = abs(_amount(first))
+            mark = (first.group("mark") or "").upper()
+            signed = (False if first.group("open") or mark == "DR" else True if mark == "CR" else None)
+            delta = balance - running_balance if balance is not None and running_balance is not None else None
+            income = _classify(description, amount, signed, delta)
+
+            if balance is not None:
+                running_balance = balance
+                totals["closing_balance"] = balance
+            if income is None:
+                unclassified += 1
+                continue
+            totals["income" if income else "expense"] += amount
+            transactions.append({"month": month, "date": date.group(0).strip(), "description": description.strip(),
+                                 "amount": amount if income else -amount})
+            transaction_count += 1
+            continue
+
+        if period_month is None:
+            period_month = _period_month(line)
+            if period_month and dates.last_month is None:
+                dates.year = int(period_month[:4])
+
+        scanned = f"{pending_label} {line}" if pending_label else line
+        pending_label = ""
+        for match in SUMMARY_PATTERN.finditer(scanned):
+            index = int(match.lastgroup[1:])
+            if index not in summary:
+                value = parse_float(match.group(match.lastgroup))
+                if value > 0:
+                    summary[index] = value
+        if SUMMARY_LABEL_AT_END.search(line):
+            pending_label = line
+
+    def first(kind: str) -> Optional[float]:
+        return next((summary[index] for index, (label_kind, _) in enumerate(SUMMARY_LABELS)
+                     if label_kind == kind and index in summary), None)
+
+    return {
+        "summary": {kind: first(kind) for kind in ("balance", "income", "expense")},
+        "period_month": period_month,
+        "months": months,
+        "transactions": transactions,
+        "transaction_count": transaction_count,
+        "unclassified": unclassified,
+    }
+
+
+def _benchmark(months: int = 120) -> None:
+    import time
+
+    lines = ["Statement Period: January 1 - 31, 2015", "Opening balance 10,000.00",
+             "12.50 fee adjustment -12.50 1,483.00"]  # Not a transaction
+    balance = 10000.0
+    for index in range(months * 60):
+        month, day = index // 60 % 12 + 1, index % 28 + 1
+        year = 2015 + index // 720
+        amount = 125.0 + index % 17
+        balance += amount if index % 3 == 0 else -amount
+        label = "Stripe payout" if index % 3 == 0 else "Card purchase AWS"
+        lines.append(f"{month:02d}/{day:02d}/{year} {label} {amount:,.2f} {balance:,.2f}")
+    lines.append(f"Closing balance: {balance:,.2f}")
+    text = "\n".join(lines)
+
+    start = time.perf_counter()
+    result = scan_statement(text)
+    elapsed = time.perf_counter() - start
+    assert result["transaction_count"] == months * 60, result["transaction_count"]
+    print(f"{len(lines):,} lines ({len(text) / 1e6:.1f} MB), {len(result['months'])} months, "
+          f"{result['transaction_count']:,} transactions: {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 120)
@@ -0,0 +1,169 @@
+"""
+Upload Fingerprints for STRATA-AI
+
+Founders re-upload the same spreadsheet or statement several times
+during onboarding. Each upload is hashed (SHA-256, streamed in
+INGEST_CHUNK_BYTES chunks) before it is parsed, and the hash is looked
+up in the user's UploadFingerprints:
+
+- An identical file imported the same way, whose months nobody has
+  written since, is answered with the stored response: nothing is
+  parsed and financial_records is not touched
+- Otherwise the file is imported with an UploadImport active for the
+  request. MonthlyUpsertBatch.write() then hashes each month's values
+  and skips months whose hash matches the one last imported for that
+  month, so a changed file rewrites only the months that changed
+
+Every bulk import, fingerprinted or not, removes the months it writes
+from the user's other fingerprints, so a stored hash always describes
+what financial_records holds. Manual entry only creates months that do
+not exist yet, which no fingerprint can hold.
+
+A fingerprint is stored only once the import's months were written, so
+files that fail before writing (or write nothing) are parsed again.
+"""
+
+import asyncio
+import hashlib
+import json
+from contextvars import ContextVar, Token
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import UploadFile
+
+from app.core.config import settings
+from app.models.upload_fingerprint import UploadFingerprint
+from app.models.user import User
+
+FINGERPRINT_VERSION = 1  # Bump when importers change what a file imports
+
+
+def month_hash(values: Dict[str, float], insert_values: Optional[Dict[str, float]] = None) -> str:
+    """Hash of the values an import writes for one month."""
+    content = json.dumps([values, insert_values or {}], sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()[:32]
+
+
+def _storable(month: str) -> bool:
+    """Months become field names of month_hashes."""
+    return bool(month) and "." not in month and not month.startswith("$")
+
+
+async def upload_digest(file: UploadFile) -> str:
+    """SHA-256 of an upload, read in chunks; the upload is rewound afterwards."""
+    digest = hashlib.sha256()
+    await file.seek(0)
+    while chunk := await file.read(settings.INGEST_CHUNK_BYTES):
+        digest.update(chunk)
+        await asyncio.sleep(0)
+    await file.seek(0)
+    return digest.hexdigest()
+
+
+async def forget_months(user: User, months: Iterable[str]) -> None:
+    """Drop months just written from the user's fingerprints."""
+    unset = {f"month_hashes.{month}": "" for month in months if _storable(month)}
+    if unset:
+        await UploadFingerprint.get_pymongo_collection().update_many({"user": user.to_ref()}, {"$unset": unset})
+
+
+async def forget_user(user: User) -> None:
+    await UploadFingerprint.find(UploadFingerprint.user.id == user.id).delete()
+
+
+_current: ContextVar[Optional["UploadImport"]] = ContextVar("upload_import", default=None)
+
+
+def current_upload() -> Optional["UploadImport"]:
+    """The fingerprinted upload being imported by this request, if any."""
+    return _current.get()
+
+
+class UploadImport:
+    """
+    One fingerprinted upload. Use as a context manager around the import
+    so MonthlyUpsertBatch can skip unchanged months and record the rest.
+    """
+
+    def __init__(self, user: User, kind: str, digest: str, filename: str,
+                 previous: Optional[UploadFingerprint] = None):
+        self.user = user
+        self.kind = kind
+        self.digest = digest
+        self.filename = filename
+        self.previous = previous
+        self.months: Dict[str, Optional[str]] = {}  # Month -> hash; None when its write failed
+        self.written = False
+        self._token: Optional[Token] = None
+
+    @classmethod
+    async def open(cls, file: UploadFile, user: User, kind: str) -> "UploadImport":
+        """Hash the upload and look up an earlier import of the same content."""
+        return await cls.lookup(user, kind, await upload_digest(file), file.filename or "")
+
+    @classmethod
+    async def lookup(cls, user: User, kind: str, digest: str, filename: str = "") -> "UploadImport":
+        """Look up an earlier import of content with SHA-256 `digest` (hex)."""
+        kind = f"{kind}:v{FINGERPRINT_VERSION}"
+        previous = await UploadFingerprint.find_one(
+            UploadFingerprint.user.id == user.id,
+            UploadFingerprint.kind == kind,
+            UploadFingerprint.digest == digest,
+        )
+        return cls(user, kind, digest, filename, previous)
+
+    async def duplicate_response(self) -> Optional[Dict[str, Any]]:
+        """The stored response if this exact import is still in effect, else None."""
+        if self.previous is None or not self.previous.complete:
+            return None
+        await self.previous.set({UploadFingerprint.used_at: datetime.utcnow()})
+        return self.previous.response
+
+    def __enter__(self) -> "UploadImport":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _current.reset(self._token)
+
+    async def baseline(self, months: Iterable[str]) -> Dict[str, str]:
+        """Hash of the values last imported for each of `months` that still holds them."""
+        wanted = {month for month in months if _storable(month)}
+        hashes: Dict[str, str] = {}
+        if not wanted:
+            return hashes
+        cursor = UploadFingerprint.get_pymongo_collection().find(
+            {"user": self.user.to_ref()}, {"month_hashes": 1}
+        )
+        async for fingerprint in cursor:
+            for month, value in fingerprint.get("month_hashes", {}).items():
+                if month in wanted:
+                    hashes[month] = value
+        return hashes
+
+    def record(self, hashes: Dict[str, str], failed: Iterable[str] = ()) -> None:
+        """Called by MonthlyUpsertBatch.write() with the hashes of the months now in effect."""
+        self.months.update(hashes)
+        self.months.update(dict.fromkeys(failed))
+        self.written = True
+
+    async def save(self, response: Dict[str, Any]) -> None:
+        """Store the fingerprint and response, if the import wrote its months."""
+        if not self.written or not all(_storable(month) for month in self.months):
+            return
+        now = datetime.utcnow()
+        await UploadFingerprint.get_pymongo_collection().update_one(
+            {"user": self.user.to_ref(), "kind": self.kind, "digest": self.digest},
+            {
+                "$set": {
+                    "filename": self.filename,
+                    "months": sorted(self.months),
+                    "month_hashes": {month: value for month, value in self.months.items() if value is not None},
+                    "response": response,
+                    "used_at": now,
+                },
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+        )
@@ -0,0 +1,8 @@
+"""
+Shared test setup: settings are required at import, so tests get
+placeholders (nothing connects to them).
+"""
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
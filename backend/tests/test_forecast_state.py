@@ -0,0 +1,51 @@
+"""
+Forecast state: rebuilds on the CPU executor (in process mode) and
+running cash-balance moments
+"""
+import numpy as np
+import pytest
+
+from app.core.executor import CPUExecutor
+from app.models.forecast_state import ForecastInputs, ForecastState
+from app.services.forecast_state import apply_month, build_state
+
+TOTALS = [
+    (f"{2023 + index // 12}-{index % 12 + 1:02d}", 10000.0 + 500 * index, 25000.0 - 100 * index,
+     300000.0 - 12000 * index)
+    for index in range(18)
+]
+
+
+@pytest.mark.asyncio
+async def test_build_state_runs_in_process_executor():
+    executor = CPUExecutor(kind="process", workers=1, queue_depth=1)
+    try:
+        inputs = await executor.run(build_state, TOTALS)
+    finally:
+        executor.shutdown()
+
+    expected = build_state(TOTALS)
+    assert inputs.model_dump(exclude={"selection"}) == expected.model_dump(exclude={"selection"})
+    assert inputs.selection.method == expected.selection.method
+    assert inputs.months[-1] == "2024-06"
+
+
+def test_cash_moments_stay_exact_for_large_balances():
+    # sum_sq / n - mean² cancels catastrophically at this magnitude
+    balances = [1e9 + offset for offset in (3.0, -1.0, 4.0, -1.0, 5.0, -9.0)]
+    inputs = ForecastInputs()
+    for index, balance in enumerate(balances):
+        apply_month(inputs, f"2024-{index + 1:02d}", 0.0, 0.0, balance)
+    # Edit a middle month in place
+    assert apply_month(inputs, "2024-03", 0.0, 0.0, 1e9 + 2.0, previous=(0.0, 0.0, balances[2]))
+    balances[2] = 1e9 + 2.0
+
+    assert inputs.mean_cash == pytest.approx(np.mean(balances), rel=1e-15)
+    assert inputs.m2_cash / len(balances) == pytest.approx(np.var(balances), rel=1e-6)
+
+
+def test_states_stored_with_raw_cash_sums_are_rebuilt():
+    # Documents only validate once Beanie is initialized; check the validator itself
+    stored = {"months": ["2024-01"], "sum_cash": 1.0, "sum_cash_sq": 1.0, "stale": False}
+    assert ForecastState._rebuild_raw_cash_sums(stored)["stale"]
+    assert not ForecastState._rebuild_raw_cash_sums({**stored, "m2_cash": 0.0})["stale"]
@@ -0,0 +1,76 @@
+"""
+Import-Time Budget - Guards API cold start
+
+Render free-tier instances cold-start often, so `import app.main` must
+stay cheap. Heavy optional dependencies (the Groq SDK, PyMuPDF,
+openpyxl) are imported on first use, not at startup.
+
+These tests import app.main in fresh interpreters with `-X importtime`
+and fail when:
+- the best-of-N cumulative import time exceeds the budget
+  (IMPORT_TIME_BUDGET_MS, overridable through the environment), or
+- any module in LAZY_MODULES was imported at startup.
+"""
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pytest
+
+IMPORT_TIME_BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 1500))
+RUNS = 3  # Best-of, to damp machine noise
+
+# Must not be imported by `import app.main`
+LAZY_MODULES = ("groq", "fitz", "pymupdf", "openpyxl", "pandas", "sklearn")
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+_LINE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure_import(module: str = "app.main") -> Tuple[float, Dict[str, Tuple[float, int]]]:
+    """
+    Import `module` in a fresh interpreter.
+
+    Returns:
+        Tuple of (total import time in ms, imported module -> (cumulative ms,
+        nesting depth; 0 for `module` itself and other top-level imports))
+    """
+    env = dict(os.environ)
+    # Settings are required at import; nothing connects to them
+    env.setdefault("SECRET_KEY", "import-budget")
+    env.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True, cwd=BACKEND_DIR, env=env,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            cumulative, indent, name = match.groups()
+            modules[name] = (int(cumulative) / 1000, (len(indent) - 1) // 2)
+    return modules.get(module, (0.0, 0))[0], modules
+
+
+@pytest.fixture(scope="module")
+def runs() -> List[Tuple[float, Dict[str, Tuple[float, int]]]]:
+    return [measure_import() for _ in range(RUNS)]
+
+
+def test_import_time_within_budget(runs):
+    total, modules = min(runs, key=lambda run: run[0])
+    direct = sorted(((ms, name) for name, (ms, depth) in modules.items() if depth == 1), reverse=True)
+    slowest = ", ".join(f"{name} {ms:.0f} ms" for ms, name in direct[:5])
+    assert total <= IMPORT_TIME_BUDGET_MS, (
+        f"import app.main: {total:.0f} ms, over the {IMPORT_TIME_BUDGET_MS:.0f} ms budget "
+        f"(best of {RUNS}; slowest: {slowest})"
+    )
+
+
+def test_heavy_dependencies_stay_lazy(runs):
+    eager = sorted({name.split(".")[0] for _, modules in runs for name in modules} & set(LAZY_MODULES))
+    assert not eager, f"Imported at startup, should be lazy: {', '.join(eager)}"
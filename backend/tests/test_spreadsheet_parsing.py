@@ -0,0 +1,35 @@
+"""
+Whole-file spreadsheet parsing on the CPU executor, in process mode
+"""
+import pytest
+
+from app.core.executor import CPUExecutor
+from app.services.import_pipeline import MonthlyUpsertBatch
+from app.services.spreadsheet_parsing import parse_financial_csv
+
+CSV = (
+    "﻿Date,Revenue,Expenses,Cash Balance\n"
+    "2024-01-15,1000,500,9000\n"
+    "not a date,1,1,1\n"
+    "2024-02-10,\"1,200\",600,9500\n"
+).encode()
+
+
+@pytest.mark.asyncio
+async def test_parse_financial_csv_runs_in_process_executor():
+    executor = CPUExecutor(kind="process", workers=1, queue_depth=1)
+    try:
+        parsed = await executor.run(parse_financial_csv, CSV)
+    finally:
+        executor.shutdown()
+
+    assert parsed.error is None
+    assert parsed.errors == ["Could not parse date: not a date"]
+    batch = MonthlyUpsertBatch(None)
+    batch.extend(parsed.batch)
+    assert len(batch) == 2
+    assert parsed.totals.figures(months_of_data=2, records_parsed=2)["average_monthly_revenue"] == 1100.0
+
+
+def test_parse_financial_csv_without_columns():
+    assert parse_financial_csv(b"").error == "No columns found in CSV"